@@ -0,0 +1,449 @@
+"""
+Parallel fan-out of cross-tenant aggregate queries for all_entities roles.
+An eligible aggregate is split into disjoint scoping-column ranges, the partitions run concurrently,
+and the partial SUM/COUNT/MIN/MAX results (AVG travels as SUM and COUNT) are merged per group in Python.
+Partitions share the caller's scheduler tenant; if one is turned away or fails, the original query runs instead.
+Python compares text exactly while the database compares it by collation ('Delhi' = 'DELHI'), so GROUP BY keys and
+MIN/MAX arguments must be numeric or temporal columns (per the statistics catalog) or the scoping column.
+"""
+import asyncio
+import math
+import re
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Callable, Awaitable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .db_scheduler import AdmissionRejectedError
+from .error_codes import ErrorCodes
+from .sql_clauses import parse_clauses, parse_function_call, split_top_level, has_aggregate_call, strip_clauses
+
+MERGEABLE_FUNCTIONS = ('sum', 'count', 'min', 'max', 'avg')
+GROUP = 'group'
+# Column types whose values group and order the same in the database and in Python
+_EXACT_TYPES = re.compile(
+    r'\s*(TINYINT|SMALLINT|MEDIUMINT|INT|INTEGER|BIGINT|DECIMAL|NUMERIC|FLOAT|DOUBLE|REAL|BIT|BOOLEAN|BOOL|YEAR|'
+    r'DATE|DATETIME|TIMESTAMP|TIME)\b',
+    re.IGNORECASE
+)
+# Functions of a temporal column that return a number or a date
+_DATE_PART_FUNCTIONS = {'date', 'year', 'month', 'day', 'dayofmonth', 'dayofweek', 'dayofyear', 'week', 'weekofyear', 'quarter', 'hour', 'minute', 'yearweek', 'to_days'}
+# Words that can follow the first table of a FROM clause but are not an alias
+_FROM_KEYWORDS = {'join', 'inner', 'left', 'right', 'cross', 'straight_join', 'natural', 'full', 'outer', 'use', 'force', 'ignore', 'partition'}
+
+
+@dataclass
+class FanoutColumn:
+    """One output column: a GROUP BY key or a mergeable aggregate"""
+    name: str
+    kind: str
+    argument: Optional[str] = None
+
+
+@dataclass
+class FanoutPlan:
+    """Partition queries of one aggregate and how to merge them back"""
+    sql: str
+    table: str
+    columns: List[FanoutColumn]
+    partitions: List[Tuple[str, Dict[str, Any]]]
+    count_positions: Dict[int, int] = field(default_factory=dict)  # AVG column -> position of its COUNT
+    order: List[Tuple[int, bool]] = field(default_factory=list)  # (column index, descending)
+    limit: Optional[int] = None
+    offset: int = 0
+
+
+def _normalize(expression: str) -> str:
+    return re.sub(r'\s+', ' ', expression.replace('`', '')).strip().lower()
+
+
+class AggregateFanout:
+    """Plans, runs and merges range-partitioned aggregate queries"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_AGGREGATE_FANOUT
+        self.partition_count = max(settings.FANOUT_PARTITIONS, 1)
+        self.configured_boundaries = settings.get_fanout_boundaries()
+        self.range_ttl = settings.FANOUT_RANGE_TTL_SECONDS
+        self._ranges: Dict[str, Tuple[float, List[Any]]] = {}
+        self.fanouts = 0
+        self.partitions_run = 0
+        self.fallbacks = 0
+
+    def is_allowed(self, user_context) -> bool:
+        """Only roles that see all entities run cross-tenant aggregates"""
+        role = getattr(user_context, 'role', None)
+        return self.enabled and self.partition_count > 1 and bool(role) and settings.security.can_access_all_entities(role)
+
+    async def plan(self, sql: str, user_context) -> Optional[FanoutPlan]:
+        """Plan a fan-out for an eligible aggregate, or return None to run the query as is"""
+        if not self.is_allowed(user_context):
+            return None
+        clauses = parse_clauses(sql)
+        if clauses is None or clauses.head or clauses.distinct or clauses.having or clauses.window or clauses.for_:
+            return None
+        if not clauses.is_aggregate or (clauses.group_by and re.search(r'\bWITH\s+ROLLUP\b', clauses.group_by, re.IGNORECASE)):
+            return None
+
+        items = clauses.select_items
+        columns: List[FanoutColumn] = []
+        for item in items:
+            if item.is_star:
+                return None
+            call = parse_function_call(item.expression)
+            name = item.output_name or item.expression.strip()
+            if call and call[0] in MERGEABLE_FUNCTIONS:
+                function, argument = call
+                if re.match(r'DISTINCT\b', argument, flags=re.IGNORECASE) or has_aggregate_call(argument):
+                    return None
+                columns.append(FanoutColumn(name, function, argument))
+            elif has_aggregate_call(item.expression):
+                # Expressions over aggregates (ROUND(SUM(x)), SUM(a)/COUNT(b), GROUP_CONCAT) do not merge
+                return None
+            else:
+                columns.append(FanoutColumn(name, GROUP, item.expression))
+
+        if not self._groups_match(clauses.group_by, items, columns):
+            return None
+        order = self._resolve_order(clauses.order_items, items, columns)
+        if order is None:
+            return None
+        limit_offset = self._parse_limit(clauses.limit, clauses.offset)
+        if limit_offset is None:
+            return None
+
+        source = self._get_scoping_source(clauses.from_)
+        if source is None:
+            return None
+        table, column_ref = source
+        if not self._has_exact_keys(clauses.from_, columns, column_ref.rsplit('.', 1)[-1]):
+            return None
+        from .db_executor import db_executor
+        try:
+            boundaries = await db_executor.run_in_slot(
+                self.get_boundaries, table, column_ref.rsplit('.', 1)[-1], user_context=user_context
+            )
+        except AdmissionRejectedError:
+            return None
+        if not boundaries:
+            return None
+
+        partitions = self._build_partitions(sql, items, columns, column_ref, boundaries)
+        if partitions is None:
+            return None
+        count_positions = {}
+        extra = len(columns)
+        for index, column in enumerate(columns):
+            if column.kind == 'avg':
+                count_positions[index] = extra
+                extra += 1
+        return FanoutPlan(
+            sql=sql,
+            table=table,
+            columns=columns,
+            partitions=partitions,
+            count_positions=count_positions,
+            order=order,
+            limit=limit_offset[0],
+            offset=limit_offset[1]
+        )
+
+    def _groups_match(self, group_by: Optional[str], items, columns: List[FanoutColumn]) -> bool:
+        """Every GROUP BY key must be a selected column and every non-aggregate column must be grouped"""
+        group_indexes = [i for i, column in enumerate(columns) if column.kind == GROUP]
+        if not group_by:
+            return not group_indexes
+        matched = set()
+        for key in split_top_level(group_by):
+            index = self._find_column(key, items)
+            if index is None or columns[index].kind != GROUP:
+                return False
+            matched.add(index)
+        return matched == set(group_indexes)
+
+    def _has_exact_keys(self, from_clause: str, columns: List[FanoutColumn], scoping_column: str) -> bool:
+        """Check that no group key or MIN/MAX argument is text, whose collation Python cannot reproduce when merging"""
+        if '(' in from_clause:
+            # Derived tables: column types cannot be looked up
+            return False
+        tables = re.findall(r'(?:^|,|\bJOIN\b)\s*`?(\w+)`?', from_clause, flags=re.IGNORECASE)
+        return all(
+            self._is_exact_expression(column.argument, tables, scoping_column)
+            for column in columns
+            if column.kind in (GROUP, 'min', 'max')
+        )
+
+    def _is_exact_expression(self, expression: str, tables: List[str], scoping_column: str) -> bool:
+        """A (qualified) numeric or temporal column, a date part of one, or the scoping column"""
+        from .table_statistics import table_statistics
+        expression = _normalize(expression)
+        call = parse_function_call(expression)
+        if call and call[0] in _DATE_PART_FUNCTIONS:
+            expression = _normalize(call[1])
+        match = re.fullmatch(r'(?:\w+\.)?(\w+)', expression)
+        if not match:
+            return False
+        column = match.group(1)
+        if column == scoping_column.lower():
+            return True
+        types = [table_statistics.get_column_type(table, column) for table in tables]
+        types = [data_type for data_type in types if data_type is not None]
+        return bool(types) and all(_EXACT_TYPES.match(data_type) for data_type in types)
+
+    def _find_column(self, reference: str, items) -> Optional[int]:
+        """Resolve a GROUP BY / ORDER BY reference (position, alias or expression) to a select item"""
+        reference = reference.strip()
+        if reference.isdigit():
+            index = int(reference) - 1
+            return index if 0 <= index < len(items) else None
+        normalized = _normalize(reference)
+        for index, item in enumerate(items):
+            if item.alias and normalized == item.alias.lower():
+                return index
+        for index, item in enumerate(items):
+            if _normalize(item.expression) == normalized:
+                return index
+        bare = re.fullmatch(r'(?:\w+\.)?(\w+)', normalized)
+        if bare:
+            matches = [i for i, item in enumerate(items) if (item.output_name or '').lower() == bare.group(1)]
+            if len(matches) == 1:
+                return matches[0]
+        return None
+
+    def _resolve_order(self, order_items, items, columns) -> Optional[List[Tuple[int, bool]]]:
+        order = []
+        for order_item in order_items:
+            index = self._find_column(order_item.expression, items)
+            if index is None:
+                return None
+            order.append((index, order_item.descending))
+        return order
+
+    def _parse_limit(self, limit: Optional[str], offset: Optional[str]) -> Optional[Tuple[Optional[int], int]]:
+        """Parse LIMIT n / LIMIT o, n / LIMIT n OFFSET o"""
+        if not limit:
+            return None, 0
+        match = re.fullmatch(r'\s*(\d+)\s*(?:,\s*(\d+)\s*)?', limit)
+        if not match:
+            return None
+        if match.group(2) is not None:
+            return int(match.group(2)), int(match.group(1))
+        if offset:
+            if not offset.strip().isdigit():
+                return None
+            return int(match.group(1)), int(offset)
+        return int(match.group(1)), 0
+
+    def _get_scoping_source(self, from_clause: str) -> Optional[Tuple[str, str]]:
+        """Get the first FROM table and its qualified scoping column, if the table is scoped"""
+        match = re.match(r'\s*`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?', from_clause or "", flags=re.IGNORECASE)
+        if not match:
+            return None
+        table, alias = match.group(1), match.group(2)
+        if alias and alias.lower() in _FROM_KEYWORDS:
+            alias = None
+        from .graph_builder import schema_graph
+        info = schema_graph.get_table_info(table) or {}
+        if not info.get('scoped', False):
+            return None
+        scoping_column = info.get('scoping_column', settings.security.SCOPING_COLUMN)
+        return table, f"{alias or table}.{scoping_column}"
+
+    def get_boundaries(self, table: str, scoping_column: str) -> List[Any]:
+        """Get partition boundaries: configured for the table, else an even split of MIN..MAX (cached)"""
+        if table in self.configured_boundaries:
+            return sorted(value for value in self.configured_boundaries[table] if value is not None)
+        cached = self._ranges.get(table)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        from .db_executor import db_executor
+        result = db_executor.execute_query(
+            f"SELECT MIN({scoping_column}) AS lo, MAX({scoping_column}) AS hi FROM {table}", use_primary=True
+        )
+        boundaries: List[Any] = []
+        if result.get("success") and result.get("data"):
+            boundaries = self._split_range(result["data"][0].get("lo"), result["data"][0].get("hi"))
+        self._ranges[table] = (time.monotonic() + self.range_ttl, boundaries)
+        return boundaries
+
+    def _split_range(self, low: Any, high: Any) -> List[Any]:
+        """Evenly spaced boundaries between numeric low and high (string ranges need configured boundaries)"""
+        if isinstance(low, bool) or not isinstance(low, (int, float, Decimal)) or not isinstance(high, type(low)):
+            return []
+        if isinstance(low, int):
+            step = math.ceil((high - low + 1) / self.partition_count)
+            return [low + step * i for i in range(1, self.partition_count) if low + step * i <= high]
+        if high <= low:
+            return []
+        step = (high - low) / self.partition_count
+        return [low + step * i for i in range(1, self.partition_count)]
+
+    def _build_partitions(self, sql: str, items, columns: List[FanoutColumn], column_ref: str,
+                          boundaries: List[Any]) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+        """Build one query per scoping range (plus IS NULL) with aggregates rewritten to mergeable partials"""
+        base = strip_clauses(sql, ['order_by', 'limit', 'offset'])
+        clauses = parse_clauses(base)
+        if clauses is None or 'from' not in clauses.spans:
+            return None
+
+        # Group keys keep their original text so GROUP BY aliases still resolve; AVG's COUNT goes last to keep positions
+        select_list = []
+        counts = []
+        for index, (item, column) in enumerate(zip(items, columns)):
+            if column.kind == GROUP:
+                select_list.append(f"{item.expression} AS {item.alias}" if item.alias else item.expression)
+            elif column.kind == 'avg':
+                select_list.append(f"SUM({column.argument}) AS _fan_{index}")
+                counts.append(f"COUNT({column.argument}) AS _fan_count_{index}")
+            else:
+                select_list.append(f"{column.kind.upper()}({column.argument}) AS _fan_{index}")
+        select_sql = "SELECT " + ", ".join(select_list + counts)
+
+        from_start, from_end = clauses.spans['from']
+        where_end = clauses.spans['where'][1] if 'where' in clauses.spans else from_end
+        from_sql = base[from_start:from_end].strip()
+        rest = base[where_end:].strip()
+        existing = f" AND ({clauses.where})" if clauses.where else ""
+
+        ranges = [f"{column_ref} < :_fan_hi"]
+        ranges += [f"{column_ref} >= :_fan_lo AND {column_ref} < :_fan_hi"] * (len(boundaries) - 1)
+        ranges += [f"{column_ref} >= :_fan_lo", f"{column_ref} IS NULL"]
+        bounds = [(None, boundaries[0])] + list(zip(boundaries, boundaries[1:])) + [(boundaries[-1], None), (None, None)]
+
+        partitions = []
+        for condition, (low, high) in zip(ranges, bounds):
+            params = {}
+            if low is not None:
+                params["_fan_lo"] = low
+            if high is not None:
+                params["_fan_hi"] = high
+            partition_sql = f"{select_sql} {from_sql} WHERE ({condition}){existing}"
+            partitions.append((f"{partition_sql} {rest}".strip(), params))
+        return partitions
+
+    async def execute(
+        self,
+        plan: FanoutPlan,
+        user_context=None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> Dict[str, Any]:
+        """Run the partitions concurrently and merge their partial aggregates"""
+        from .db_executor import db_executor
+        from .db_scheduler import db_scheduler
+        # Never ask for more slots at once than the caller's tenant may hold, or partitions would be turned away
+        concurrency = min(len(plan.partitions), db_scheduler.tenant_max_concurrency) if db_scheduler.enabled else len(plan.partitions)
+        semaphore = asyncio.Semaphore(concurrency)
+        failures: List[Dict[str, Any]] = []
+
+        async def run_partition(partition_sql: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                if failures:
+                    return None
+                result = await db_executor.execute_query_guarded(
+                    partition_sql, params, user_context=user_context, is_disconnected=is_disconnected, as_dicts=False
+                )
+                if not result.get("success", False):
+                    failures.append(result)
+                return result
+
+        results = await asyncio.gather(*[run_partition(partition_sql, params) for partition_sql, params in plan.partitions])
+        self.fanouts += 1
+        self.partitions_run += sum(1 for result in results if result is not None)
+        if failures:
+            if failures[0].get("error_code") == ErrorCodes.REQ_CLIENT_DISCONNECTED.code:
+                return failures[0]
+            # A queue-full or failed partition does not fail the query: run it unpartitioned
+            self.fallbacks += 1
+            return await db_executor.execute_query_guarded(
+                plan.sql, user_context=user_context, is_disconnected=is_disconnected, as_dicts=False
+            )
+
+        rows = self.merge(plan, [result.get("rows") or [] for result in results])
+        return {
+            "success": True,
+            "row_count": len(rows),
+            "columns": [column.name for column in plan.columns],
+            "truncated": any(result.get("truncated", False) for result in results),
+            "error": None,
+            "data": None,
+            "rows": rows,
+            "fanout": {"partitions": len(plan.partitions)}
+        }
+
+    def merge(self, plan: FanoutPlan, partition_rows: List[List[tuple]]) -> List[tuple]:
+        """Merge partial aggregate rows per group, then apply ORDER BY and LIMIT"""
+        group_indexes = [i for i, column in enumerate(plan.columns) if column.kind == GROUP]
+        groups: Dict[tuple, List[Any]] = {}
+        for rows in partition_rows:
+            for row in rows:
+                key = tuple(row[i] for i in group_indexes)
+                accumulator = groups.get(key)
+                if accumulator is None:
+                    groups[key] = self._initial(plan, row)
+                    continue
+                for index, column in enumerate(plan.columns):
+                    value = row[index]
+                    if column.kind == 'count':
+                        accumulator[index] += value or 0
+                    elif column.kind == 'avg':
+                        accumulator[index] = [_add(accumulator[index][0], value), accumulator[index][1] + (row[plan.count_positions[index]] or 0)]
+                    elif column.kind == 'sum':
+                        accumulator[index] = _add(accumulator[index], value)
+                    elif column.kind in ('min', 'max') and value is not None:
+                        current = accumulator[index]
+                        if current is None or (value < current if column.kind == 'min' else value > current):
+                            accumulator[index] = value
+
+        merged = []
+        for accumulator in groups.values():
+            row = []
+            for index, column in enumerate(plan.columns):
+                value = accumulator[index]
+                if column.kind == 'avg':
+                    total, count = value
+                    value = total / count if count else None
+                row.append(value)
+            merged.append(tuple(row))
+
+        for index, descending in reversed(plan.order):
+            # MySQL sorts NULLs first ascending and last descending
+            try:
+                merged.sort(key=lambda row: (row[index] is not None, row[index] if row[index] is not None else 0), reverse=descending)
+            except TypeError:
+                merged.sort(key=lambda row: (row[index] is not None, str(row[index])), reverse=descending)
+        end = plan.offset + plan.limit if plan.limit is not None else None
+        return merged[plan.offset:end]
+
+    def _initial(self, plan: FanoutPlan, row: tuple) -> List[Any]:
+        accumulator = []
+        for index, column in enumerate(plan.columns):
+            if column.kind == 'avg':
+                accumulator.append([row[index], row[plan.count_positions[index]] or 0])
+            elif column.kind == 'count':
+                accumulator.append(row[index] or 0)
+            else:
+                accumulator.append(row[index])
+        return accumulator
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get fan-out statistics"""
+        return {
+            'enabled': self.enabled,
+            'partitions': self.partition_count,
+            'fanouts': self.fanouts,
+            'partitions_run': self.partitions_run,
+            'fallbacks': self.fallbacks
+        }
+
+
+def _add(total: Any, value: Any) -> Any:
+    """SUM semantics: NULLs are skipped, all-NULL stays NULL"""
+    if value is None:
+        return total
+    return value if total is None else total + value
+
+
+# Global instance
+aggregate_fanout = AggregateFanout()
@@ -0,0 +1,301 @@
+"""
+Opt-in approximate answers for single-table COUNT(*) queries.
+A count is answered from a recent exact count of the same query (per tenant, since the scoping predicate is part of it),
+from the statistics catalog's table and per-tenant row counts, or, on MySQL, from the optimizer's EXPLAIN row estimate
+when every WHERE column belongs to the index the plan uses.
+Approximate answers carry a signed token to fetch the exact count afterwards.
+Exact counts are only reused while table watermarks show the table unchanged, and then report an error bound of 0;
+a WHERE using CURDATE()/NOW() reuses a count only within the result cache's time bucket.
+Optimizer estimates (EXPLAIN rows, TABLE_ROWS) have no bound to report, so they come back as unbounded estimates.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .config import settings
+from .db_scheduler import AdmissionRejectedError
+from .signed_tokens import create_signed_token, is_signing_key_configured, parse_signed_token
+from .sql_clauses import iter_tokens, parse_clauses, split_conjuncts
+from .sql_fingerprint import normalize_sql
+
+TOKEN_KIND = "exact_count"
+COUNT_EXPRESSION = re.compile(r'COUNT\s*\(\s*(?:\*|1)\s*\)', re.IGNORECASE)
+MAX_STATISTICS_ENTRIES = 10000
+STATISTICS_METHOD = "statistics"
+EXPLAIN_METHOD = "explain"
+
+
+@dataclass
+class CountTarget:
+    """The table and predicate of an eligible COUNT(*) query"""
+    table: str
+    where: Optional[str]
+    output_name: str
+
+
+@dataclass
+class CountEstimate:
+    """An approximate count and its relative error bound (None for an unbounded optimizer estimate)"""
+    value: int
+    error_bound: Optional[float]
+    method: str
+    as_of: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {
+            "estimate": self.value,
+            "bounded": self.error_bound is not None,
+            "method": self.method,
+            "as_of": datetime.fromtimestamp(self.as_of, timezone.utc).isoformat()
+        }
+        if self.error_bound is not None:
+            result["error_bound"] = self.error_bound
+            result["lower_bound"] = self.value
+            result["upper_bound"] = self.value
+        return result
+
+
+class ApproximateCounter:
+    """Answers COUNT(*) queries from cached counts or optimizer estimates instead of scanning"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_APPROXIMATE_COUNT
+        self.statistics_max_age = settings.APPROX_COUNT_STATISTICS_MAX_AGE_SECONDS
+        self.token_ttl = settings.APPROX_COUNT_TOKEN_TTL_SECONDS
+        # normalized count query -> (counted_at, count, table watermark versions at the time)
+        self._statistics: "OrderedDict[str, Tuple[float, int, Dict[str, int]]]" = OrderedDict()
+        # table -> {index name: [columns]}
+        self._indexes: Dict[str, Dict[str, List[str]]] = {}
+        self._lock = threading.Lock()
+        self.statistics_answers = 0
+        self.explain_answers = 0
+        self.declined = 0
+
+    def get_target(self, sql: str) -> Optional[CountTarget]:
+        """Get the table and predicate of a plain "SELECT COUNT(*) FROM table [WHERE ...]" query"""
+        clauses = parse_clauses(sql)
+        if clauses is None or clauses.head or clauses.distinct or clauses.group_by or clauses.having \
+                or clauses.window or clauses.for_ or clauses.offset:
+            return None
+        # Any positive LIMIT leaves the single count row unchanged
+        if clauses.limit and not re.fullmatch(r'\s*[1-9]\d*\s*', clauses.limit):
+            return None
+        items = clauses.select_items
+        if len(items) != 1 or not COUNT_EXPRESSION.fullmatch(items[0].expression.strip()):
+            return None
+        match = re.fullmatch(r'\s*`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?\s*', clauses.from_ or "", flags=re.IGNORECASE)
+        if not match:
+            return None
+        if clauses.where and any(kind == 'word' and value.lower() == 'select' for kind, value, _, _ in iter_tokens(clauses.where)):
+            return None
+        return CountTarget(match.group(1), clauses.where, items[0].alias or items[0].expression.strip())
+
+    def _statistics_key(self, target: CountTarget) -> str:
+        from .result_cache import result_cache
+        where = target.where or ''
+        return f"{target.table.lower()}:{normalize_sql(where)}|{result_cache.get_time_bucket(where)}"
+
+    def record(self, sql: str, execution_result: Dict[str, Any]):
+        """Remember the exact result of a COUNT(*) query so later approximate requests can reuse it"""
+        if not self.enabled or not execution_result.get("success") or execution_result.get("approximate"):
+            return
+        target = self.get_target(sql)
+        if target is None:
+            return
+        rows = execution_result.get("rows")
+        if rows is None:
+            rows = [tuple(row.values()) for row in execution_result.get("data") or []]
+        if len(rows) != 1 or not isinstance(rows[0][0], int):
+            return
+        from .table_watermarks import table_watermarks
+        versions = table_watermarks.get_versions([target.table])
+        if not table_watermarks.is_tracked(target.table) or not versions:
+            # Without a watermark there is no way to tell later whether the count still holds
+            return
+        with self._lock:
+            key = self._statistics_key(target)
+            self._statistics[key] = (time.time(), rows[0][0], versions)
+            self._statistics.move_to_end(key)
+            while len(self._statistics) > MAX_STATISTICS_ENTRIES:
+                self._statistics.popitem(last=False)
+
+    def _estimate_from_statistics(self, target: CountTarget) -> Optional[CountEstimate]:
+        """Use a recorded exact count while the table's watermark has not moved since it was counted"""
+        from .table_watermarks import table_watermarks
+        if not table_watermarks.is_tracked(target.table):
+            return None
+        with self._lock:
+            entry = self._statistics.get(self._statistics_key(target))
+        if entry is None or time.time() - entry[0] > self.statistics_max_age:
+            return None
+        counted_at, count, versions = entry
+        if not versions or not table_watermarks.is_current(versions):
+            # Once the table has changed, nothing says how far the count has drifted
+            return None
+        return CountEstimate(count, 0.0, STATISTICS_METHOD, counted_at)
+
+    def _get_scoping_value(self, target: CountTarget, scoping_column: str) -> Optional[str]:
+        """Get the value of a WHERE that is nothing but "scoping_column = value" """
+        conjuncts = split_conjuncts(target.where or "")
+        if len(conjuncts) != 1:
+            return None
+        match = re.fullmatch(
+            rf"\(?\s*(?:`?\w+`?\s*\.\s*)?`?{re.escape(scoping_column)}`?\s*=\s*(?:'((?:[^'\\]|'')*)'|(-?\d+))\s*\)?",
+            conjuncts[0],
+            flags=re.IGNORECASE
+        )
+        if not match:
+            return None
+        return match.group(1).replace("''", "'") if match.group(1) is not None else match.group(2)
+
+    def _estimate_from_catalog(self, target: CountTarget) -> Optional[CountEstimate]:
+        """Use the statistics catalog's row count of the table, or of the tenant for a scoping-only WHERE"""
+        from .table_statistics import table_statistics
+        stats = table_statistics.get(target.table)
+        if stats is None or time.time() - stats.collected_at > self.statistics_max_age:
+            return None
+        if target.where is None:
+            count, exact = stats.row_count, stats.row_count_exact
+        else:
+            scoping_column = table_statistics.get_scoping_column(target.table)
+            scoping_value = self._get_scoping_value(target, scoping_column) if scoping_column else None
+            if scoping_value is None:
+                return None
+            count, exact = table_statistics.get_row_count(target.table, scoping_value), True
+        if count is None:
+            return None
+        if not exact:
+            # information_schema TABLE_ROWS is the optimizer's estimate
+            return CountEstimate(count, None, STATISTICS_METHOD, stats.collected_at)
+        from .table_watermarks import table_watermarks
+        if not table_watermarks.is_tracked(target.table) or not table_statistics.is_unchanged(stats):
+            # An exact count is only reused while the table is known not to have changed; let EXPLAIN answer instead
+            return None
+        return CountEstimate(count, 0.0, STATISTICS_METHOD, stats.collected_at)
+
+    def get_indexes(self, table: str) -> Dict[str, List[str]]:
+        """Get the table's indexes and their columns in key order (statistics catalog, else SHOW INDEX cached for the process)"""
+        from .table_statistics import table_statistics
+        indexes = table_statistics.get_indexes(table)
+        if indexes is not None:
+            return indexes
+        if table not in self._indexes:
+            from .db_executor import db_executor
+            result = db_executor.execute_query(f"SHOW INDEX FROM `{table}`")
+            if not result["success"]:
+                return {}
+            indexes: Dict[str, List[Tuple[int, str]]] = {}
+            for row in result["data"]:
+                indexes.setdefault(row["Key_name"], []).append((int(row["Seq_in_index"]), row["Column_name"].lower()))
+            self._indexes[table] = {name: [column for _, column in sorted(columns)] for name, columns in indexes.items()}
+        return self._indexes[table]
+
+    def _get_predicate_columns(self, target: CountTarget) -> Set[str]:
+        from .graph_builder import schema_graph
+        columns = {column.lower() for column in (schema_graph.get_table_info(target.table) or {}).get('columns', {})}
+        tokens = list(iter_tokens(target.where or ""))
+        found = set()
+        for index, (kind, value, _, _) in enumerate(tokens):
+            name = value.strip('`').lower()
+            if kind in ('word', 'quoted') and name in columns and not (index + 1 < len(tokens) and tokens[index + 1][1] == '('):
+                found.add(name)
+        return found
+
+    def _estimate_from_explain(self, sql: str, target: CountTarget) -> Optional[CountEstimate]:
+        """Use the optimizer's row estimate when the plan's index covers every predicate column"""
+        from .db_executor import db_executor
+        if db_executor.engine is None or not db_executor.dialect.has_row_estimates:
+            return None
+        # Not served from the EXPLAIN cache: its entries are shared across literals, and row estimates are not
+        result = db_executor.explain(sql)
+        if not result["success"] or len(result["data"] or []) != 1:
+            return None
+        plan = result["data"][0]
+        if plan.get("rows") is None:
+            return None
+        if target.where:
+            index_columns = self.get_indexes(target.table).get(plan.get("key") or "", [])
+            predicate_columns = self._get_predicate_columns(target)
+            if not predicate_columns or not predicate_columns <= set(index_columns):
+                return None
+        filtered = float(plan.get("filtered") or 100.0)
+        return CountEstimate(int(round(float(plan["rows"]) * filtered / 100.0)), None, EXPLAIN_METHOD, time.time())
+
+    def estimate(self, sql: str) -> Optional[CountEstimate]:
+        """Estimate an eligible COUNT(*) query; returns None when it has to run exactly"""
+        if not self.enabled:
+            return None
+        target = self.get_target(sql)
+        estimate = None
+        if target is not None:
+            estimate = self._estimate_from_statistics(target) or self._estimate_from_catalog(target)
+            if estimate is not None:
+                self.statistics_answers += 1
+            else:
+                estimate = self._estimate_from_explain(sql, target)
+                if estimate is not None:
+                    self.explain_answers += 1
+        if estimate is None:
+            self.declined += 1
+        return estimate
+
+    def is_eligible(self, sql: str) -> bool:
+        """Check whether answer() may take a query: an eligible COUNT(*) while approximate counts are on"""
+        return self.enabled and is_signing_key_configured() and self.get_target(sql) is not None
+
+    async def answer(self, sql: str, user_context=None, scoping_value: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Get an execution result carrying the approximate count, or None to execute the query"""
+        # An approximate answer comes with a signed token for the exact count
+        if not self.enabled or not is_signing_key_configured():
+            return None
+        from .db_executor import db_executor
+        try:
+            # Catalog answers need no connection, but the EXPLAIN fallback does: take the caller's scheduler slot
+            estimate = await db_executor.run_in_slot(self.estimate, sql, user_context=user_context, scoping_value=scoping_value)
+        except AdmissionRejectedError:
+            return None
+        if estimate is None:
+            return None
+        return {
+            "success": True,
+            "row_count": 1,
+            "columns": [self.get_target(sql).output_name],
+            "rows": [(estimate.value,)],
+            "data": None,
+            "truncated": False,
+            "error": None,
+            "approximate": estimate.to_dict()
+        }
+
+    def create_exact_token(self, sql: str, scoping_value: Optional[str], role: Optional[str], tables: List[str]) -> str:
+        """Create a signed token that runs the exact count of an approximately answered query"""
+        return create_signed_token(TOKEN_KIND, {"sql": sql, "scope": scoping_value, "role": role, "tables": tables}, self.token_ttl)
+
+    def parse_exact_token(self, token: str) -> Dict[str, Any]:
+        """Verify an exact-count token and return its payload"""
+        return parse_signed_token(TOKEN_KIND, token)
+
+    def clear(self):
+        """Drop recorded counts and index metadata"""
+        with self._lock:
+            self._statistics.clear()
+        self._indexes.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get approximate-count statistics"""
+        return {
+            'enabled': self.enabled,
+            'recorded_counts': len(self._statistics),
+            'statistics_answers': self.statistics_answers,
+            'explain_answers': self.explain_answers,
+            'declined': self.declined
+        }
+
+
+# Global instance
+approximate_counter = ApproximateCounter()
@@ -1,14 +1,57 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Awaitable, Iterator, AsyncIterator
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
 import pandas as pd
 from sqlalchemy import create_engine, text, exc
 from sqlalchemy.engine import Engine
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import NullPool, QueuePool
 from .config import settings
 from .error_codes import create_database_error, ErrorCodes
+from .db_replicas import replica_router
+from .db_scheduler import db_scheduler, AdmissionRejectedError
+from .sql_dialect import SQLDialect, get_dialect
+from .db_pool import PoolMonitor
+
+class QueryCancelHandle:
+    """Tracks the server connection running a query so another thread can cancel it"""
+    
+    def __init__(self):
+        self.connection_id: Optional[int] = None
+        self.engine: Optional[Engine] = None
+        self.cancelled = False
+        self.running = False
+        self._lock = threading.Lock()
+    
+    def start(self, connection_id: Optional[int], engine: Optional[Engine] = None) -> bool:
+        """Mark the query as running on a server of the given engine; returns False if it was cancelled before it started"""
+        with self._lock:
+            self.connection_id = connection_id
+            self.engine = engine
+            if self.cancelled:
+                return False
+            self.running = True
+            return True
+    
+    def finish(self):
+        """Mark the query as no longer running on its connection"""
+        with self._lock:
+            self.running = False
+    
+    def request_cancel(self) -> Optional[int]:
+        """Flag the query as cancelled and return the connection id to kill if it is still running"""
+        with self._lock:
+            self.cancelled = True
+            return self.connection_id if self.running else None
 
 class DatabaseExecutor:
     def __init__(self):
         self.engine: Optional[Engine] = None
+        self.dialect: SQLDialect = get_dialect("mysql")
+        # Unpooled engines for KILL QUERY, one per server, so a cancel never waits behind a saturated pool
+        self._kill_engines: Dict[Any, Engine] = {}
+        self._kill_engines_lock = threading.Lock()
         self._create_engine()
     
     def _create_engine(self):
@@ -20,13 +63,25 @@ class DatabaseExecutor:
                 pool_size=settings.DB_POOL_SIZE,
                 max_overflow=settings.DB_MAX_OVERFLOW,
                 pool_pre_ping=True,
-                pool_recycle=3600
+                pool_recycle=settings.DB_POOL_RECYCLE_SECONDS
             )
+            self.dialect = get_dialect(self.engine.dialect.name)
+            self.pool_monitor = PoolMonitor(self.engine)
             # Database engine created successfully
         except Exception as e:
             # Error creating database engine
             raise create_database_error(e, "engine_creation")
     
+    @contextmanager
+    def _connect(self, use_primary: bool = False):
+        """Check out a connection for a read query: from the best read replica if any are configured, else the primary"""
+        if replica_router.enabled and not use_primary:
+            with replica_router.connect(self.pool_monitor) as conn:
+                yield conn
+        else:
+            with self.pool_monitor.connect() as conn:
+                yield conn
+    
     def test_connection(self) -> bool:
         """Test database connection"""
         try:
@@ -39,67 +94,413 @@ class DatabaseExecutor:
             # Database connection test failed
             return False
     
-    def execute_query(self, sql: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        """Execute SQL query safely"""
-        try:
-            # Validate SQL before execution
-            if not self._validate_sql_for_execution(sql):
-                return {
-                    "success": False,
-                    "error": "SQL validation failed",
-                    "data": None,
-                    "row_count": 0
-                }
-            
-            # Apply LIMIT guardrail if needed
-            sql_to_run = self._apply_limit_guardrail(sql)
-            
-            with self.engine.connect() as conn:
-                # Optional: Run EXPLAIN first for safety (disabled)
-                
-                # Execute the actual query
-                if params:
-                    result = conn.execute(text(sql_to_run), params)
-                else:
-                    result = conn.execute(text(sql_to_run))
-                
-                # Fetch results
-                rows = result.fetchall()
-                columns = result.keys()
-                
-                # Convert to list of dictionaries
-                data = [dict(zip(columns, row)) for row in rows]
-                
-                # Query executed successfully
-                
-                return {
+    def warm_pool(self, connections: Optional[int] = None) -> Dict[str, Any]:
+        """Open pool connections ahead of traffic on the primary and every read replica"""
+        connections = settings.DB_POOL_WARMUP_CONNECTIONS if connections is None else connections
+        return {
+            "primary": self.pool_monitor.warm(connections),
+            "replicas": replica_router.warm(connections)
+        }
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get primary pool metrics"""
+        return self.pool_monitor.get_stats()
+    
+    def execute_query(
+        self,
+        sql: str,
+        params: Optional[Dict] = None,
+        max_execution_time_ms: Optional[int] = None,
+        cancel_handle: Optional[QueryCancelHandle] = None,
+        as_dicts: bool = True,
+        max_bytes: Optional[int] = None,
+        use_primary: bool = False
+    ) -> Dict[str, Any]:
+        """Execute SQL query safely (optionally bounded by a MySQL MAX_EXECUTION_TIME hint)
+        
+        With as_dicts=False the result carries "rows" as tuples instead of per-row dicts in "data".
+        use_primary=True skips the read replicas, for maintenance reads that must not see replicas at different lag.
+        """
+        columns: List[str] = []
+        rows: List[tuple] = []
+        for event in self.stream_query(sql, params, max_execution_time_ms, cancel_handle, max_bytes=max_bytes,
+                                       use_primary=use_primary):
+            if event["type"] == "columns":
+                columns = event["columns"]
+            elif event["type"] == "rows":
+                rows.extend(event["rows"])
+            elif event["type"] == "error":
+                return event["result"]
+            elif event["type"] == "end":
+                result = {
                     "success": True,
-                    "data": data,
-                    "row_count": len(data),
-                    "columns": list(columns),
+                    "row_count": len(rows),
+                    "columns": columns,
+                    "truncated": event["truncated"],
+                    "truncated_columns": event["truncated_columns"],
                     "error": None
                 }
+                if as_dicts:
+                    # Convert to list of dictionaries
+                    result["data"] = [dict(zip(columns, row)) for row in rows]
+                else:
+                    result["data"] = None
+                    result["rows"] = rows
+                return result
+    
+    def stream_query(
+        self,
+        sql: str,
+        params: Optional[Dict] = None,
+        max_execution_time_ms: Optional[int] = None,
+        cancel_handle: Optional[QueryCancelHandle] = None,
+        batch_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        apply_limit_guardrail: bool = True,
+        max_cell_bytes: Optional[int] = None,
+        use_primary: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Execute SQL query on a server-side cursor, yielding the column header and row batches as tuples
+        
+        Events: {"type": "columns"}, then {"type": "rows"} per batch, then {"type": "end"} or {"type": "error"}.
+        The columns event carries "column_types": the (precision, scale) the driver reports per column, or None.
+        The stream stops with truncated=True once the estimated result size exceeds the byte budget.
+        Text and binary cells over max_cell_bytes (0 = no cap) are cut to it; "truncated_columns" in the
+        end event names the columns that had cells cut.
+        """
+        batch_size = batch_size or settings.DB_STREAM_BATCH_SIZE
+        max_bytes = max_bytes or settings.DB_STREAM_MAX_BYTES
+        max_cell_bytes = settings.DB_STREAM_MAX_CELL_BYTES if max_cell_bytes is None else max_cell_bytes
+        
+        # Validate SQL before execution
+        if not self._validate_sql_for_execution(sql):
+            yield {"type": "error", "result": {
+                "success": False,
+                "error": "SQL validation failed",
+                "data": None,
+                "row_count": 0
+            }}
+            return
+        
+        # Apply LIMIT guardrail if needed (exports stream the full result instead)
+        sql_to_run = self._apply_limit_guardrail(sql) if apply_limit_guardrail else sql.strip().rstrip(';')
+        sql_to_run = self.dialect.translate(sql_to_run)
+        if max_execution_time_ms:
+            sql_to_run = self._apply_execution_time_hint(sql_to_run, max_execution_time_ms)
+        
+        try:
+            with self._connect(use_primary) as conn:
+                # Register the server connection so a watchdog can KILL QUERY it
+                if cancel_handle is not None and not cancel_handle.start(self._get_connection_id(conn), conn.engine):
+                    yield {"type": "error", "result": self._cancelled_result(ErrorCodes.REQ_CLIENT_DISCONNECTED)}
+                    return
                 
+                result = None
+                exhausted = False
+                try:
+                    stream_conn = conn.execution_options(stream_results=True, yield_per=batch_size)
+                    result = stream_conn.execute(text(sql_to_run), params or {})
+                    columns = list(result.keys())
+                    yield {"type": "columns", "columns": columns, "column_types": self._get_column_types(result)}
+                    
+                    row_count = 0
+                    bytes_used = 0
+                    truncated = False
+                    truncated_cells = set()
+                    for partition in result.partitions(batch_size):
+                        batch = []
+                        for row in partition:
+                            row = tuple(row)
+                            if max_cell_bytes:
+                                row = self._truncate_cells(row, max_cell_bytes, truncated_cells)
+                            bytes_used += self._estimate_row_bytes(row)
+                            if bytes_used > max_bytes:
+                                truncated = True
+                                break
+                            batch.append(row)
+                        if batch:
+                            row_count += len(batch)
+                            yield {"type": "rows", "rows": batch}
+                        if truncated:
+                            break
+                    exhausted = not truncated
+                    yield {
+                        "type": "end",
+                        "row_count": row_count,
+                        "truncated": truncated,
+                        "truncated_columns": [columns[index] for index in sorted(truncated_cells)]
+                    }
+                finally:
+                    if cancel_handle is not None:
+                        cancel_handle.finish()
+                    if result is not None and not exhausted:
+                        # Closing a half-read server-side cursor would drain the remaining rows; drop the connection instead
+                        # (a failed execute() opened no cursor, so that connection goes back to the pool)
+                        conn.invalidate()
+        
         except exc.SQLAlchemyError as e:
             # Database error occurred
-            error = create_database_error(e, "query_execution")
-            return {
-                "success": False,
-                "error": error.error_code.message,
-                "data": None,
-                "row_count": 0,
-                "error_code": error.error_code.code
-            }
+            yield {"type": "error", "result": self._error_result(e)}
         except Exception as e:
             # Unexpected error occurred
-            error = create_database_error(e, "query_execution")
-            return {
-                "success": False,
-                "error": error.error_code.message,
-                "data": None,
-                "row_count": 0,
-                "error_code": error.error_code.code
-            }
+            yield {"type": "error", "result": self._error_result(e)}
+    
+    def _get_column_types(self, result) -> List[Optional[tuple]]:
+        """Get the DB-API (precision, scale) of each result column, where the driver reports them"""
+        try:
+            description = result.cursor.description or []
+        except AttributeError:
+            return []
+        return [(entry[4], entry[5]) if len(entry) >= 6 else None for entry in description]
+    
+    def _error_result(self, e: Exception) -> Dict[str, Any]:
+        """Build the result returned for a failed query"""
+        error = create_database_error(e, "query_execution")
+        return {
+            "success": False,
+            "error": error.error_code.message,
+            "data": None,
+            "row_count": 0,
+            "error_code": error.error_code.code,
+            "error_details": error.details
+        }
+    
+    def _truncate_cells(self, row: tuple, max_cell_bytes: int, truncated_cells: set) -> tuple:
+        """Cut text and binary cells longer than max_cell_bytes, recording the indexes of cut columns"""
+        cut = None
+        for index, value in enumerate(row):
+            if isinstance(value, (str, bytes, bytearray)) and len(value) > max_cell_bytes:
+                if cut is None:
+                    cut = list(row)
+                cut[index] = value[:max_cell_bytes]
+                truncated_cells.add(index)
+        return tuple(cut) if cut is not None else row
+    
+    def _estimate_row_bytes(self, row) -> int:
+        """Cheap estimate of a row's serialized size"""
+        size = 0
+        for value in row:
+            if isinstance(value, (str, bytes, bytearray)):
+                size += len(value) + 2
+            elif value is None:
+                size += 4
+            else:
+                size += 16
+        return size
+    
+    async def execute_query_guarded(
+        self,
+        sql: str,
+        params: Optional[Dict] = None,
+        user_context=None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        max_execution_time_ms: Optional[int] = None,
+        as_dicts: bool = True,
+        scoping_value: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Execute a query off the event loop with a per-role time budget and cancellation on client disconnect
+        
+        Queries wait for a fair-share slot of their tenant (the scoping value) before taking a pool connection.
+        """
+        tenant = scoping_value or getattr(user_context, 'scoping_value', None)
+        role = getattr(user_context, 'role', None)
+        try:
+            async with db_scheduler.slot(tenant, role):
+                return await self._execute_query_watched(
+                    sql, params, user_context, is_disconnected, max_execution_time_ms, as_dicts,
+                    self.get_max_result_bytes(user_context)
+                )
+        except AdmissionRejectedError as e:
+            return self._queue_full_result(e)
+    
+    def _queue_full_result(self, e: AdmissionRejectedError) -> Dict[str, Any]:
+        """Build the result returned when the scheduler turns a query away"""
+        return {
+            "success": False,
+            "error": ErrorCodes.DB_QUEUE_FULL.message,
+            "data": None,
+            "row_count": 0,
+            "error_code": ErrorCodes.DB_QUEUE_FULL.code,
+            "error_details": {"reason": e.reason}
+        }
+    
+    async def _execute_query_watched(
+        self,
+        sql: str,
+        params: Optional[Dict],
+        user_context,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+        max_execution_time_ms: Optional[int],
+        as_dicts: bool,
+        max_bytes: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Run a query in a worker thread under the watchdog"""
+        budget_ms = max_execution_time_ms or self.get_max_execution_time_ms(user_context)
+        cancel_handle = QueryCancelHandle()
+        worker = asyncio.ensure_future(asyncio.to_thread(
+            self.execute_query, sql, params, budget_ms, cancel_handle, as_dicts, max_bytes
+        ))
+        
+        # The MAX_EXECUTION_TIME hint enforces the budget server-side; the watchdog deadline is a backstop
+        deadline = time.monotonic() + (budget_ms + settings.DB_WATCHDOG_GRACE_MS) / 1000.0
+        cancel_reason = await self._watch(worker, cancel_handle, deadline, is_disconnected)
+        
+        # Always wait for the worker so its connection is returned to the pool
+        result = await worker
+        if cancel_reason is not None and not result.get("success", False):
+            return self._cancelled_result(cancel_reason)
+        return result
+    
+    async def _watch(
+        self,
+        worker: asyncio.Future,
+        cancel_handle: QueryCancelHandle,
+        deadline: float,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]]
+    ):
+        """Wait for a worker, killing its query past the deadline or on client disconnect; returns the cancel reason"""
+        poll_interval = settings.DB_WATCHDOG_POLL_INTERVAL_MS / 1000.0
+        cancel_reason = None
+        
+        while not worker.done():
+            await asyncio.wait({worker}, timeout=poll_interval)
+            if worker.done():
+                break
+            if time.monotonic() >= deadline:
+                cancel_reason = ErrorCodes.DB_TIMEOUT
+            elif is_disconnected is not None:
+                try:
+                    if await is_disconnected():
+                        cancel_reason = ErrorCodes.REQ_CLIENT_DISCONNECTED
+                except Exception:
+                    pass
+            if cancel_reason is not None:
+                connection_id = cancel_handle.request_cancel()
+                if connection_id is not None:
+                    await asyncio.to_thread(self.cancel_query, connection_id, cancel_handle.engine)
+                break
+        return cancel_reason
+    
+    async def stream_query_guarded(
+        self,
+        sql: str,
+        params: Optional[Dict] = None,
+        user_context=None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        max_execution_time_ms: Optional[int] = None,
+        scoping_value: Optional[str] = None,
+        **stream_options
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """stream_query off the event loop, holding the tenant's fair-share slot, under the execute_query_guarded watchdog
+        
+        Each batch is fetched in a worker thread; past the time budget or on client disconnect the query is killed and
+        the stream ends with an error event. stream_options are passed through to stream_query.
+        """
+        tenant = scoping_value or getattr(user_context, 'scoping_value', None)
+        role = getattr(user_context, 'role', None)
+        budget_ms = max_execution_time_ms or self.get_max_execution_time_ms(user_context)
+        try:
+            async with db_scheduler.slot(tenant, role):
+                cancel_handle = QueryCancelHandle()
+                events = self.stream_query(sql, params, budget_ms, cancel_handle, **stream_options)
+                deadline = time.monotonic() + (budget_ms + settings.DB_WATCHDOG_GRACE_MS) / 1000.0
+                worker = None
+                try:
+                    while True:
+                        worker = asyncio.ensure_future(asyncio.to_thread(next, events, None))
+                        cancel_reason = await self._watch(worker, cancel_handle, deadline, is_disconnected)
+                        event = await worker
+                        if event is None:
+                            return
+                        if cancel_reason is not None:
+                            # The killed query surfaces as an error (or a short batch); report why it stopped
+                            yield {"type": "error", "result": self._cancelled_result(cancel_reason)}
+                            return
+                        yield event
+                        if event["type"] in ("end", "error"):
+                            return
+                finally:
+                    if worker is not None and not worker.done():
+                        # The consumer went away mid-batch: kill the query and let the fetch finish before closing
+                        connection_id = cancel_handle.request_cancel()
+                        if connection_id is not None:
+                            await asyncio.to_thread(self.cancel_query, connection_id, cancel_handle.engine)
+                        await asyncio.wait({worker})
+                    # Closing the generator in a worker thread returns (or drops) its connection
+                    await asyncio.to_thread(events.close)
+        except AdmissionRejectedError as e:
+            yield {"type": "error", "result": self._queue_full_result(e)}
+    
+    async def run_in_slot(self, func: Callable[..., Any], *args, user_context=None, scoping_value: Optional[str] = None, **kwargs) -> Any:
+        """Run a blocking call that uses a pool connection (EXPLAIN, schema reads) off the event loop in the caller's slot
+        
+        Raises AdmissionRejectedError when the scheduler turns the call away.
+        """
+        tenant = scoping_value or getattr(user_context, 'scoping_value', None)
+        async with db_scheduler.slot(tenant, getattr(user_context, 'role', None)):
+            return await asyncio.to_thread(func, *args, **kwargs)
+    
+    def get_max_execution_time_ms(self, user_context=None) -> int:
+        """Get the execution time budget for the user's role (role config key: max_execution_time_ms)"""
+        role = getattr(user_context, 'role', None) or settings.security.DEFAULT_USER_ROLE
+        role_config = settings.security.get_role_config(role) or {}
+        try:
+            return int(role_config.get('max_execution_time_ms', settings.DB_DEFAULT_MAX_EXECUTION_TIME_MS))
+        except (TypeError, ValueError):
+            return settings.DB_DEFAULT_MAX_EXECUTION_TIME_MS
+    
+    def get_max_result_bytes(self, user_context=None) -> int:
+        """Get the result payload cap for the user's role (role config key: max_result_bytes)"""
+        role = getattr(user_context, 'role', None) or settings.security.DEFAULT_USER_ROLE
+        role_config = settings.security.get_role_config(role) or {}
+        try:
+            return int(role_config.get('max_result_bytes', settings.DB_STREAM_MAX_BYTES))
+        except (TypeError, ValueError):
+            return settings.DB_STREAM_MAX_BYTES
+    
+    def cancel_query(self, connection_id: int, engine: Optional[Engine] = None) -> bool:
+        """Kill the statement running on a server connection (the connection itself stays usable)"""
+        # KILL QUERY must run on the server (replica or primary) that owns the connection
+        engine = engine or self.engine
+        kill_sql = get_dialect(engine.dialect.name).get_kill_sql(connection_id) if engine is not None else None
+        if kill_sql is None:
+            return False
+        try:
+            with self._get_kill_engine(engine).connect() as conn:
+                conn.execute(text(kill_sql))
+            return True
+        except Exception:
+            # Query may already have finished
+            return False
+    
+    def _get_kill_engine(self, engine: Engine) -> Engine:
+        """Get the unpooled engine that issues KILL QUERY on the server of a pooled engine"""
+        with self._kill_engines_lock:
+            kill_engine = self._kill_engines.get(engine.url)
+            if kill_engine is None:
+                kill_engine = create_engine(engine.url, poolclass=NullPool)
+                self._kill_engines[engine.url] = kill_engine
+            return kill_engine
+    
+    def _get_connection_id(self, conn) -> Optional[int]:
+        """Get the server-side connection id of a pooled connection without a round trip"""
+        try:
+            dbapi_connection = conn.connection.dbapi_connection
+            thread_id = getattr(dbapi_connection, 'thread_id', None)
+            return thread_id() if callable(thread_id) else None
+        except Exception:
+            return None
+    
+    def _cancelled_result(self, error_code) -> Dict[str, Any]:
+        """Build the result returned for a cancelled query"""
+        return {
+            "success": False,
+            "error": error_code.message,
+            "data": None,
+            "row_count": 0,
+            "error_code": error_code.code,
+            "cancelled": True
+        }
     
     def _validate_sql_for_execution(self, sql: str) -> bool:
         """Additional validation before execution"""
@@ -146,7 +547,7 @@ class DatabaseExecutor:
             
             # Apply default LIMIT
             default_limit = getattr(settings.security, 'DEFAULT_LIMIT', 10)
-            sql_with_limit = f"{sql.rstrip(';')} LIMIT {default_limit}"
+            sql_with_limit = self.dialect.apply_limit(sql, default_limit)
             
             return sql_with_limit
             
@@ -154,13 +555,35 @@ class DatabaseExecutor:
             # If anything goes wrong, return original SQL
             return sql
     
+    def _apply_execution_time_hint(self, sql: str, max_execution_time_ms: int) -> str:
+        """Bound the statement's run time where the database supports it (MySQL: MAX_EXECUTION_TIME hint)"""
+        if self.engine is None:
+            return sql
+        return self.dialect.apply_execution_time_hint(sql, max_execution_time_ms)
+    
+    def explain(self, sql: str) -> Dict[str, Any]:
+        """Get the query's plan as MySQL-style EXPLAIN rows in "data" (whatever the database)"""
+        result = self.execute_query(self.dialect.explain_sql(sql))
+        if result["success"]:
+            result["data"] = self.dialect.normalize_explain(result["data"] or [], sql)
+            result["columns"] = list(result["data"][0].keys()) if result["data"] else []
+            result["row_count"] = len(result["data"])
+        return result
+    
     def get_table_schema(self, table_name: str) -> Optional[Dict]:
-        """Get schema information for a table"""
+        """Get schema information for a table (from the statistics catalog when it has the table)"""
+        from .table_statistics import table_statistics
+        stats = table_statistics.get(table_name)
+        if stats is not None and stats.columns:
+            return {
+                "table_name": table_name,
+                "columns": stats.columns
+            }
         try:
             sql = """
             SELECT column_name, data_type, is_nullable, column_default
             FROM information_schema.columns 
-            WHERE table_name = %s
+            WHERE table_name = :table_name
             ORDER BY ordinal_position;
             """
             
@@ -177,13 +600,17 @@ class DatabaseExecutor:
             return None
     
     def get_table_row_count(self, table_name: str, scoping_value: Optional[str] = None) -> Optional[int]:
-        """Get row count for a table (with optional scoping value filter)"""
+        """Get row count for a table (with optional scoping value filter), from the statistics catalog when collected"""
+        from .table_statistics import table_statistics
+        row_count = table_statistics.get_row_count(table_name, scoping_value)
+        if row_count is not None:
+            return row_count
         try:
             if scoping_value:
                 from .config import settings
                 scoping_column = settings.security.SCOPING_COLUMN
-                sql = f"SELECT COUNT(*) as count FROM {table_name} WHERE {scoping_column} = %s;"
-                result = self.execute_query(sql, {scoping_column: scoping_value})
+                sql = f"SELECT COUNT(*) as count FROM {table_name} WHERE {scoping_column} = :scoping_value;"
+                result = self.execute_query(sql, {"scoping_value": scoping_value})
             else:
                 sql = f"SELECT COUNT(*) as count FROM {table_name};"
                 result = self.execute_query(sql)
@@ -215,6 +642,11 @@ class DatabaseExecutor:
         """Close database connections"""
         if self.engine:
             self.engine.dispose()
+        with self._kill_engines_lock:
+            for kill_engine in self._kill_engines.values():
+                kill_engine.dispose()
+            self._kill_engines.clear()
+        replica_router.close()
             # Database connections closed
 
 # Global instance
@@ -0,0 +1,245 @@
+"""
+Connection pool instrumentation, prewarming and a cached database health probe.
+Pool events record connect latency, recycles and invalidations; checkouts are timed to give pool wait time.
+Pools are filled at startup so the first burst after a deploy does not pay connection setup,
+and /health reads the background prober's last result instead of opening a connection per probe.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection, Engine
+
+from .config import settings
+
+# Recent samples kept for percentiles
+LATENCY_WINDOW = 1000
+
+
+def _summarize(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    """avg / p95 / max of latency samples in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'avg_ms': None, 'p95_ms': None, 'max_ms': None}
+    return {
+        'avg_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2)
+    }
+
+
+class PoolMonitor:
+    """Pool metrics of one engine, fed by SQLAlchemy pool events and timed checkouts"""
+
+    def __init__(self, engine: Engine, name: str = "primary"):
+        self.engine = engine
+        self.name = name
+        self.recycle_seconds = settings.DB_POOL_RECYCLE_SECONDS
+        self.connects = 0
+        self.connect_errors = 0
+        self.checkouts = 0
+        self.recycles = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+        self.warmed = 0
+        self._checked_out = 0
+        self._connect_latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._wait_times: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._attach()
+
+    def _attach(self):
+        """Register pool and dialect event listeners on the engine"""
+        event.listen(self.engine, "do_connect", self._on_do_connect)
+        event.listen(self.engine, "connect", self._on_connect)
+        event.listen(self.engine, "checkout", self._on_checkout)
+        event.listen(self.engine, "checkin", self._on_checkin)
+        event.listen(self.engine, "close", self._on_close)
+        event.listen(self.engine, "invalidate", self._on_invalidate)
+
+    def _on_do_connect(self, dialect, connection_record, cargs, cparams):
+        # Record info is cleared before every (re)connect, so the start time belongs to this attempt
+        if connection_record is not None:
+            connection_record.info['connect_started'] = time.perf_counter()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('connect_started', None)
+        with self._lock:
+            self.connects += 1
+            if started is not None:
+                self._connect_latencies.append(time.perf_counter() - started)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._checked_out = max(self._checked_out - 1, 0)
+
+    def _on_close(self, dbapi_connection, connection_record):
+        # A connection closed past its recycle age is being replaced on checkout
+        if self.recycle_seconds > -1 and time.time() - connection_record.starttime > self.recycle_seconds:
+            with self._lock:
+                self.recycles += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def connect(self) -> Connection:
+        """Check out a connection, recording how long the checkout took"""
+        started = time.perf_counter()
+        try:
+            conn = self.engine.connect()
+        except Exception:
+            with self._lock:
+                self.connect_errors += 1
+            raise
+        with self._lock:
+            self._wait_times.append(time.perf_counter() - started)
+        return conn
+
+    def warm(self, connections: int) -> int:
+        """Open up to pool_size connections in parallel and return them to the pool; returns how many opened"""
+        pool_size = self.engine.pool.size() if hasattr(self.engine.pool, 'size') else connections
+        connections = min(connections, pool_size)
+        if connections <= 0:
+            return 0
+
+        def open_connection() -> Optional[Connection]:
+            try:
+                conn = self.engine.connect()
+            except Exception:
+                with self._lock:
+                    self.connect_errors += 1
+                return None
+            try:
+                conn.execute(text("SELECT 1")).fetchone()
+            except Exception:
+                conn.invalidate()
+                conn.close()
+                return None
+            return conn
+
+        # Hold every connection until all are open so each checkout creates a new one
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            opened: List[Connection] = [conn for conn in executor.map(lambda _: open_connection(), range(connections)) if conn]
+        for conn in opened:
+            conn.close()
+        self.warmed += len(opened)
+        return len(opened)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool gauges and event counters"""
+        pool = self.engine.pool
+        stats: Dict[str, Any] = {'name': self.name}
+        try:
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0)
+            })
+        except AttributeError:
+            stats['checked_out'] = self._checked_out
+        with self._lock:
+            stats.update({
+                'peak_checked_out': self.peak_checked_out,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'connect_errors': self.connect_errors,
+                'recycles': self.recycles,
+                'invalidations': self.invalidations,
+                'warmed': self.warmed,
+                'wait_time': _summarize(self._wait_times),
+                'connect_latency': _summarize(self._connect_latencies)
+            })
+        return stats
+
+
+class DatabaseHealthProber:
+    """Background SELECT 1 probe whose last result answers health checks"""
+
+    def __init__(self):
+        self.interval = max(settings.DB_HEALTH_CHECK_SECONDS, 1)
+        self.max_age = settings.DB_HEALTH_CHECK_MAX_AGE_SECONDS
+        self.connected: Optional[bool] = None
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.probes = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def probe(self) -> bool:
+        """Run one probe against the primary database and cache its outcome"""
+        from .db_executor import db_executor
+        started = time.perf_counter()
+        try:
+            with db_executor.pool_monitor.connect() as conn:
+                conn.execute(text("SELECT 1")).fetchone()
+            connected, error = True, None
+        except Exception as e:
+            connected, error = False, type(e).__name__
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.connected, self.error, self.checked_at = connected, error, time.time()
+        self.probes += 1
+        if not connected:
+            self.failures += 1
+        return connected
+
+    def is_stale(self) -> bool:
+        """Check whether the cached result is missing or older than the allowed age"""
+        return self.checked_at is None or time.time() - self.checked_at > self.max_age
+
+    async def is_connected(self) -> bool:
+        """Get the cached probe result, probing off the event loop if it is stale"""
+        if self.is_stale():
+            return await asyncio.to_thread(self.probe)
+        return bool(self.connected)
+
+    async def _run(self):
+        """Probe loop"""
+        while True:
+            try:
+                await asyncio.to_thread(self.probe)
+            except Exception:
+                pass
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background prober"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background prober"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the last probe result"""
+        return {
+            'connected': self.connected,
+            'latency_ms': self.latency_ms,
+            'age_seconds': round(time.time() - self.checked_at, 1) if self.checked_at is not None else None,
+            'error': self.error,
+            'probes': self.probes,
+            'failures': self.failures
+        }
+
+
+# Global instance
+db_health = DatabaseHealthProber()
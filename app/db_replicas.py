@@ -0,0 +1,313 @@
+"""
+Read-replica routing with one connection pool per replica.
+Queries go to the replica with the best score from in-flight count, recent error rate and replication lag;
+replicas that fail health checks, lag too far or error too often are ejected for a cool-down period.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.pool import QueuePool
+
+from .config import settings
+from .db_pool import PoolMonitor
+
+# MySQL client errors meaning the server went away, not that the query was bad
+MYSQL_CONNECTION_ERRORS = {1040, 1053, 2002, 2003, 2006, 2013, 2055}
+# Outcomes needed in the window before the error rate can eject a replica
+MIN_ERROR_SAMPLES = 5
+
+
+class NoReplicaAvailableError(RuntimeError):
+    """Raised when every replica is ejected and falling back to the primary is disabled"""
+
+
+def is_replica_fault(error: BaseException) -> bool:
+    """Check whether an error points at the replica (connection loss) rather than the query
+    
+    A QueuePool checkout timeout (sqlalchemy.exc.TimeoutError) is local pool saturation, not a replica fault.
+    """
+    if isinstance(error, exc.TimeoutError):
+        return False
+    if isinstance(error, (exc.DisconnectionError, exc.InterfaceError)):
+        return True
+    if isinstance(error, exc.DBAPIError):
+        if error.connection_invalidated:
+            return True
+        if isinstance(error, exc.OperationalError):
+            args = getattr(error.orig, 'args', ())
+            return bool(args) and args[0] in MYSQL_CONNECTION_ERRORS
+    return False
+
+
+def create_pool_engine(url: str) -> Engine:
+    """Create a read-only pooled engine with the executor's pool settings"""
+    return create_engine(
+        url,
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS
+    )
+
+
+class Replica:
+    """One read replica: its engine plus routing state"""
+
+    def __init__(self, name: str, engine: Engine, error_window: int):
+        self.name = name
+        self.engine = engine
+        self.pool_monitor = PoolMonitor(engine, name)
+        self.in_flight = 0
+        self.lag_seconds: Optional[float] = None
+        self.ejected_until = 0.0
+        self.eject_reason: Optional[str] = None
+        self.probation = False
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.last_checked: Optional[float] = None
+        self._outcomes: Deque[bool] = deque(maxlen=max(error_window, 1))
+
+    @property
+    def error_rate(self) -> float:
+        """Failure ratio over the recent outcome window"""
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Get QueuePool gauges and pool event counters"""
+        return self.pool_monitor.get_stats()
+
+
+class ReplicaRouter:
+    """Routes read queries across replica pools and ejects unhealthy replicas"""
+
+    def __init__(
+        self,
+        urls: Optional[List[str]] = None,
+        max_lag_seconds: Optional[float] = None,
+        error_window: Optional[int] = None,
+        eject_error_rate: Optional[float] = None,
+        eject_seconds: Optional[float] = None,
+        fallback_to_primary: Optional[bool] = None
+    ):
+        if urls is None:
+            urls = [url.strip() for url in settings.DB_REPLICA_URLS.split(',') if url.strip()]
+        self.max_lag_seconds = settings.DB_REPLICA_MAX_LAG_SECONDS if max_lag_seconds is None else max_lag_seconds
+        self.error_window = settings.DB_REPLICA_ERROR_WINDOW if error_window is None else error_window
+        self.eject_error_rate = settings.DB_REPLICA_EJECT_ERROR_RATE if eject_error_rate is None else eject_error_rate
+        self.eject_seconds = settings.DB_REPLICA_EJECT_SECONDS if eject_seconds is None else eject_seconds
+        self.fallback_to_primary = settings.DB_REPLICA_FALLBACK_TO_PRIMARY if fallback_to_primary is None else fallback_to_primary
+        self.health_check_interval = max(settings.DB_REPLICA_HEALTH_CHECK_SECONDS, 1)
+        self.replicas: List[Replica] = []
+        for url in urls:
+            engine = create_pool_engine(url)
+            self.replicas.append(Replica(engine.url.render_as_string(hide_password=True), engine, self.error_window))
+        self.primary_fallbacks = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def _score(self, replica: Replica) -> float:
+        """Lower is better: in-flight load, inflated by recent errors and replication lag"""
+        lag_factor = 1 + (replica.lag_seconds or 0) / max(self.max_lag_seconds, 1)
+        return (replica.in_flight + 1) * (1 + 4 * replica.error_rate) * lag_factor
+
+    def choose(self) -> Optional[Replica]:
+        """Pick the best available replica, or None if all are ejected"""
+        now = time.monotonic()
+        with self._lock:
+            available = [replica for replica in self.replicas if not replica.is_ejected(now)]
+            if not available:
+                return None
+            replica = min(available, key=lambda r: (self._score(r), r.requests))
+            replica.in_flight += 1
+            replica.requests += 1
+            return replica
+
+    def release(self, replica: Replica, ok: Optional[bool]):
+        """Return a replica chosen by choose(), recording the outcome (None = not attributable)"""
+        with self._lock:
+            replica.in_flight -= 1
+            if ok is not None:
+                self._record_outcome(replica, ok)
+
+    def _record_outcome(self, replica: Replica, ok: bool):
+        replica._outcomes.append(ok)
+        if ok:
+            replica.probation = False
+            return
+        replica.failures += 1
+        if replica.probation:
+            # First failure after a cool-down puts the replica straight back out
+            self._eject(replica, "probation_failure")
+        elif len(replica._outcomes) >= min(MIN_ERROR_SAMPLES, self.error_window) and replica.error_rate >= self.eject_error_rate:
+            self._eject(replica, "error_rate")
+
+    def _eject(self, replica: Replica, reason: str):
+        if not replica.is_ejected(time.monotonic()):
+            replica.ejections += 1
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        replica.eject_reason = reason
+        replica.probation = True
+        replica._outcomes.clear()
+
+    def eject(self, replica: Replica, reason: str):
+        """Take a replica out of rotation for the cool-down period"""
+        with self._lock:
+            self._eject(replica, reason)
+
+    @contextmanager
+    def connect(self, primary: Optional[PoolMonitor] = None) -> Iterator[Connection]:
+        """Check out a connection from the best replica, falling back to the primary's pool if none is available"""
+        replica = self.choose()
+        if replica is None:
+            if primary is None or not self.fallback_to_primary:
+                raise NoReplicaAvailableError("No healthy read replica available")
+            self.primary_fallbacks += 1
+            # Same instrumented checkout as primary reads, so pool wait times and errors are recorded
+            with primary.connect() as conn:
+                yield conn
+            return
+
+        ok: Optional[bool] = True
+        try:
+            try:
+                conn = replica.pool_monitor.connect()
+            except exc.TimeoutError:
+                # Every pooled connection is busy on our side; the replica itself may be fine
+                ok = None
+                raise
+            except Exception:
+                ok = False
+                raise
+            with conn:
+                try:
+                    yield conn
+                except GeneratorExit:
+                    # Consumer stopped reading; says nothing about the replica
+                    ok = None
+                    raise
+                except Exception as e:
+                    ok = False if is_replica_fault(e) else None
+                    raise
+        finally:
+            self.release(replica, ok)
+
+    def _get_lag_seconds(self, conn: Connection) -> Optional[float]:
+        """Read replication lag (MySQL SHOW REPLICA STATUS; 0 for servers that are not replicas)"""
+        if conn.dialect.name != 'mysql':
+            return 0.0
+        for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"), ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+            try:
+                row = conn.execute(text(statement)).mappings().first()
+            except exc.DBAPIError:
+                continue
+            if row is None:
+                return 0.0
+            lag = row.get(column)
+            # NULL lag means the replication threads are stopped
+            return float(lag) if lag is not None else None
+        return 0.0
+
+    def check_replica(self, replica: Replica) -> bool:
+        """Probe a replica's connectivity and lag, ejecting or re-admitting it"""
+        try:
+            with replica.engine.connect() as conn:
+                conn.execute(text("SELECT 1")).fetchone()
+                lag = self._get_lag_seconds(conn)
+        except Exception:
+            replica.last_checked = time.time()
+            self.eject(replica, "health_check")
+            return False
+
+        with self._lock:
+            replica.last_checked = time.time()
+            replica.lag_seconds = lag
+            if lag is None or lag > self.max_lag_seconds:
+                self._eject(replica, "replication_lag")
+                return False
+            if replica.is_ejected(time.monotonic()) and replica.eject_reason == "replication_lag":
+                # Lag has recovered; no need to sit out the rest of the cool-down
+                replica.ejected_until = 0.0
+            return True
+
+    def check_all(self) -> Dict[str, bool]:
+        """Health-check every replica"""
+        return {replica.name: self.check_replica(replica) for replica in self.replicas}
+
+    async def _run(self):
+        """Health check loop"""
+        while True:
+            try:
+                await asyncio.to_thread(self.check_all)
+            except Exception:
+                pass
+            await asyncio.sleep(self.health_check_interval)
+
+    def start(self):
+        """Start the background health checker"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background health checker"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def warm(self, connections: int) -> Dict[str, int]:
+        """Prewarm every replica pool"""
+        return {replica.name: replica.pool_monitor.warm(connections) for replica in self.replicas}
+
+    def close(self):
+        """Dispose every replica pool"""
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-replica routing and pool metrics"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'primary_fallbacks': self.primary_fallbacks,
+                'replicas': [
+                    {
+                        'name': replica.name,
+                        'available': not replica.is_ejected(now),
+                        'eject_reason': replica.eject_reason if replica.is_ejected(now) else None,
+                        'ejected_for_seconds': round(max(replica.ejected_until - now, 0), 1),
+                        'ejections': replica.ejections,
+                        'lag_seconds': replica.lag_seconds,
+                        'in_flight': replica.in_flight,
+                        'requests': replica.requests,
+                        'failures': replica.failures,
+                        'error_rate': round(replica.error_rate, 3),
+                        'pool': replica.get_pool_stats()
+                    }
+                    for replica in self.replicas
+                ]
+            }
+
+
+# Global instance
+replica_router = ReplicaRouter()
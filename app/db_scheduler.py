@@ -0,0 +1,247 @@
+"""
+Fair-share admission control in front of query execution.
+Each tenant (scoping value) gets a concurrency cap; waiting queries are admitted by start-time fair queuing,
+so a tenant's burst waits behind its own queries instead of taking every pool connection.
+Unscoped callers are keyed by role ("_unscoped:<role>"), and background statistics / watermark work runs as the
+"_maintenance" tenant, so neither can starve the other or the scoped tenants.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .config import settings
+
+UNSCOPED_TENANT = "_unscoped"
+MAINTENANCE_TENANT = "_maintenance"
+# Tenants kept in the metrics table (least recently active are dropped first)
+MAX_TRACKED_TENANTS = 256
+WAIT_SAMPLES = 512
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Raised when a query is turned away because its tenant's queue is full or the wait timed out"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass(order=True)
+class _Waiter:
+    tag: float
+    sequence: int
+    tenant: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+@dataclass
+class _TenantStats:
+    admitted: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    waits_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _wait_summary(samples) -> Dict[str, float]:
+    return {
+        'p50_ms': round(_percentile(samples, 0.5), 1),
+        'p95_ms': round(_percentile(samples, 0.95), 1),
+        'max_ms': round(max(samples), 1) if samples else 0.0
+    }
+
+
+class FairShareScheduler:
+    """Weighted fair queuing of DB query slots across tenants and roles, with per-tenant caps"""
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        tenant_max_concurrency: Optional[int] = None,
+        tenant_max_queue: Optional[int] = None,
+        queue_timeout_ms: Optional[int] = None
+    ):
+        self.enabled = settings.ENABLE_DB_SCHEDULER
+        self.max_concurrency = max(max_concurrency or settings.DB_SCHEDULER_MAX_CONCURRENCY, 1)
+        self.tenant_max_concurrency = max(tenant_max_concurrency or settings.DB_SCHEDULER_TENANT_MAX_CONCURRENCY, 1)
+        self.tenant_max_queue = settings.DB_SCHEDULER_TENANT_MAX_QUEUE if tenant_max_queue is None else tenant_max_queue
+        self.queue_timeout_ms = settings.DB_SCHEDULER_QUEUE_TIMEOUT_MS if queue_timeout_ms is None else queue_timeout_ms
+        self.running = 0
+        self._running_by_tenant: Dict[str, int] = {}
+        self._queued_by_tenant: Dict[str, int] = {}
+        # Last start tag per (tenant, role) flow
+        self._flow_tags: Dict[Tuple[str, str], float] = {}
+        self._virtual_time = 0.0
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._stats: "OrderedDict[str, _TenantStats]" = OrderedDict()
+        self._waits_ms: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def get_weight(self, role: Optional[str]) -> float:
+        """Get the role's scheduling weight (role config key: scheduler_weight, default 1)"""
+        role_config = settings.security.get_role_config(role or settings.security.DEFAULT_USER_ROLE) or {}
+        try:
+            return max(float(role_config.get('scheduler_weight', 1)), 0.01)
+        except (TypeError, ValueError):
+            return 1.0
+
+    def get_tenant(self, tenant: Optional[str], role: Optional[str] = None) -> str:
+        """Scheduling key of a caller: its scoping value, else its role"""
+        return tenant or f"{UNSCOPED_TENANT}:{role or settings.security.DEFAULT_USER_ROLE}"
+
+    def _tenant_stats(self, tenant: str) -> _TenantStats:
+        stats = self._stats.pop(tenant, None) or _TenantStats()
+        self._stats[tenant] = stats
+        while len(self._stats) > MAX_TRACKED_TENANTS:
+            self._stats.popitem(last=False)
+        return stats
+
+    def _next_tag(self, tenant: str, role: Optional[str]) -> float:
+        """Start tag of a new query: it starts after the flow's previous query, never before the current virtual time"""
+        flow = (tenant, role or "")
+        tag = max(self._virtual_time, self._flow_tags.get(flow, 0.0)) + 1.0 / self.get_weight(role)
+        self._flow_tags[flow] = tag
+        return tag
+
+    def _has_capacity(self, tenant: str) -> bool:
+        return self.running < self.max_concurrency and self._running_by_tenant.get(tenant, 0) < self.tenant_max_concurrency
+
+    def _admit(self, tenant: str, tag: float, waited_ms: float):
+        self.running += 1
+        self._running_by_tenant[tenant] = self._running_by_tenant.get(tenant, 0) + 1
+        self._virtual_time = max(self._virtual_time, tag)
+        stats = self._tenant_stats(tenant)
+        stats.admitted += 1
+        stats.waits_ms.append(waited_ms)
+        self._waits_ms.append(waited_ms)
+
+    def _dispatch(self):
+        """Admit queued queries in tag order, skipping tenants at their cap"""
+        blocked: List[_Waiter] = []
+        while self._queue and self.running < self.max_concurrency:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue
+            if not self._has_capacity(waiter.tenant):
+                blocked.append(waiter)
+                continue
+            self._dequeue(waiter.tenant)
+            waiter.future.set_result(waiter.tag)
+            # Slot accounting happens here so a second dispatch cannot hand out the same slot
+            self._admit(waiter.tenant, waiter.tag, (time.monotonic() - waiter.enqueued_at) * 1000)
+        for waiter in blocked:
+            heapq.heappush(self._queue, waiter)
+        if not self._queue and self.running == 0:
+            # Idle: restart virtual time so old flow tags do not accumulate
+            self._virtual_time = 0.0
+            self._flow_tags.clear()
+        elif len(self._flow_tags) > MAX_TRACKED_TENANTS * 4:
+            # Tags at or behind virtual time are superseded by it anyway
+            self._flow_tags = {flow: tag for flow, tag in self._flow_tags.items() if tag > self._virtual_time}
+
+    def _dequeue(self, tenant: str):
+        remaining = self._queued_by_tenant.get(tenant, 1) - 1
+        if remaining > 0:
+            self._queued_by_tenant[tenant] = remaining
+        else:
+            self._queued_by_tenant.pop(tenant, None)
+
+    async def acquire(self, tenant: Optional[str], role: Optional[str] = None):
+        """Wait for a query slot; raises AdmissionRejectedError if the tenant's queue is full or the wait times out"""
+        tenant = self.get_tenant(tenant, role)
+        tag = self._next_tag(tenant, role)
+        if not self._queue and self._has_capacity(tenant):
+            self._admit(tenant, tag, 0.0)
+            return
+
+        stats = self._tenant_stats(tenant)
+        if self._queued_by_tenant.get(tenant, 0) >= self.tenant_max_queue:
+            stats.rejected += 1
+            raise AdmissionRejectedError("queue_full")
+
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(tag, next(self._sequence), tenant, loop.create_future())
+        heapq.heappush(self._queue, waiter)
+        self._queued_by_tenant[tenant] = self._queued_by_tenant.get(tenant, 0) + 1
+        self._dispatch()
+
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.queue_timeout_ms / 1000.0)
+        except BaseException:
+            # The caller was cancelled: hand back a slot granted in the meantime, or leave the queue
+            if waiter.future.done():
+                self.release(tenant)
+            else:
+                self._abandon(waiter)
+            raise
+        if not waiter.future.done():
+            self._abandon(waiter)
+            stats.timed_out += 1
+            raise AdmissionRejectedError("queue_timeout")
+
+    def _abandon(self, waiter: _Waiter):
+        waiter.future.cancel()
+        self._dequeue(waiter.tenant)
+
+    def release(self, tenant: Optional[str], role: Optional[str] = None):
+        """Return a query slot"""
+        tenant = self.get_tenant(tenant, role)
+        self.running -= 1
+        remaining = self._running_by_tenant.get(tenant, 1) - 1
+        if remaining > 0:
+            self._running_by_tenant[tenant] = remaining
+        else:
+            self._running_by_tenant.pop(tenant, None)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, tenant: Optional[str], role: Optional[str] = None):
+        """Hold a query slot for the duration of the block (no-op when the scheduler is disabled)"""
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(tenant, role)
+        try:
+            yield
+        finally:
+            self.release(tenant, role)
+
+    def get_stats(self, top_tenants: int = 10) -> Dict[str, Any]:
+        """Get queue depth and queue-wait metrics, overall and for the tenants with the longest waits"""
+        tenants = {
+            tenant: {
+                'running': self._running_by_tenant.get(tenant, 0),
+                'queued': self._queued_by_tenant.get(tenant, 0),
+                'admitted': stats.admitted,
+                'rejected': stats.rejected,
+                'timed_out': stats.timed_out,
+                'queue_wait': _wait_summary(stats.waits_ms)
+            }
+            for tenant, stats in self._stats.items()
+        }
+        busiest = sorted(tenants.items(), key=lambda item: (item[1]['queued'], item[1]['queue_wait']['p95_ms']), reverse=True)
+        return {
+            'enabled': self.enabled,
+            'max_concurrency': self.max_concurrency,
+            'tenant_max_concurrency': self.tenant_max_concurrency,
+            'running': self.running,
+            'queued': sum(self._queued_by_tenant.values()),
+            'queue_wait': _wait_summary(self._waits_ms),
+            'tenants': dict(busiest[:top_tenants])
+        }
+
+
+# Global instance
+db_scheduler = FairShareScheduler()
@@ -109,7 +109,24 @@ class ErrorCodes:
         http_status=504,
         retryable=True
     )
-    
+
+    DB_QUERY_TOO_EXPENSIVE = ErrorCode(
+        code="NL2SQL-DB-1008",
+        category=ErrorCategory.DATABASE,
+        message="Query exceeds cost budget",
+        description="The estimated cost of the query exceeds the execution budget for this role",
+        http_status=400
+    )
+
+    DB_QUEUE_FULL = ErrorCode(
+        code="NL2SQL-DB-1009",
+        category=ErrorCategory.DATABASE,
+        message="Database query queue full",
+        description="Too many queries are waiting for a database slot for this tenant, please try again later",
+        http_status=503,
+        retryable=True
+    )
+
     # Validation Errors (2000-2999)
     VAL_INVALID_QUERY_FORMAT = ErrorCode(
         code="NL2SQL-VAL-2001",
@@ -315,6 +332,38 @@ class ErrorCodes:
         retryable=True
     )
 
+    REQ_CLIENT_DISCONNECTED = ErrorCode(
+        code="NL2SQL-REQ-6005",
+        category=ErrorCategory.REQUEST,
+        message="Client disconnected",
+        description="The client closed the connection and the running query was cancelled",
+        http_status=499
+    )
+
+    REQ_UNSUPPORTED_RESULT_FORMAT = ErrorCode(
+        code="NL2SQL-REQ-6006",
+        category=ErrorCategory.REQUEST,
+        message="Unsupported result format",
+        description="The requested result format is unknown or its serializer is not installed",
+        http_status=406
+    )
+
+    REQ_INVALID_CONTINUATION_TOKEN = ErrorCode(
+        code="NL2SQL-REQ-6007",
+        category=ErrorCategory.REQUEST,
+        message="Invalid continuation token",
+        description="The continuation token is malformed, expired or was issued for a different user",
+        http_status=400
+    )
+
+    REQ_INVALID_QUERY_TOKEN = ErrorCode(
+        code="NL2SQL-REQ-6008",
+        category=ErrorCategory.REQUEST,
+        message="Invalid query token",
+        description="The query token is malformed, expired or was issued for a different user",
+        http_status=400
+    )
+
 
 class NL2SQLError(Exception):
     """Base exception class for NL2SQL errors"""
@@ -374,7 +423,7 @@ class ErrorHandler:
             return ErrorHandler.create_error(ErrorCodes.DB_INVALID_SQL_SYNTAX, details, exception)
         elif "permission" in str(exception).lower() or "access denied" in str(exception).lower():
             return ErrorHandler.create_error(ErrorCodes.DB_PERMISSION_DENIED, details, exception)
-        elif "timeout" in str(exception).lower():
+        elif "timeout" in str(exception).lower() or "maximum statement execution time exceeded" in str(exception).lower():
             return ErrorHandler.create_error(ErrorCodes.DB_TIMEOUT, details, exception)
         else:
             return ErrorHandler.create_error(ErrorCodes.DB_QUERY_EXECUTION_FAILED, details, exception)
@@ -0,0 +1,88 @@
+"""
+EXPLAIN plan cache keyed by literal-stripped SQL fingerprint and schema version.
+Lets repeated query shapes skip the EXPLAIN round trip in the DB feedback loop.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .sql_fingerprint import fingerprint_sql
+
+
+class ExplainCache:
+    """LRU cache of EXPLAIN rows with a TTL"""
+
+    def __init__(self, max_size: int = None, ttl_seconds: int = None, schema_graph=None):
+        self.max_size = max_size if max_size is not None else settings.EXPLAIN_CACHE_MAX_SIZE
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.EXPLAIN_CACHE_TTL_SECONDS
+        self.enabled = settings.ENABLE_EXPLAIN_CACHE
+        self.schema_graph = schema_graph
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_schema_version(self) -> str:
+        """Lazy-load the schema graph and return its version"""
+        if self.schema_graph is None:
+            from .graph_builder import schema_graph
+            self.schema_graph = schema_graph
+        return self.schema_graph.get_schema_version()
+
+    def _get_cache_key(self, sql: str) -> str:
+        """Build cache key from schema version and literal-stripped fingerprint"""
+        return f"{self._get_schema_version()}:{fingerprint_sql(sql, strip_literals=True)}"
+
+    def get(self, sql: str) -> Optional[List[Dict[str, Any]]]:
+        """Get cached EXPLAIN rows for a query shape"""
+        if not self.enabled:
+            return None
+        key = self._get_cache_key(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, rows = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(row) for row in rows]
+
+    def put(self, sql: str, explain_rows: List[Dict[str, Any]]):
+        """Cache EXPLAIN rows for a query shape"""
+        if not self.enabled:
+            return
+        key = self._get_cache_key(sql)
+        with self._lock:
+            self._entries[key] = (time.time(), [dict(row) for row in explain_rows or []])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                # Remove least recently used entry
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached plans"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0
+        }
+
+
+# Global instance
+explain_cache = ExplainCache()
@@ -1,5 +1,6 @@
 import json
 import re
+import hashlib
 import networkx as nx
 from typing import Dict, List, Optional, Set
 from pathlib import Path
@@ -12,6 +13,8 @@ class SchemaGraph:
         self.nx_graph = None
         self.tables = {}
         self.relationships = []
+        self.rollups = {}
+        self.schema_version = ""
         self._load_graph()
     
     def _load_graph(self):
@@ -27,9 +30,11 @@ class SchemaGraph:
             
             self.tables = self.graph_data.get('tables', {})
             self.relationships = self.graph_data.get('relationships', [])
+            self.rollups = self.graph_data.get('rollups', {})
             
             # Build NetworkX graph for path finding
             self._build_nx_graph()
+            self._compute_schema_version()
             
             # Loaded schema graph
             
@@ -66,6 +71,7 @@ class SchemaGraph:
         self.tables = self.graph_data['tables']
         self.relationships = self.graph_data['relationships']
         self._build_nx_graph()
+        self._compute_schema_version()
         
         # Save the default graph
         self.graph_path.parent.mkdir(parents=True, exist_ok=True)
@@ -86,10 +92,23 @@ class SchemaGraph:
         for rel in self.relationships:
             self.nx_graph.add_edge(rel['from'], rel['to'], key=rel['on'])
     
+    def _compute_schema_version(self):
+        """Compute a stable version hash of the loaded schema graph"""
+        payload = json.dumps(self.graph_data, sort_keys=True, default=str)
+        self.schema_version = hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+    
+    def get_schema_version(self) -> str:
+        """Get the version hash of the loaded schema graph"""
+        return self.schema_version
+    
     def get_table_info(self, table_name: str) -> Optional[Dict]:
         """Get information about a specific table"""
         return self.tables.get(table_name)
     
+    def get_rollups(self, source_table: str) -> Dict[str, Dict]:
+        """Get the pre-aggregated rollup tables registered for a source table"""
+        return {name: info for name, info in self.rollups.items() if info.get('source_table') == source_table}
+    
     def get_related_tables(self, table_name: str) -> List[str]:
         """Get tables directly related to the given table"""
         if table_name not in self.nx_graph:
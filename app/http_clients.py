@@ -0,0 +1,227 @@
+"""
+Shared HTTP client registry for LLM provider calls.
+One httpx.AsyncClient per origin (scheme, host, port) is shared by every provider and handler, with HTTP/2 when the
+optional h2 package is installed and per-host connection limits and keep-alive. Connections can be opened at startup
+so the first requests skip the TCP/TLS handshakes, and each request's connect time is recorded apart from its
+time to first byte.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .config import settings
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+except ImportError:
+    h2 = None
+
+# Recent samples kept for percentiles
+LATENCY_WINDOW = 500
+# Recent per-request timings listed in the stats
+RECENT_REQUESTS = 20
+
+
+def is_http2_available() -> bool:
+    """Check whether the optional h2 dependency is installed"""
+    return h2 is not None
+
+
+def get_origin(url: str) -> str:
+    """scheme://host[:port] of a URL"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _summarize(samples: Iterable[float]) -> Dict[str, Optional[float]]:
+    """avg / p95 of latency samples in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'avg_ms': None, 'p95_ms': None}
+    return {
+        'avg_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p95_ms': round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 2)
+    }
+
+
+class RequestTrace:
+    """Collects httpcore trace events of one request into connect and time-to-first-byte durations"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._marks: Dict[str, float] = {}
+        self.http_version: Optional[str] = None
+
+    async def __call__(self, event_name: str, info: Dict[str, Any]):
+        # Events look like "connection.connect_tcp.started" or "http2.receive_response_headers.complete"
+        prefix, _, name = event_name.partition(".")
+        self._marks.setdefault(name, time.perf_counter())
+        if name == "receive_response_headers.complete":
+            self.http_version = "HTTP/2" if prefix == "http2" else "HTTP/1.1"
+
+    @property
+    def new_connection(self) -> bool:
+        return "connect_tcp.started" in self._marks
+
+    @property
+    def connect_seconds(self) -> float:
+        """TCP connect plus TLS handshake; 0 when a pooled connection was reused"""
+        if not self.new_connection:
+            return 0.0
+        end = self._marks.get("start_tls.complete", self._marks.get("connect_tcp.complete"))
+        return end - self._marks["connect_tcp.started"] if end is not None else 0.0
+
+    @property
+    def ttfb_seconds(self) -> Optional[float]:
+        """Request headers sent until response headers received"""
+        start = self._marks.get("send_request_headers.started")
+        end = self._marks.get("receive_response_headers.complete")
+        return end - start if start is not None and end is not None else None
+
+
+class HostStats:
+    """Request timings of one origin"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.new_connections = 0
+        self.warmed = 0
+        self.http_versions: Dict[str, int] = {}
+        self.connect: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.ttfb: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.total: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_REQUESTS)
+
+
+class HTTPClientRegistry:
+    """One shared AsyncClient per origin with tuned limits, HTTP/2 and request timing"""
+
+    def __init__(self):
+        self.http2 = settings.LLM_HTTP2 and is_http2_available()
+        self.max_connections = settings.LLM_HTTP_MAX_CONNECTIONS
+        self.max_keepalive_connections = settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS
+        self.keepalive_expiry = settings.LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS
+        self.connect_timeout = settings.LLM_HTTP_CONNECT_TIMEOUT_SECONDS
+        self.host_limits = settings.get_llm_http_host_limits()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._http2_origins: Dict[str, bool] = {}
+        self._stats: Dict[str, HostStats] = {}
+
+    def _get_host_config(self, origin: str) -> Dict[str, Any]:
+        host = urlsplit(origin).hostname or ""
+        return self.host_limits.get(host, {})
+
+    def get_client(self, url: str) -> httpx.AsyncClient:
+        """Get the shared client of a URL's origin, creating it on first use"""
+        origin = get_origin(url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            config = self._get_host_config(origin)
+            self._http2_origins[origin] = bool(config.get("http2", self.http2)) and is_http2_available()
+            client = httpx.AsyncClient(
+                http2=self._http2_origins[origin],
+                limits=httpx.Limits(
+                    max_connections=int(config.get("max_connections", self.max_connections)),
+                    max_keepalive_connections=int(config.get("max_keepalive_connections", self.max_keepalive_connections)),
+                    keepalive_expiry=float(config.get("keepalive_expiry", self.keepalive_expiry))
+                ),
+                timeout=httpx.Timeout(60.0, connect=self.connect_timeout)
+            )
+            self._clients[origin] = client
+            self._stats.setdefault(origin, HostStats())
+        return client
+
+    async def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """Send a request on the origin's shared client, recording connect and time-to-first-byte timing"""
+        client = self.get_client(url)
+        stats = self._stats[get_origin(url)]
+        trace = RequestTrace()
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=min(self.connect_timeout, timeout))
+        try:
+            response = await client.request(method, url, extensions={"trace": trace}, **kwargs)
+        except Exception:
+            stats.requests += 1
+            stats.errors += 1
+            raise
+        self._record(stats, trace, response.status_code)
+        return response
+
+    async def post(self, url: str, timeout: Optional[float] = None, **kwargs) -> httpx.Response:
+        """POST on the origin's shared client"""
+        return await self.request("POST", url, timeout=timeout, **kwargs)
+
+    def _record(self, stats: HostStats, trace: RequestTrace, status_code: int):
+        total = time.perf_counter() - trace.started
+        stats.requests += 1
+        if trace.new_connection:
+            stats.new_connections += 1
+            stats.connect.append(trace.connect_seconds)
+        if trace.ttfb_seconds is not None:
+            stats.ttfb.append(trace.ttfb_seconds)
+        stats.total.append(total)
+        if trace.http_version:
+            stats.http_versions[trace.http_version] = stats.http_versions.get(trace.http_version, 0) + 1
+        stats.recent.append({
+            'status': status_code,
+            'http_version': trace.http_version,
+            'new_connection': trace.new_connection,
+            'connect_ms': round(trace.connect_seconds * 1000, 2),
+            'ttfb_ms': round(trace.ttfb_seconds * 1000, 2) if trace.ttfb_seconds is not None else None,
+            'total_ms': round(total * 1000, 2)
+        })
+
+    async def warm(self, urls: List[str], connections: Optional[int] = None) -> Dict[str, int]:
+        """Open connections (TCP + TLS) to each URL's origin ahead of traffic; returns connections opened per origin"""
+        connections = settings.LLM_HTTP_WARMUP_CONNECTIONS if connections is None else connections
+        opened = {}
+        for origin in dict.fromkeys(get_origin(url) for url in urls if url):
+            self.get_client(origin)
+            # A single HTTP/2 connection multiplexes every request
+            count = 1 if self._http2_origins[origin] else max(connections, 1)
+            results = await asyncio.gather(
+                *(self.request("HEAD", f"{origin}/", timeout=self.connect_timeout) for _ in range(count)),
+                return_exceptions=True
+            )
+            # Any HTTP status means the connection is up and pooled
+            opened[origin] = sum(1 for result in results if isinstance(result, httpx.Response))
+            self._stats[origin].warmed += opened[origin]
+        return opened
+
+    async def close(self):
+        """Close every shared client"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-origin request timing"""
+        return {
+            'http2_available': is_http2_available(),
+            'hosts': {
+                origin: {
+                    'requests': stats.requests,
+                    'errors': stats.errors,
+                    'new_connections': stats.new_connections,
+                    'warmed': stats.warmed,
+                    'http_versions': dict(stats.http_versions),
+                    'connect': _summarize(stats.connect),
+                    'ttfb': _summarize(stats.ttfb),
+                    'total': _summarize(stats.total),
+                    'recent': list(stats.recent)
+                }
+                for origin, stats in self._stats.items()
+            }
+        }
+
+
+# Global instance
+http_clients = HTTPClientRegistry()
@@ -20,6 +20,7 @@ from .config import settings
 from .schema_index import schema_index
 from .plan_validator import plan_validator
 from .projection_advisor import projection_advisor
+from .table_statistics import table_statistics, format_row_count
 
 @dataclass
 class TableScore:
@@ -173,7 +174,8 @@ class IntelligentSQLGenerator:
             table_name = example_records[idx][0]
             self.cache.example_embeddings.append((table_name, idx, emb))
     
-    async def generate_accurate_sql(self, user_query: str, scoping_value: str, user_context: UserContext = None) -> Dict[str, Any]:
+    async def generate_accurate_sql(self, user_query: str, scoping_value: str, user_context: UserContext = None,
+                                    approximate: bool = False) -> Dict[str, Any]:
         """Main entry point for intelligent SQL generation with user context support"""
         try:
             # Validate user access if context is provided
@@ -201,7 +203,7 @@ class IntelligentSQLGenerator:
             
             # Stage 3: SQL Generation with Validation Loop
             sql_result = await self._generate_with_validation_loop(
-                user_query, scoping_value, relevant_tables, schema_context, query_context, user_context
+                user_query, scoping_value, relevant_tables, schema_context, query_context, user_context, approximate
             )
             
             # Log access if user context is provided
@@ -667,6 +669,12 @@ class IntelligentSQLGenerator:
             selected_columns = table_info.get('columns', [])
             description += f"Columns: {', '.join(selected_columns)}\n"
             
+            # Table size from the statistics catalog helps the model avoid unfiltered scans of large tables
+            if settings.PROMPT_INCLUDE_ROW_COUNTS:
+                row_count = table_statistics.get_row_count(table_name)
+                if row_count is not None:
+                    description += f"Rows: {format_row_count(row_count)}\n"
+            
             if table_info.get('scoped', False):
                 scoping_column = table_info.get('scoping_column', settings.security.SCOPING_COLUMN)
                 # Only show scoped line when it matches entity scoping column
@@ -868,7 +876,8 @@ class IntelligentSQLGenerator:
     # Phase 3: Validation Loop with Iterative Refinement
     async def _generate_with_validation_loop(self, user_query: str, scoping_value: str, 
                                            relevant_tables: List[str], schema_context: str, 
-                                           query_context: QueryContext, user_context: UserContext = None) -> Dict[str, Any]:
+                                           query_context: QueryContext, user_context: UserContext = None,
+                                           approximate: bool = False) -> Dict[str, Any]:
         """Generate SQL with validation and iterative refinement"""
         
         attempt = 0
@@ -936,47 +945,100 @@ class IntelligentSQLGenerator:
                         }
                 
                 if validation_result["valid"]:
-                    # Optional DB feedback loop via EXPLAIN
+                    final_sql = validation_result.get("modified_sql", sql)
                     from .config import settings as _settings
-                    if getattr(_settings, 'ENABLE_DB_FEEDBACK_LOOP', False):
+                    # Rollup rewrite: answer matching GROUP BY queries from a pre-aggregated table
+                    from .rollup_rewriter import rollup_rewriter
+                    rollup_rewrite = rollup_rewriter.rewrite(final_sql)
+                    if rollup_rewrite is not None:
+                        final_sql = rollup_rewrite.sql
+                        validation_result["tables"] = list(validation_result.get("tables", current_tables)) + [rollup_rewrite.rollup_table]
+                    # Execute-as-validation: one guarded round trip replaces EXPLAIN + execute for cheap queries
+                    execution_result = await self._execute_as_validation(
+                        final_sql, scoping_value, user_context, validation_result.get("tables", current_tables), approximate
+                    )
+                    if execution_result is not None:
+                        if execution_result.get('success', False):
+                            return {
+                                "success": True,
+                                "sql": final_sql,
+                                "tables_used": validation_result.get("tables", current_tables),
+                                "attempts": attempt + 1,
+                                "schema_tokens": len(current_schema_context.split()),
+                                "error": None,
+                                "execution_result": execution_result
+                            }
+                        # A timeout only means the query is not cheap, and a full queue says nothing about the SQL;
+                        # let EXPLAIN and the cost gate decide
+                        if execution_result.get('error_code') not in (ErrorCodes.DB_TIMEOUT.code, ErrorCodes.DB_QUEUE_FULL.code):
+                            validation_result = {
+                                "valid": False,
+                                "error": f"Database error: {self._describe_db_error(execution_result)}",
+                                "modified_sql": final_sql,
+                                "tables": validation_result.get('tables', current_tables)
+                            }
+                    
+                    # Optional DB feedback loop via EXPLAIN
+                    if validation_result["valid"] and getattr(_settings, 'ENABLE_DB_FEEDBACK_LOOP', False):
                         try:
                             from .db_executor import db_executor
-                            explain_sql = f"EXPLAIN {validation_result.get('modified_sql', sql).rstrip(';')}"
-                            explain_result = db_executor.execute_query(explain_sql)
-                            if not explain_result.get('success', False):
+                            from .explain_cache import explain_cache
+                            # Repeated query shapes reuse a cached plan and skip the EXPLAIN round trip
+                            explain_rows = explain_cache.get(final_sql)
+                            explain_error = None
+                            if explain_rows is None:
+                                explain_result = await db_executor.run_in_slot(
+                                    db_executor.explain, final_sql, user_context=user_context, scoping_value=scoping_value
+                                )
+                                if explain_result.get('success', False):
+                                    explain_rows = explain_result.get('data') or []
+                                    explain_cache.put(final_sql, explain_rows)
+                                else:
+                                    explain_error = self._describe_db_error(explain_result)
+                            if explain_error is not None:
                                 validation_result = {
                                     "valid": False,
-                                    "error": f"Database error: {explain_result.get('error', 'Unknown DB error')}",
-                                    "modified_sql": validation_result.get('modified_sql', sql),
+                                    "error": f"Database error: {explain_error}",
+                                    "modified_sql": final_sql,
                                     "tables": validation_result.get('tables', current_tables)
                                 }
-                            else:
-                                return {
-                                    "success": True,
-                                    "sql": validation_result.get("modified_sql", sql),
-                                    "tables_used": validation_result.get("tables", current_tables),
-                                    "attempts": attempt + 1,
-                                    "schema_tokens": len(current_schema_context.split()),
-                                    "error": None
-                                }
+                            elif getattr(_settings, 'ENABLE_COST_GATE', False):
+                                # Cost gate: compare EXPLAIN row estimates against the role budget
+                                from .query_cost import cost_estimator
+                                cost_decision = cost_estimator.evaluate(
+                                    explain_rows, final_sql, user_context, scoping_value=scoping_value
+                                )
+                                if cost_decision["action"] == "refuse":
+                                    return {
+                                        "success": False,
+                                        "sql": final_sql,
+                                        "tables_used": validation_result.get("tables", current_tables),
+                                        "attempts": attempt + 1,
+                                        "error": cost_decision["error"],
+                                        "error_code": cost_decision["error_code"],
+                                        "error_details": {"cost_estimate": cost_decision["estimate"].to_dict(), "budget": cost_decision["budget"]}
+                                    }
+                                if cost_decision["action"] == "regenerate":
+                                    validation_result = {
+                                        "valid": False,
+                                        "error": cost_decision["error"],
+                                        "modified_sql": final_sql,
+                                        "tables": validation_result.get('tables', current_tables)
+                                    }
+                                else:
+                                    final_sql = cost_decision["sql"]
                         except Exception:
-                            return {
-                                "success": True,
-                                "sql": validation_result.get("modified_sql", sql),
-                                "tables_used": validation_result.get("tables", current_tables),
-                                "attempts": attempt + 1,
-                                "schema_tokens": len(current_schema_context.split()),
-                                "error": None
-                            }
-                    else:
-                        return {
-                            "success": True,
-                            "sql": validation_result.get("modified_sql", sql),
-                            "tables_used": validation_result.get("tables", current_tables),
-                            "attempts": attempt + 1,
-                            "schema_tokens": len(current_schema_context.split()),
-                            "error": None
-                        }
+                            pass
+
+                if validation_result["valid"]:
+                    return {
+                        "success": True,
+                        "sql": final_sql,
+                        "tables_used": validation_result.get("tables", current_tables),
+                        "attempts": attempt + 1,
+                        "schema_tokens": len(current_schema_context.split()),
+                        "error": None
+                    }
                 
                 # If validation fails, refine context and retry
                 attempt += 1
@@ -1015,6 +1077,41 @@ class IntelligentSQLGenerator:
             "error": f"Failed to generate valid SQL after {self.MAX_VALIDATION_ATTEMPTS} attempts. Last validation error: {validation_result.get('error', 'Unknown error')}"
         }
     
+    async def _execute_as_validation(self, sql: str, scoping_value: str, user_context: UserContext,
+                                     tables: List[str], approximate: bool = False) -> Optional[Dict[str, Any]]:
+        """Run validated SQL the way the endpoint would (list queries as their first keyset page); None if skipped"""
+        from .approximate_count import approximate_counter
+        if not getattr(settings, 'ENABLE_EXECUTE_AS_VALIDATION', False):
+            return None
+        # Running a count that may be answered approximately would defeat the point
+        if approximate and approximate_counter.is_eligible(sql):
+            return None
+        from .db_executor import db_executor
+        from .pagination import keyset_paginator
+        from .result_cache import result_cache
+        page_plan = keyset_paginator.plan(sql)
+        run_sql, run_params = keyset_paginator.build_page_sql(page_plan) if page_plan is not None else (sql, None)
+        # A cached result proves the SQL already ran successfully
+        cache_key = result_cache.build_key(run_sql, scoping_value, user_context.role if user_context else None, run_params)
+        execution_result = result_cache.get(cache_key)
+        if execution_result is None:
+            table_versions = result_cache.snapshot_versions(tables)
+            execution_result = await db_executor.execute_query_guarded(
+                run_sql,
+                run_params,
+                user_context=user_context,
+                max_execution_time_ms=settings.EXECUTE_AS_VALIDATION_MAX_TIME_MS,
+                as_dicts=False,
+                scoping_value=scoping_value
+            )
+            result_cache.put(cache_key, execution_result, tables, table_versions)
+        return execution_result
+
+    def _describe_db_error(self, execution_result: Dict[str, Any]) -> str:
+        """Get the most specific database error message for refinement feedback"""
+        details = execution_result.get('error_details') or {}
+        return details.get('original_error') or execution_result.get('error') or 'Unknown DB error'
+    
     def _validate_sql_with_schema_accuracy(self, sql: str, scoping_value: str, user_context: UserContext, tables: List[str]) -> Dict[str, Any]:
         """Enhanced validation with schema accuracy checks"""
         
@@ -1,18 +1,24 @@
 from typing import List, Dict, Optional, Any
 from .config import settings
 from .graph_builder import schema_graph
-from .llm_providers import LLMProviderFactory
+from .llm_router import LLMRouter, get_request_provider
 from .middleware import circuit_breaker_middleware
 from .error_codes import create_llm_error, ErrorCodes
 
 class LLMHandler:
     def __init__(self, provider: str = None):
-        """Initialize LLM handler with specified provider"""
-        self.provider_name = provider or settings.DEFAULT_LLM_PROVIDER
-        self.config = settings.get_llm_config(self.provider_name)
-        self.provider = LLMProviderFactory.create_provider(self.config)
+        """Initialize LLM handler with specified default provider, routing across the configured providers"""
+        self.default_provider_name = provider or settings.DEFAULT_LLM_PROVIDER
+        self.router = LLMRouter(self.default_provider_name)
+        self.config = settings.get_llm_config(self.default_provider_name)
+        self.provider = self.router.providers[self.default_provider_name]
         # Initialized LLM handler with provider
     
+    @property
+    def provider_name(self) -> str:
+        """Provider serving the current request (the default provider outside routed requests)"""
+        return get_request_provider() or self.default_provider_name
+    
     async def generate_sql(self, user_query: str, scoping_value: str, relevant_tables: List[str], schema_context: str = None) -> str:
         """Generate SQL using the configured LLM provider with circuit breaker protection (plan-then-generate)."""
         try:
@@ -35,9 +41,8 @@ class LLMHandler:
             except Exception:
                 scoping_required = False
             
-            plan_json = await circuit_breaker_middleware.execute_with_circuit_breaker(
-                self.provider_name,
-                self.provider.generate_plan,
+            plan_json = await self.router.call(
+                "generate_plan",
                 user_query, relevant_tables, schema_desc, scoping_required
             )
             
@@ -49,9 +54,8 @@ class LLMHandler:
                 if len(relevant_tables) > 1:
                     # Try with just the top table
                     top_table = relevant_tables[0] if relevant_tables else "entities"
-                    plan_json = await circuit_breaker_middleware.execute_with_circuit_breaker(
-                        self.provider_name,
-                        self.provider.generate_plan,
+                    plan_json = await self.router.call(
+                        "generate_plan",
                         user_query, [top_table], schema_desc, scoping_required
                     )
                     validation_result = plan_validator.validate_plan(plan_json, user_query)
@@ -65,9 +69,8 @@ class LLMHandler:
                 plan_json = json.dumps(validation_result["repaired_plan"])
             
             # Step 2: Generate SQL from validated plan
-            sql = await circuit_breaker_middleware.execute_with_circuit_breaker(
-                self.provider_name,
-                self.provider.generate_sql_from_plan,
+            sql = await self.router.call(
+                "generate_sql_from_plan",
                 plan_json, scoping_value
             )
             
@@ -82,9 +85,8 @@ class LLMHandler:
     async def explain_results(self, query: str, results: List[Dict], row_count: int) -> str:
         """Generate a natural language explanation of the results using the configured LLM provider with circuit breaker protection"""
         try:
-            explanation = await circuit_breaker_middleware.execute_with_circuit_breaker(
-                self.provider_name,
-                self.provider.explain_results,
+            explanation = await self.router.call(
+                "explain_results",
                 query, results, row_count
             )
             return explanation
@@ -94,21 +96,27 @@ class LLMHandler:
             raise create_llm_error(e, self.provider_name)
     
     async def close(self):
-        """Close the LLM provider"""
-        await self.provider.close()
+        """Close the LLM providers"""
+        await self.router.close()
     
-    def get_provider_info(self) -> Dict[str, str]:
-        """Get information about the current provider"""
+    def get_provider_info(self) -> Dict[str, Any]:
+        """Get information about the default provider and the providers routed across"""
         return {
-            "provider": self.provider_name,
+            "provider": self.default_provider_name,
             "model": self.config.model,
-            "type": self.config.provider_type
+            "type": self.config.provider_type,
+            "routed_providers": list(self.router.providers)
         }
     
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Get per-provider latency and error-rate routing state"""
+        return self.router.get_stats()
+    
     def get_circuit_breaker_status(self) -> Dict[str, Any]:
-        """Get circuit breaker status for this provider"""
-        return circuit_breaker_middleware.get_circuit_breaker(self.provider_name).get_state()
+        """Get circuit breaker status for the default provider"""
+        return circuit_breaker_middleware.get_circuit_breaker(self.default_provider_name).get_state()
     
     def reset_circuit_breaker(self):
-        """Reset circuit breaker for this provider"""
-        circuit_breaker_middleware.reset_circuit_breaker(self.provider_name) 
\ No newline at end of file
+        """Reset circuit breakers of every routed provider"""
+        for name in self.router.providers:
+            circuit_breaker_middleware.reset_circuit_breaker(name) 
\ No newline at end of file
@@ -0,0 +1,292 @@
+"""
+Adaptive concurrency and tokens-per-minute limits for outbound LLM calls.
+Each provider has an AIMD concurrency limit: every successful call raises it by 1/limit (about +1 per round of calls)
+and a 429, an overload 503 or a timeout cuts it by LLM_CONCURRENCY_BACKOFF, at most once per cooldown so one burst of
+rejections counts once. An optional tokens-per-minute bucket reserves an estimate per call (the EWMA of the
+provider's reported usage for the operation) and settles it with the real usage afterwards.
+Calls over either limit wait in a FIFO queue until their deadline; a Retry-After from the provider pauses the whole
+provider, and a call whose wait would outlast its deadline fails at once so the router can go elsewhere.
+"""
+import asyncio
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, Optional
+
+import httpx
+
+from .config import settings
+
+# A burst of rejections only shrinks the limit once per this many seconds
+DECREASE_COOLDOWN_SECONDS = 1.0
+# Weight of the newest sample in the per-operation token estimate
+TOKEN_EWMA_ALPHA = 0.2
+
+
+class LLMQueueTimeoutError(Exception):
+    """A call could not start within its queue deadline"""
+
+
+class CallUsage:
+    """What the provider reported for one call: tokens used and any rate limiting"""
+
+    def __init__(self):
+        self.tokens = 0
+        self.rate_limited = False
+        self.retry_after: Optional[float] = None
+
+
+# Usage of the LLM call running in the current task, filled in by the provider's HTTP responses
+_current_call: ContextVar[Optional[CallUsage]] = ContextVar("llm_call_usage", default=None)
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait from retry-after-ms or Retry-After (delta-seconds or HTTP date)"""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(float(value) / 1000, 0.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_token_usage(payload: Any) -> int:
+    """Total tokens reported by an OpenAI-style, Anthropic or Gemini response body"""
+    if not isinstance(payload, dict):
+        return 0
+    usage = payload.get("usage") or {}
+    if "total_tokens" in usage:
+        return int(usage["total_tokens"] or 0)
+    if "input_tokens" in usage or "output_tokens" in usage:
+        return int(usage.get("input_tokens") or 0) + int(usage.get("output_tokens") or 0)
+    return int((payload.get("usageMetadata") or {}).get("totalTokenCount") or 0)
+
+
+def record_response(response: httpx.Response):
+    """Note token usage and rate limiting of a provider response for the call in progress"""
+    call = _current_call.get()
+    if call is None:
+        return
+    retry_after = parse_retry_after(response.headers)
+    if response.status_code == 429 or (response.status_code == 503 and retry_after is not None):
+        call.rate_limited = True
+        call.retry_after = retry_after
+    elif response.status_code == 200:
+        try:
+            call.tokens += get_token_usage(response.json())
+        except ValueError:
+            pass
+
+
+class ProviderLimiter:
+    """AIMD concurrency limit, tokens-per-minute bucket and deadline queue of one provider"""
+
+    def __init__(self, name: str, tokens_per_minute: int):
+        self.name = name
+        self.limit = float(settings.LLM_CONCURRENCY_INITIAL)
+        self.min_limit = max(settings.LLM_CONCURRENCY_MIN, 1)
+        self.max_limit = max(settings.LLM_CONCURRENCY_MAX, self.min_limit)
+        self.limit = min(max(self.limit, self.min_limit), self.max_limit)
+        self.backoff = settings.LLM_CONCURRENCY_BACKOFF
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._queue: Deque[asyncio.Event] = deque()
+
+        self.tokens_per_minute = tokens_per_minute
+        self.token_rate = tokens_per_minute / 60.0
+        self.tokens = float(tokens_per_minute)
+        self._tokens_updated = time.monotonic()
+        self.token_estimates: Dict[str, float] = {}
+
+        self.calls = 0
+        self.queued = 0
+        self.queue_timeouts = 0
+        self.rate_limited = 0
+        self.decreases = 0
+        self.peak_in_flight = 0
+
+    def is_paused(self) -> bool:
+        """Check whether the provider asked us to back off (Retry-After) and the pause is still running"""
+        return time.monotonic() < self.paused_until
+
+    def estimate_tokens(self, operation: str) -> float:
+        """Tokens to reserve for a call: the EWMA of reported usage, the configured default until then"""
+        return self.token_estimates.get(operation, float(settings.LLM_TPM_DEFAULT_CALL_TOKENS))
+
+    def _refill(self, now: float):
+        if self.tokens_per_minute > 0:
+            self.tokens = min(self.tokens + (now - self._tokens_updated) * self.token_rate, float(self.tokens_per_minute))
+        self._tokens_updated = now
+
+    def _try_admit(self, now: float, reserve: float) -> float:
+        """Take a slot and reserve tokens, returning 0; otherwise the seconds to wait (inf: until a call finishes)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return float("inf")
+        if self.tokens_per_minute > 0:
+            self._refill(now)
+            needed = min(reserve, float(self.tokens_per_minute))
+            if self.tokens < needed:
+                return (needed - self.tokens) / self.token_rate
+            self.tokens -= reserve
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return 0.0
+
+    def _wake_next(self):
+        if self._queue:
+            self._queue[0].set()
+
+    async def acquire(self, reserve: float, deadline: float):
+        """Wait in line for a concurrency slot and token budget until the deadline (time.monotonic())"""
+        if len(self._queue) >= settings.LLM_QUEUE_MAX:
+            self.queue_timeouts += 1
+            raise LLMQueueTimeoutError(f"LLM rate limit queue for provider {self.name} is full")
+        ticket = asyncio.Event()
+        self._queue.append(ticket)
+        waited = False
+        try:
+            while True:
+                now = time.monotonic()
+                wait = self._try_admit(now, reserve) if self._queue[0] is ticket else float("inf")
+                if wait <= 0:
+                    return
+                # Fail now rather than at the deadline when a known wait (pause or token refill) outlasts it
+                if now >= deadline or (wait != float("inf") and now + wait > deadline):
+                    self.queue_timeouts += 1
+                    raise LLMQueueTimeoutError(f"LLM rate limit queue deadline exceeded for provider {self.name}")
+                if not waited:
+                    self.queued += 1
+                    waited = True
+                ticket.clear()
+                try:
+                    await asyncio.wait_for(ticket.wait(), timeout=min(wait, deadline - now))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._queue.remove(ticket)
+            # The next caller may fit as well (spare slots, or this one gave up)
+            self._wake_next()
+
+    def release(self, operation: str, reserve: float, usage: CallUsage, overloaded: bool, succeeded: bool):
+        """Free the slot, settle the token reservation and adapt the limit to how the call went"""
+        now = time.monotonic()
+        self.in_flight -= 1
+        self.calls += 1
+        if usage.tokens > 0:
+            previous = self.token_estimates.get(operation)
+            self.token_estimates[operation] = (
+                float(usage.tokens) if previous is None
+                else previous + TOKEN_EWMA_ALPHA * (usage.tokens - previous)
+            )
+            if self.tokens_per_minute > 0:
+                self._refill(now)
+                self.tokens += reserve - usage.tokens
+
+        if usage.rate_limited:
+            self.rate_limited += 1
+            pause = usage.retry_after if usage.retry_after is not None else settings.LLM_RETRY_AFTER_DEFAULT_SECONDS
+            self.paused_until = max(self.paused_until, now + min(pause, settings.LLM_RETRY_AFTER_MAX_SECONDS))
+        if usage.rate_limited or overloaded:
+            if now - self._last_decrease >= DECREASE_COOLDOWN_SECONDS:
+                self.limit = max(self.limit * self.backoff, float(self.min_limit))
+                self._last_decrease = now
+                self.decreases += 1
+        elif succeeded:
+            self.limit = min(self.limit + 1.0 / self.limit, float(self.max_limit))
+        self._wake_next()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the current limit, queue and token budget"""
+        now = time.monotonic()
+        self._refill(now)
+        return {
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'peak_in_flight': self.peak_in_flight,
+            'queue_length': len(self._queue),
+            'paused_for_seconds': round(max(self.paused_until - now, 0.0), 2),
+            'tokens_per_minute': self.tokens_per_minute or None,
+            'tokens_available': round(self.tokens) if self.tokens_per_minute > 0 else None,
+            'token_estimates': {operation: round(tokens) for operation, tokens in self.token_estimates.items()},
+            'calls': self.calls,
+            'queued': self.queued,
+            'queue_timeouts': self.queue_timeouts,
+            'rate_limited': self.rate_limited,
+            'decreases': self.decreases
+        }
+
+
+class LLMLimiter:
+    """Per-provider limiters applied around every LLM call"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_LLM_LIMITER
+        self.tpm_limits = settings.get_llm_tpm_limits()
+        self.limiters: Dict[str, ProviderLimiter] = {}
+
+    def get_limiter(self, provider_name: str) -> ProviderLimiter:
+        """Get or create the limiter of a provider"""
+        if provider_name not in self.limiters:
+            self.limiters[provider_name] = ProviderLimiter(
+                provider_name, self.tpm_limits.get(provider_name.lower(), settings.LLM_TPM_DEFAULT)
+            )
+        return self.limiters[provider_name]
+
+    def is_paused(self, provider_name: str) -> bool:
+        """Check whether a provider is backing off after a Retry-After"""
+        limiter = self.limiters.get(provider_name)
+        return limiter is not None and limiter.is_paused()
+
+    async def run(self, provider_name: str, operation_name: str, call, usage: CallUsage):
+        """Await call() inside the provider's limits, recording what the provider reported into usage"""
+        token = _current_call.set(usage)
+        if not self.enabled:
+            try:
+                return await call()
+            finally:
+                _current_call.reset(token)
+        limiter = self.get_limiter(provider_name)
+        reserve = limiter.estimate_tokens(operation_name)
+        try:
+            await limiter.acquire(reserve, time.monotonic() + settings.LLM_QUEUE_TIMEOUT_SECONDS)
+        except BaseException:
+            _current_call.reset(token)
+            raise
+        overloaded = succeeded = False
+        try:
+            result = await call()
+            succeeded = True
+            return result
+        except httpx.TimeoutException:
+            overloaded = True
+            raise
+        finally:
+            _current_call.reset(token)
+            limiter.release(operation_name, reserve, usage, overloaded, succeeded and not usage.rate_limited)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-provider limiter state"""
+        return {
+            'enabled': self.enabled,
+            'providers': {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+        }
+
+
+# Global instance
+llm_limiter = LLMLimiter()
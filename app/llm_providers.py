@@ -2,13 +2,27 @@ import httpx
 from typing import List, Dict, Optional, Any
 from abc import ABC, abstractmethod
 from .config import LLMProviderConfig, settings
+from .http_clients import http_clients
+from .llm_limiter import record_response
 
 class BaseLLMProvider(ABC):
     """Base class for LLM providers"""
     
+    default_base_url: Optional[str] = None
+    
     def __init__(self, config: LLMProviderConfig):
         self.config = config
-        self.client = httpx.AsyncClient(timeout=config.timeout)
+    
+    @property
+    def base_url(self) -> str:
+        """API base URL (configured, else the provider's public endpoint)"""
+        return (self.config.base_url or self.default_base_url or "").rstrip('/')
+    
+    async def _post(self, url: str, **kwargs) -> httpx.Response:
+        """POST on the shared client of the URL's host with this provider's timeout, reporting usage and 429s to the limiter"""
+        response = await http_clients.post(url, timeout=self.config.timeout, **kwargs)
+        record_response(response)
+        return response
     
     @abstractmethod
     async def generate_sql(self, user_query: str, scoping_value: str, relevant_tables: List[str], schema_description: str) -> str:
@@ -114,8 +128,8 @@ class BaseLLMProvider(ABC):
         return sql
     
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Release provider resources (the shared HTTP clients are closed by the registry)"""
+        pass
 
 class OpenAIProvider(BaseLLMProvider):
     """OpenAI LLM provider"""
@@ -140,8 +154,8 @@ class OpenAIProvider(BaseLLMProvider):
                 "temperature": self.config.temperature
             }
             
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -181,8 +195,8 @@ class OpenAIProvider(BaseLLMProvider):
                 "temperature": settings.EXPLANATION_TEMPERATURE
             }
             
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -211,8 +225,8 @@ class OpenAIProvider(BaseLLMProvider):
                 "max_tokens": min(600, self.config.max_tokens),
                 "temperature": 0.0
             }
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -239,8 +253,8 @@ class OpenAIProvider(BaseLLMProvider):
                 "max_tokens": self.config.max_tokens,
                 "temperature": self.config.temperature
             }
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -259,6 +273,8 @@ class OpenAIProvider(BaseLLMProvider):
 class AnthropicProvider(BaseLLMProvider):
     """Anthropic Claude LLM provider"""
     
+    default_base_url = "https://api.anthropic.com"
+    
     async def generate_sql(self, user_query: str, scoping_value: str, relevant_tables: List[str], schema_description: str) -> str:
         """Generate SQL using Anthropic Claude"""
         try:
@@ -279,8 +295,8 @@ class AnthropicProvider(BaseLLMProvider):
                 ]
             }
             
-            response = await self.client.post(
-                "https://api.anthropic.com/v1/messages",
+            response = await self._post(
+                f"{self.base_url}/v1/messages",
                 headers=headers,
                 json=data
             )
@@ -320,8 +336,8 @@ class AnthropicProvider(BaseLLMProvider):
                 ]
             }
             
-            response = await self.client.post(
-                "https://api.anthropic.com/v1/messages",
+            response = await self._post(
+                f"{self.base_url}/v1/messages",
                 headers=headers,
                 json=data
             )
@@ -353,8 +369,8 @@ class AnthropicProvider(BaseLLMProvider):
                     {"role": "user", "content": prompt}
                 ]
             }
-            response = await self.client.post(
-                "https://api.anthropic.com/v1/messages",
+            response = await self._post(
+                f"{self.base_url}/v1/messages",
                 headers=headers,
                 json=data
             )
@@ -381,8 +397,8 @@ class AnthropicProvider(BaseLLMProvider):
                     {"role": "user", "content": prompt}
                 ]
             }
-            response = await self.client.post(
-                "https://api.anthropic.com/v1/messages",
+            response = await self._post(
+                f"{self.base_url}/v1/messages",
                 headers=headers,
                 json=data
             )
@@ -396,6 +412,8 @@ class AnthropicProvider(BaseLLMProvider):
 class GoogleProvider(BaseLLMProvider):
     """Google Gemini LLM provider"""
     
+    default_base_url = "https://generativelanguage.googleapis.com"
+    
     async def generate_sql(self, user_query: str, scoping_value: str, relevant_tables: List[str], schema_description: str) -> str:
         """Generate SQL using Google Gemini"""
         try:
@@ -421,8 +439,8 @@ class GoogleProvider(BaseLLMProvider):
                 }
             }
             
-            response = await self.client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
+            response = await self._post(
+                f"{self.base_url}/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
                 headers=headers,
                 json=data
             )
@@ -467,8 +485,8 @@ class GoogleProvider(BaseLLMProvider):
                 }
             }
             
-            response = await self.client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
+            response = await self._post(
+                f"{self.base_url}/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
                 headers=headers,
                 json=data
             )
@@ -497,8 +515,8 @@ class GoogleProvider(BaseLLMProvider):
                     "temperature": 0.0
                 }
             }
-            response = await self.client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
+            response = await self._post(
+                f"{self.base_url}/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
                 headers=headers,
                 json=data
             )
@@ -522,8 +540,8 @@ class GoogleProvider(BaseLLMProvider):
                     "temperature": self.config.temperature
                 }
             }
-            response = await self.client.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
+            response = await self._post(
+                f"{self.base_url}/v1beta/models/{self.config.model}:generateContent?key={self.config.api_key}",
                 headers=headers,
                 json=data
             )
@@ -557,8 +575,8 @@ class CustomProvider(BaseLLMProvider):
                 "stop": ["\n\n", "Human:", "Assistant:"]
             }
             
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -598,8 +616,8 @@ class CustomProvider(BaseLLMProvider):
                 "stop": ["\n\n", "Human:", "Assistant:"]
             }
             
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -630,8 +648,8 @@ class CustomProvider(BaseLLMProvider):
                 "max_tokens": min(600, self.config.max_tokens),
                 "temperature": 0.0
             }
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -657,8 +675,8 @@ class CustomProvider(BaseLLMProvider):
                 "max_tokens": self.config.max_tokens,
                 "temperature": self.config.temperature
             }
-            response = await self.client.post(
-                f"{self.config.base_url}/chat/completions",
+            response = await self._post(
+                f"{self.base_url}/chat/completions",
                 headers=headers,
                 json=data
             )
@@ -0,0 +1,303 @@
+"""
+Latency-aware routing of LLM calls across every configured provider.
+Each provider keeps an EWMA of its latency per operation (plan, SQL, explanation) and of its error rate; a call goes
+to the healthy provider (circuit breaker not open) with the lowest weighted score, and a small share of requests
+explores the others so their estimates do not go stale. Within one API request the first choice sticks, so the plan,
+the SQL and the explanation come from the same model unless that provider fails.
+Plan and SQL calls still running past the provider's observed p95 are hedged: a duplicate goes to the next best
+provider (or the same one when it is the only provider), the first valid answer wins and the other call is cancelled.
+A token budget caps hedges to a share of calls.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+
+from .config import settings
+from .llm_providers import BaseLLMProvider, LLMProviderFactory
+from .llm_limiter import llm_limiter
+from .middleware import circuit_breaker_middleware
+
+# Per-request route: {"request_id": ..., "provider": name or None}; a dict so choices made in child tasks stick
+_request_route: ContextVar[Optional[Dict[str, Any]]] = ContextVar("llm_request_route", default=None)
+
+
+def bind_request_route(request_id: str) -> Dict[str, Any]:
+    """Start sticky routing for the current request"""
+    route = {"request_id": request_id, "provider": None}
+    _request_route.set(route)
+    return route
+
+
+def get_request_provider() -> Optional[str]:
+    """Get the provider the current request is routed to, if any call has been made"""
+    route = _request_route.get()
+    return route["provider"] if route else None
+
+
+# Latency samples kept per provider and operation for percentiles
+LATENCY_WINDOW = 200
+
+
+class ProviderStats:
+    """EWMA latency per operation, recent latency samples and EWMA error rate of one provider"""
+
+    def __init__(self, initial_latency: float):
+        self.initial_latency = initial_latency
+        self.latency: Dict[str, float] = {}
+        self.samples: Dict[str, Deque[float]] = {}
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+
+    def get_latency(self, operation: str) -> float:
+        """EWMA latency of an operation; the operation-wide default until the first sample"""
+        return self.latency.get(operation, self.initial_latency)
+
+    def get_percentile(self, operation: str, percentile: float, min_samples: int) -> Optional[float]:
+        """Latency percentile of an operation, or None with fewer than min_samples samples"""
+        samples = self.samples.get(operation)
+        if samples is None or len(samples) < max(min_samples, 1):
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(len(ordered) * percentile), len(ordered) - 1)]
+
+    def record_latency(self, operation: str, seconds: float, alpha: float):
+        previous = self.latency.get(operation)
+        self.latency[operation] = seconds if previous is None else alpha * seconds + (1 - alpha) * previous
+        self.samples.setdefault(operation, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def record(self, operation: str, seconds: Optional[float], ok: bool, alpha: float):
+        self.calls += 1
+        if not ok:
+            self.failures += 1
+        self.error_rate = alpha * (0.0 if ok else 1.0) + (1 - alpha) * self.error_rate
+        if ok and seconds is not None:
+            self.record_latency(operation, seconds, alpha)
+
+
+class HedgeBudget:
+    """Token bucket refilled by every hedge-eligible call; a hedge spends one token"""
+
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = max(ratio, 0.0)
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+
+    def earn(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class LLMRouter:
+    """Routes each provider call to the fastest healthy provider, sticky per request"""
+
+    def __init__(self, default_provider: str, provider_names: Optional[List[str]] = None):
+        self.default_provider = default_provider
+        self.enabled = settings.ENABLE_LLM_ROUTER
+        self.alpha = min(max(settings.LLM_ROUTER_EWMA_ALPHA, 0.01), 1.0)
+        self.error_penalty = settings.LLM_ROUTER_ERROR_PENALTY
+        self.failover = settings.LLM_ROUTER_FAILOVER
+        self.explore_ratio = settings.LLM_ROUTER_EXPLORE_RATIO
+        self.weights = settings.get_llm_router_weights()
+        if provider_names is None:
+            provider_names = self._get_provider_names()
+        self.providers: Dict[str, BaseLLMProvider] = {}
+        for name in provider_names:
+            try:
+                self.providers[name] = LLMProviderFactory.create_provider(settings.get_llm_config(name))
+            except ValueError:
+                continue
+        if default_provider not in self.providers:
+            self.providers[default_provider] = LLMProviderFactory.create_provider(settings.get_llm_config(default_provider))
+        initial_latency = settings.LLM_ROUTER_INITIAL_LATENCY_MS / 1000.0
+        self.stats: Dict[str, ProviderStats] = {name: ProviderStats(initial_latency) for name in self.providers}
+        self.sticky_hits = 0
+        self.failovers = 0
+        self.explorations = 0
+        self.hedging = settings.ENABLE_LLM_HEDGING
+        self.hedge_operations = {operation.strip() for operation in settings.LLM_HEDGE_OPERATIONS.split(',') if operation.strip()}
+        self.hedge_percentile = settings.LLM_HEDGE_PERCENTILE
+        self.hedge_min_samples = settings.LLM_HEDGE_MIN_SAMPLES
+        self.hedge_default_delay = settings.LLM_HEDGE_DEFAULT_DELAY_MS / 1000.0
+        self.hedge_min_delay = settings.LLM_HEDGE_MIN_DELAY_MS / 1000.0
+        self.hedge_budget = HedgeBudget(settings.LLM_HEDGE_BUDGET_RATIO, settings.LLM_HEDGE_BUDGET_BURST)
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+        self.hedges_over_budget = 0
+
+    def _get_provider_names(self) -> List[str]:
+        """Providers to route across: LLM_ROUTER_PROVIDERS, else every configured provider"""
+        if not self.enabled:
+            return [self.default_provider]
+        names = [name.strip().lower() for name in settings.LLM_ROUTER_PROVIDERS.split(',') if name.strip()]
+        available = settings.get_available_providers()
+        return [name for name in (names or available) if name in available] or [self.default_provider]
+
+    def is_healthy(self, name: str) -> bool:
+        """Check that the provider's circuit breaker would let a call through"""
+        return not circuit_breaker_middleware.get_circuit_breaker(name).is_open() and not llm_limiter.is_paused(name)
+
+    def score(self, name: str, operation: str) -> float:
+        """Lower is better: EWMA latency, inflated by the error rate and divided by the provider weight"""
+        stats = self.stats[name]
+        weight = max(float(self.weights.get(name, 1.0)), 0.01)
+        return stats.get_latency(operation) * (1 + self.error_penalty * stats.error_rate) / weight
+
+    def rank(self, operation: str, exclude: Optional[List[str]] = None) -> List[str]:
+        """Healthy providers from best to worst for an operation (all of them if none is healthy)"""
+        candidates = [name for name in self.providers if name not in (exclude or [])]
+        healthy = [name for name in candidates if self.is_healthy(name)]
+        # Default provider first on ties so a cold start behaves like single-provider mode
+        return sorted(healthy or candidates, key=lambda name: (self.score(name, operation), name != self.default_provider))
+
+    def choose(self, operation: str, exclude: Optional[List[str]] = None) -> Optional[str]:
+        """Pick the provider for a call: the request's sticky provider while it is healthy, else the best ranked"""
+        route = _request_route.get()
+        sticky = route["provider"] if route else None
+        if sticky in self.providers and sticky not in (exclude or []) and self.is_healthy(sticky):
+            self.sticky_hits += 1
+            return sticky
+        ranked = self.rank(operation, exclude)
+        if not ranked:
+            return None
+        choice = ranked[0]
+        if len(ranked) > 1 and not exclude and random.random() < self.explore_ratio:
+            choice = random.choice(ranked[1:])
+            self.explorations += 1
+        if route is not None:
+            route["provider"] = choice
+        return choice
+
+    async def call(self, operation: str, *args, **kwargs) -> Any:
+        """Run a provider method (generate_plan, generate_sql_from_plan, explain_results, ...) on the routed provider"""
+        tried: List[str] = []
+        while True:
+            name = self.choose(operation, tried)
+            if name is None:
+                raise Exception(f"No LLM provider available for {operation}")
+            tried.append(name)
+            try:
+                if self.hedging and operation in self.hedge_operations:
+                    return await self._call_hedged(name, operation, tried, args, kwargs)
+                return await self._call_provider(name, operation, args, kwargs)
+            except Exception:
+                if not self.failover or len(tried) >= len(self.providers):
+                    raise
+                self.failovers += 1
+
+    async def _call_provider(self, name: str, operation: str, args: tuple, kwargs: dict) -> Any:
+        """Call one provider through its circuit breaker, recording latency and outcome"""
+        started = time.perf_counter()
+        try:
+            result = await circuit_breaker_middleware.execute_with_circuit_breaker(
+                name, getattr(self.providers[name], operation), *args, **kwargs
+            )
+        except asyncio.CancelledError:
+            # A hedged-out call was at least this slow; keep it in the latency estimate
+            self.stats[name].record_latency(operation, time.perf_counter() - started, self.alpha)
+            raise
+        except Exception:
+            self.stats[name].record(operation, None, False, self.alpha)
+            raise
+        self.stats[name].record(operation, time.perf_counter() - started, True, self.alpha)
+        return result
+
+    def get_hedge_delay(self, name: str, operation: str) -> float:
+        """Seconds to wait for a provider before hedging: its observed latency percentile for the operation"""
+        percentile = self.stats[name].get_percentile(operation, self.hedge_percentile, self.hedge_min_samples)
+        return max(percentile if percentile is not None else self.hedge_default_delay, self.hedge_min_delay)
+
+    def _choose_hedge(self, operation: str, tried: List[str], primary: str) -> str:
+        """Next best healthy provider, else the primary again (a duplicate call to the same provider)"""
+        ranked = [name for name in self.rank(operation, tried) if self.is_healthy(name)]
+        return ranked[0] if ranked else primary
+
+    async def _call_hedged(self, name: str, operation: str, tried: List[str], args: tuple, kwargs: dict) -> Any:
+        """Call a provider and, if it runs past its p95, race a duplicate call; the first valid answer wins"""
+        self.hedge_budget.earn()
+        primary = asyncio.ensure_future(self._call_provider(name, operation, args, kwargs))
+        tasks = {primary: name}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.get_hedge_delay(name, operation))
+            if done:
+                return primary.result()
+            if not self.hedge_budget.try_spend():
+                self.hedges_over_budget += 1
+                return await primary
+            hedge_name = self._choose_hedge(operation, tried, name)
+            if hedge_name not in tried:
+                tried.append(hedge_name)
+            tasks[asyncio.ensure_future(self._call_provider(hedge_name, operation, args, kwargs))] = hedge_name
+            self.hedges_sent += 1
+
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result_error = task.exception()
+                    if result_error is None and not (isinstance(task.result(), str) and not task.result().strip()):
+                        winner = tasks[task]
+                        if task is not primary:
+                            self.hedge_wins += 1
+                            # Later calls of the request follow the provider that answered
+                            route = _request_route.get()
+                            if route is not None:
+                                route["provider"] = winner
+                        return task.result()
+                    if error is None or task is primary:
+                        error = result_error or Exception(f"Empty {operation} response from {tasks[task]}")
+            raise error
+        finally:
+            # Cancel the losing call (or both, if the caller itself was cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_base_urls(self) -> List[str]:
+        """API base URLs of the routed providers"""
+        return [provider.base_url for provider in self.providers.values() if provider.base_url]
+
+    async def close(self):
+        """Close every provider"""
+        for provider in self.providers.values():
+            await provider.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-provider routing state"""
+        return {
+            'enabled': self.enabled,
+            'default_provider': self.default_provider,
+            'sticky_hits': self.sticky_hits,
+            'failovers': self.failovers,
+            'explorations': self.explorations,
+            'hedging': {
+                'enabled': self.hedging,
+                'operations': sorted(self.hedge_operations),
+                'hedges_sent': self.hedges_sent,
+                'hedge_wins': self.hedge_wins,
+                'over_budget': self.hedges_over_budget,
+                'budget_tokens': round(self.hedge_budget.tokens, 2)
+            },
+            'providers': {
+                name: {
+                    'model': provider.config.model,
+                    'weight': float(self.weights.get(name, 1.0)),
+                    'healthy': self.is_healthy(name),
+                    'latency_ewma_ms': {operation: round(seconds * 1000, 1) for operation, seconds in self.stats[name].latency.items()},
+                    'hedge_delay_ms': {operation: round(self.get_hedge_delay(name, operation) * 1000, 1) for operation in sorted(self.hedge_operations)},
+                    'error_rate_ewma': round(self.stats[name].error_rate, 3),
+                    'calls': self.stats[name].calls,
+                    'failures': self.stats[name].failures
+                }
+                for name, provider in self.providers.items()
+            }
+        }
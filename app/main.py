@@ -1,18 +1,40 @@
 import os
+import asyncio
+import json
 import time
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from fastapi import FastAPI, HTTPException, Depends, Request, status
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, field_validator, model_validator
 import uvicorn
 
 from .config import settings
 from .graph_builder import schema_graph
 from .llm_handler import LLMHandler
+from .http_clients import http_clients
 from .query_validator import get_query_validator
 from .db_executor import db_executor
+from .result_cache import result_cache
+from .llm_limiter import llm_limiter
+from .request_coalescing import request_coalescer, build_question_key
+from .table_watermarks import table_watermarks
+from .table_statistics import table_statistics
+from .rollup_rewriter import rollup_rewriter
+from .db_replicas import replica_router
+from .db_pool import db_health
+from .db_scheduler import db_scheduler, AdmissionRejectedError
+from .aggregate_fanout import aggregate_fanout
+from .approximate_count import approximate_counter
+from .pagination import keyset_paginator, ContinuationTokenError
+from .result_export import result_exporter, prepend_event, EXPORT_MEDIA_TYPES
+from .signed_tokens import SignedTokenError, check_signing_key, get_signing_key_warning
+from .result_formats import (
+    ROWS_FORMAT, COLUMNAR_FORMAT, ARROW_FORMAT, COLUMNAR_MEDIA_TYPE, ARROW_MEDIA_TYPE,
+    negotiate_result_format, is_arrow_available, get_result_dicts, to_column_arrays,
+    to_arrow_ipc, dumps_json, FastJSONResponse
+)
 from .intelligent_sql_generator import create_intelligent_sql_generator
 from .middleware import RequestResponseMiddleware, circuit_breaker_middleware
 from .error_codes import (
@@ -69,6 +91,12 @@ class QueryRequest(BaseModel):
     # Multi-role access control fields
     user_role: Optional[str] = Field(None, description="User role: 'customer', 'admin'")
     
+    # Response format (overrides the Accept header)
+    result_format: Optional[str] = Field(None, description="Result format: 'rows' (default), 'columnar' or 'arrow'")
+    
+    # Answer eligible COUNT(*) queries from estimates (the response carries an exact_token for the exact value)
+    approximate: bool = Field(False, description="Allow an approximate answer for COUNT queries")
+    
     # Backward compatibility
     @model_validator(mode='before')
     @classmethod
@@ -90,6 +118,33 @@ class QueryResponse(BaseModel):
     error: Optional[str] = None
     execution_time: float
     tables_used: List[str]
+    continuation_token: Optional[str] = None
+    query_token: Optional[str] = None
+    approximate: Optional[Dict[str, Any]] = None
+    exact_token: Optional[str] = None
+    truncated: bool = False
+    truncated_columns: List[str] = []
+
+class NextPageRequest(BaseModel):
+    continuation_token: str = Field(..., description="Continuation token from a previous page")
+    scoping_value: Optional[str] = Field(None, description="Scoping value the token was issued for")
+    entity_id: Optional[str] = Field(None, description="Entity ID for data scoping (legacy field)")
+    user_role: Optional[str] = Field(None, description="User role the token was issued for")
+    result_format: Optional[str] = Field(None, description="Result format: 'rows' (default), 'columnar' or 'arrow'")
+
+class ExportRequest(BaseModel):
+    query_token: str = Field(..., description="Query token from a previous query response")
+    format: str = Field("csv", description="Export format: 'csv' or 'parquet'")
+    scoping_value: Optional[str] = Field(None, description="Scoping value the token was issued for")
+    entity_id: Optional[str] = Field(None, description="Entity ID for data scoping (legacy field)")
+    user_role: Optional[str] = Field(None, description="User role the token was issued for")
+
+class ExactCountRequest(BaseModel):
+    exact_token: str = Field(..., description="Exact-count token from an approximate query response")
+    scoping_value: Optional[str] = Field(None, description="Scoping value the token was issued for")
+    entity_id: Optional[str] = Field(None, description="Entity ID for data scoping (legacy field)")
+    user_role: Optional[str] = Field(None, description="User role the token was issued for")
+    result_format: Optional[str] = Field(None, description="Result format: 'rows' (default), 'columnar' or 'arrow'")
 
 class HealthResponse(BaseModel):
     status: str
@@ -98,6 +153,14 @@ class HealthResponse(BaseModel):
     schema_loaded: bool
     llm_provider_info: Optional[Dict] = None
     circuit_breaker_status: Optional[Dict] = None
+    database_replicas: Optional[Dict] = None
+    database_pool: Optional[Dict] = None
+    database_health: Optional[Dict] = None
+    database_scheduler: Optional[Dict] = None
+    llm_http_clients: Optional[Dict] = None
+    llm_routing: Optional[Dict] = None
+    llm_limits: Optional[Dict] = None
+    query_coalescing: Optional[Dict] = None
     warnings: List[str] = []
     timestamp: str
 
@@ -139,16 +202,30 @@ async def startup_event():
     global llm_handler, intelligent_sql_generator
     
     try:
+        # Tokens carry SQL that is replayed: without a private signing key their features stay off
+        check_signing_key()
+        
         # Test database connection
         if not db_executor.test_connection():
             raise Exception("Database connection failed")
         
+        # Open pool connections before traffic arrives
+        if settings.DB_POOL_WARMUP_CONNECTIONS > 0:
+            await asyncio.to_thread(db_executor.warm_pool)
+        
         # Initialize LLM handler
         try:
             llm_handler = LLMHandler()
         except Exception as e:
             raise
         
+        # Open connections to the LLM provider host before traffic arrives
+        if settings.LLM_HTTP_WARMUP_CONNECTIONS > 0:
+            try:
+                await http_clients.warm(llm_handler.router.get_base_urls())
+            except Exception as e:
+                pass
+        
         # Initialize intelligent SQL generator
         try:
             validator = get_query_validator(schema_graph)
@@ -156,6 +233,21 @@ async def startup_event():
         except Exception as e:
             raise
         
+        # Start table watermark poller for result cache invalidation
+        table_watermarks.start()
+        
+        # Start table statistics collection
+        table_statistics.start()
+        
+        # Start rollup freshness refresh
+        rollup_rewriter.start()
+        
+        # Start read replica health checks
+        replica_router.start()
+        
+        # Start the cached database health probe
+        db_health.start()
+        
     except Exception as e:
         raise
 
@@ -170,6 +262,42 @@ async def shutdown_event():
             except Exception as e:
                 pass
         
+        # Close shared LLM HTTP clients
+        try:
+            await http_clients.close()
+        except Exception as e:
+            pass
+        
+        # Stop table watermark poller
+        try:
+            await table_watermarks.stop()
+        except Exception as e:
+            pass
+        
+        # Stop table statistics collection
+        try:
+            await table_statistics.stop()
+        except Exception as e:
+            pass
+        
+        # Stop rollup freshness refresh
+        try:
+            await rollup_rewriter.stop()
+        except Exception as e:
+            pass
+        
+        # Stop read replica health checks
+        try:
+            await replica_router.stop()
+        except Exception as e:
+            pass
+        
+        # Stop the database health probe
+        try:
+            await db_health.stop()
+        except Exception as e:
+            pass
+        
         # Close database connection
         try:
             db_executor.close()
@@ -220,78 +348,320 @@ async def health_check():
             if not uses_configured_column:
                 warnings.append(f"Configured scoping column '{scoping_column}' not found in any scoped tables. Check schema configuration.")
     
+    # Check read replica availability
+    database_replicas = None
+    if replica_router.enabled:
+        database_replicas = replica_router.get_stats()
+        if not any(replica['available'] for replica in database_replicas['replicas']):
+            fallback = "running on the primary database" if replica_router.fallback_to_primary else "failing"
+            warnings.append(f"All read replicas are ejected; queries are {fallback}.")
+    
+    # Database connectivity comes from the background probe, not a connection per health check
+    database_connected = await db_health.is_connected()
+    database_pool = db_executor.get_pool_stats()
+    if database_pool.get('size') and database_pool['checked_out'] >= database_pool['size'] + settings.DB_MAX_OVERFLOW:
+        warnings.append("Database connection pool is exhausted; queries are waiting for connections.")
+    
+    signing_key_warning = get_signing_key_warning()
+    if signing_key_warning:
+        warnings.append(signing_key_warning)
+    
     return HealthResponse(
         status="healthy",
-        database_connected=db_executor.test_connection(),
+        database_connected=database_connected,
         llm_provider_connected=llm_provider_connected,
         schema_loaded=schema_graph.tables is not None,
         llm_provider_info=llm_provider_info,
         circuit_breaker_status=circuit_breaker_status,
+        database_replicas=database_replicas,
+        database_pool=database_pool,
+        database_health=db_health.get_stats(),
+        database_scheduler=db_scheduler.get_stats() if db_scheduler.enabled else None,
+        llm_http_clients=http_clients.get_stats(),
+        llm_routing=llm_handler.get_routing_stats() if llm_handler else None,
+        llm_limits=llm_limiter.get_stats(),
+        query_coalescing=request_coalescer.get_stats(),
         warnings=warnings,
         timestamp=datetime.now().isoformat()
     )
 
+async def prepare_query_sql(request: QueryRequest) -> Dict[str, Any]:
+    """Build user context, check scoping requirements and generate SQL for a query request"""
+    # Create user context if user information is provided
+    user_context = None
+    if request.user_role:
+        try:
+            print(f"Creating user context for role: {request.user_role}")
+            user_context = permission_manager.create_user_context(
+                role=request.user_role,
+                scoping_value=request.scoping_value or request.entity_id,
+                request_id=getattr(request, 'request_id', None)
+            )
+            print(f"User context created: {user_context.permissions}")
+        except ValueError as e:
+            error = ErrorHandler.create_error(
+                ErrorCodes.AUTH_INSUFFICIENT_PERMISSIONS,
+                {"error": str(e)}
+            )
+            return {"success": False, "sql": "", "error": error.error_code.message, "tables_used": []}
+    
+    # Get scoping value from request
+    scoping_value = request.scoping_value or request.entity_id
+    
+    # Validate scoping requirements based on user context
+    if user_context:
+        scoping_requirements = permission_manager.get_scoping_requirements(user_context)
+        print(f"Scoping requirements: {scoping_requirements}")
+        print(f"Scoping value: {scoping_value}")
+        if scoping_requirements.get('scoping_required', True) and not scoping_value:
+            error = ErrorHandler.create_error(
+                ErrorCodes.VAL_MISSING_SCOPING_VALUE,
+                {"query": request.query, "role": user_context.role}
+            )
+            return {"success": False, "sql": "", "error": error.error_code.message, "tables_used": []}
+    elif not scoping_value:
+        # Legacy behavior for backward compatibility
+        error = ErrorHandler.create_error(
+            ErrorCodes.VAL_MISSING_SCOPING_VALUE,
+            {"query": request.query}
+        )
+        return {"success": False, "sql": "", "error": error.error_code.message, "tables_used": []}
+    
+    # Use intelligent SQL generator with user context support; concurrent identical questions share one generation
+    sql_result = await request_coalescer.run(
+        "generation",
+        build_question_key(request.query, scoping_value, user_context.role if user_context else None, request.approximate),
+        lambda _: intelligent_sql_generator.generate_accurate_sql(request.query, scoping_value, user_context, request.approximate)
+    )
+    
+    if not sql_result["success"]:
+        return {
+            "success": False,
+            "sql": sql_result.get("sql", ""),
+            "error": sql_result.get("error", "SQL generation failed"),
+            "tables_used": sql_result.get("tables_used", [])
+        }
+    
+    return {
+        "success": True,
+        "sql": sql_result["sql"],
+        "tables_used": sql_result["tables_used"],
+        "user_context": user_context,
+        "scoping_value": scoping_value,
+        "execution_result": sql_result.get("execution_result")
+    }
+
+def revalidate_token_sql(sql: str, scoping_value: Optional[str], user_context) -> Dict[str, Any]:
+    """Validate a token's SQL again for the scope and role it is replayed under; raises SignedTokenError if it fails"""
+    validation = get_query_validator(schema_graph).validate_sql(sql, scoping_value, user_context)
+    if not validation["valid"]:
+        raise SignedTokenError(f"token SQL failed validation: {validation.get('error', 'invalid SQL')}")
+    # Issued SQL already carries its scoping filter; one the validator would have to add means a foreign query
+    if validation.get("modified_sql", sql).strip() != sql.strip():
+        raise SignedTokenError("token SQL is not scoped to this request")
+    return validation
+
+def get_execution_error_message(error_msg: str, final_sql: str) -> str:
+    """Map a database error message to the user-facing error code message"""
+    if "syntax" in error_msg.lower():
+        error_code = ErrorCodes.DB_INVALID_SQL_SYNTAX
+    elif "permission" in error_msg.lower() or "access denied" in error_msg.lower():
+        error_code = ErrorCodes.DB_PERMISSION_DENIED
+    elif "timeout" in error_msg.lower():
+        error_code = ErrorCodes.DB_TIMEOUT
+    elif error_msg == ErrorCodes.DB_QUEUE_FULL.message:
+        error_code = ErrorCodes.DB_QUEUE_FULL
+    else:
+        error_code = ErrorCodes.DB_QUERY_EXECUTION_FAILED
+    
+    error = ErrorHandler.create_error(
+        error_code,
+        {"database_error": error_msg, "sql": final_sql}
+    )
+    return error.error_code.message
+
+def create_exception_error(e: Exception) -> NL2SQLError:
+    """Create appropriate error based on exception type"""
+    if "llm" in str(type(e)).lower() or "openai" in str(type(e)).lower() or "anthropic" in str(type(e)).lower():
+        return create_llm_error(e, "query_generation")
+    elif "database" in str(type(e)).lower() or "sql" in str(type(e)).lower():
+        return create_database_error(e, "query_execution")
+    elif "validation" in str(type(e)).lower():
+        return create_validation_error(e, "query_processing")
+    return create_system_error(e, "query_processing")
+
+def get_cache_headers(execution_result: Dict[str, Any]) -> Dict[str, str]:
+    """Build cache-status headers for an execution result"""
+    cache_info = execution_result.get("cache")
+    if cache_info:
+        return {"X-Cache": cache_info["status"], "Age": str(cache_info["age"])}
+    return {"X-Cache": "MISS" if result_cache.enabled else "BYPASS"}
+
+def get_requested_result_format(requested: Optional[str], http_request: Request) -> Optional[str]:
+    """Negotiate the result format; None if it is unsupported"""
+    result_format = negotiate_result_format(requested, http_request.headers.get("accept"))
+    if result_format not in (ROWS_FORMAT, COLUMNAR_FORMAT, ARROW_FORMAT):
+        return None
+    if result_format == ARROW_FORMAT and not is_arrow_available():
+        return None
+    return result_format
+
+async def execute_cached(
+    sql: str,
+    params: Optional[Dict[str, Any]],
+    scoping_value: Optional[str],
+    user_context,
+    relevant_tables: List[str],
+    http_request: Request
+) -> Dict[str, Any]:
+    """Execute SQL through the result cache with the per-role time budget"""
+    cache_key = result_cache.build_key(sql, scoping_value, user_context.role if user_context else None, params)
+    execution_result = result_cache.get(cache_key)
+    if execution_result is None:
+        # Concurrent misses for the same key share one execution, abandoned only once every caller disconnects
+        execution_result = await request_coalescer.run(
+            "execution",
+            cache_key,
+            lambda is_disconnected: execute_uncached(
+                sql, params, scoping_value, user_context, relevant_tables, cache_key, is_disconnected
+            ),
+            http_request.is_disconnected
+        )
+    return execution_result
+
+async def execute_uncached(
+    sql: str,
+    params: Optional[Dict[str, Any]],
+    scoping_value: Optional[str],
+    user_context,
+    relevant_tables: List[str],
+    cache_key: str,
+    is_disconnected
+) -> Dict[str, Any]:
+    """Execute SQL (fanned out when possible) and store the result in the cache"""
+    table_versions = result_cache.snapshot_versions(relevant_tables)
+    # Cross-tenant aggregates for all_entities roles run as concurrent scoping-range partitions
+    fanout_plan = await aggregate_fanout.plan(sql, user_context) if params is None else None
+    if fanout_plan is not None:
+        execution_result = await aggregate_fanout.execute(fanout_plan, user_context, is_disconnected)
+    else:
+        execution_result = await db_executor.execute_query_guarded(
+            sql,
+            params,
+            user_context=user_context,
+            is_disconnected=is_disconnected,
+            as_dicts=False,
+            scoping_value=scoping_value
+        )
+    result_cache.put(cache_key, execution_result, relevant_tables, table_versions)
+    return execution_result
+
+def is_truncated(execution_result: Dict[str, Any]) -> bool:
+    """Check whether a result stopped at the byte budget or had oversized cells cut"""
+    return bool(execution_result.get("truncated") or execution_result.get("truncated_columns"))
+
+def build_query_response(
+    result_format: str,
+    sql: str,
+    execution_result: Dict[str, Any],
+    relevant_tables: List[str],
+    execution_time: float,
+    headers: Dict[str, str],
+    explanation: Optional[str] = None,
+    result_dicts: Optional[List[Dict]] = None,
+    continuation_token: Optional[str] = None,
+    query_token: Optional[str] = None,
+    exact_token: Optional[str] = None
+) -> Response:
+    """Render a successful execution result in the requested format"""
+    if result_format == COLUMNAR_FORMAT:
+        columns = execution_result.get("columns", [])
+        payload = {
+            "success": True,
+            "sql": sql,
+            "columns": columns,
+            "data": to_column_arrays(columns, execution_result.get("rows") or []),
+            "row_count": execution_result["row_count"],
+            "explanation": explanation,
+            "error": None,
+            "execution_time": execution_time,
+            "tables_used": relevant_tables,
+            "continuation_token": continuation_token,
+            "query_token": query_token,
+            "approximate": execution_result.get("approximate"),
+            "exact_token": exact_token,
+            "truncated": is_truncated(execution_result),
+            "truncated_columns": execution_result.get("truncated_columns", [])
+        }
+        return FastJSONResponse(
+            content=payload,
+            media_type=COLUMNAR_MEDIA_TYPE,
+            headers=headers
+        )
+    if result_format == ARROW_FORMAT:
+        metadata = {
+            "sql": sql,
+            "row_count": str(execution_result["row_count"]),
+            "execution_time": str(execution_time),
+            "tables_used": json.dumps(relevant_tables)
+        }
+        if explanation:
+            metadata["explanation"] = explanation
+        if continuation_token:
+            metadata["continuation_token"] = continuation_token
+        if query_token:
+            metadata["query_token"] = query_token
+        if execution_result.get("approximate"):
+            metadata["approximate"] = json.dumps(execution_result["approximate"])
+        if exact_token:
+            metadata["exact_token"] = exact_token
+        if is_truncated(execution_result):
+            metadata["truncated"] = "true"
+            metadata["truncated_columns"] = json.dumps(execution_result.get("truncated_columns", []))
+        return Response(
+            content=to_arrow_ipc(execution_result.get("columns", []), execution_result.get("rows") or [], metadata),
+            media_type=ARROW_MEDIA_TYPE,
+            headers=headers
+        )
+    
+    # Same shape as QueryResponse, serialized without per-row model validation
+    return FastJSONResponse(
+        content={
+            "success": True,
+            "sql": sql,
+            "results": result_dicts if result_dicts is not None else get_result_dicts(execution_result),
+            "row_count": execution_result["row_count"],
+            "explanation": explanation,
+            "error": None,
+            "execution_time": execution_time,
+            "tables_used": relevant_tables,
+            "continuation_token": continuation_token,
+            "query_token": query_token,
+            "approximate": execution_result.get("approximate"),
+            "exact_token": exact_token,
+            "truncated": is_truncated(execution_result),
+            "truncated_columns": execution_result.get("truncated_columns", [])
+        },
+        headers=headers
+    )
+
 # Main query endpoint (v2)
 @api_v2.post("/query", response_model=QueryResponse)
 async def process_query_v2(
     request: QueryRequest,
+    http_request: Request,
+    response: Response,
     rate_limit: None = Depends(check_rate_limit)
 ):
     """Process natural language query and return SQL results with multi-role access control"""
     start_time = time.time()
     
     try:
-        # Create user context if user information is provided
-        user_context = None
-        if request.user_role:
-            try:
-                print(f"Creating user context for role: {request.user_role}")
-                user_context = permission_manager.create_user_context(
-                    role=request.user_role,
-                    scoping_value=request.scoping_value or request.entity_id,
-                    request_id=getattr(request, 'request_id', None)
-                )
-                print(f"User context created: {user_context.permissions}")
-            except ValueError as e:
-                error = ErrorHandler.create_error(
-                    ErrorCodes.AUTH_INSUFFICIENT_PERMISSIONS,
-                    {"error": str(e)}
-                )
-                return QueryResponse(
-                    success=False,
-                    sql="",
-                    results=[],
-                    row_count=0,
-                    error=error.error_code.message,
-                    execution_time=time.time() - start_time
-                )
-        
-        # Get scoping value from request
-        scoping_value = request.scoping_value or request.entity_id
-        
-        # Validate scoping requirements based on user context
-        if user_context:
-            scoping_requirements = permission_manager.get_scoping_requirements(user_context)
-            print(f"Scoping requirements: {scoping_requirements}")
-            print(f"Scoping value: {scoping_value}")
-            if scoping_requirements.get('scoping_required', True) and not scoping_value:
-                error = ErrorHandler.create_error(
-                    ErrorCodes.VAL_MISSING_SCOPING_VALUE,
-                    {"query": request.query, "role": user_context.role}
-                )
-                return QueryResponse(
-                    success=False,
-                    sql="",
-                    results=[],
-                    row_count=0,
-                    error=error.error_code.message,
-                    execution_time=time.time() - start_time
-                )
-        elif not scoping_value:
-            # Legacy behavior for backward compatibility
+        result_format = get_requested_result_format(request.result_format, http_request)
+        if result_format is None:
             error = ErrorHandler.create_error(
-                ErrorCodes.VAL_MISSING_SCOPING_VALUE,
-                {"query": request.query}
+                ErrorCodes.REQ_UNSUPPORTED_RESULT_FORMAT,
+                {"result_format": request.result_format or http_request.headers.get("accept")}
             )
             return QueryResponse(
                 success=False,
@@ -299,92 +669,311 @@ async def process_query_v2(
                 results=[],
                 row_count=0,
                 error=error.error_code.message,
-                execution_time=time.time() - start_time
+                execution_time=time.time() - start_time,
+                tables_used=[]
             )
         
-        # Use intelligent SQL generator with user context support
-        sql_result = await intelligent_sql_generator.generate_accurate_sql(
-            request.query, 
-            scoping_value,
-            user_context
-        )
-        
-        if not sql_result["success"]:
+        prepared = await prepare_query_sql(request)
+        if not prepared["success"]:
             return QueryResponse(
                 success=False,
-                sql=sql_result.get("sql", ""),
+                sql=prepared["sql"],
                 results=[],
                 row_count=0,
-                error=sql_result.get("error", "SQL generation failed"),
+                error=prepared["error"],
                 execution_time=time.time() - start_time,
-                tables_used=sql_result.get("tables_used", [])
+                tables_used=prepared["tables_used"]
             )
         
-        final_sql = sql_result["sql"]
-        relevant_tables = sql_result["tables_used"]
-        
-        # Step 4: Execute SQL
-        execution_result = db_executor.execute_query(final_sql)
+        final_sql = prepared["sql"]
+        relevant_tables = prepared["tables_used"]
+        user_context = prepared["user_context"]
+        role = user_context.role if user_context else None
         
-        if not execution_result["success"]:
-            # Map database error to appropriate error code
-            error_msg = execution_result["error"]
-            if "syntax" in error_msg.lower():
-                error_code = ErrorCodes.DB_INVALID_SQL_SYNTAX
-            elif "permission" in error_msg.lower() or "access denied" in error_msg.lower():
-                error_code = ErrorCodes.DB_PERMISSION_DENIED
-            elif "timeout" in error_msg.lower():
-                error_code = ErrorCodes.DB_TIMEOUT
+        # Step 4: Execute SQL (skipped when the generator already executed it as validation)
+        execution_result = prepared["execution_result"]
+        # List-style queries run as the first keyset page so later pages need no LLM call
+        # (execute-as-validation runs them the same way)
+        page_plan = keyset_paginator.plan(final_sql)
+        if execution_result is None and request.approximate:
+            execution_result = await approximate_counter.answer(
+                final_sql, prepared["user_context"], prepared["scoping_value"]
+            )
+        if execution_result is None:
+            if page_plan is not None:
+                page_sql, page_params = keyset_paginator.build_page_sql(page_plan)
             else:
-                error_code = ErrorCodes.DB_QUERY_EXECUTION_FAILED
-            
-            error = ErrorHandler.create_error(
-                error_code,
-                {"database_error": error_msg, "sql": final_sql}
+                page_sql, page_params = final_sql, None
+            execution_result = await execute_cached(
+                page_sql, page_params, prepared["scoping_value"], user_context, relevant_tables, http_request
             )
-            
+        
+        cache_headers = get_cache_headers(execution_result)
+        response.headers.update(cache_headers)
+        
+        if not execution_result["success"]:
             return QueryResponse(
                 success=False,
                 sql=final_sql,
                 results=[],
                 row_count=0,
-                error=error.error_code.message,
+                error=get_execution_error_message(execution_result["error"], final_sql),
                 execution_time=time.time() - start_time,
                 tables_used=relevant_tables
             )
         
+        continuation_token = None
+        if page_plan is not None:
+            continuation_token = keyset_paginator.finish_page(
+                page_plan, execution_result, prepared["scoping_value"], role, relevant_tables
+            )
+        
+        # Exact counts feed later approximate answers; approximate ones get a token for the exact value
+        exact_token = None
+        if execution_result.get("approximate"):
+            exact_token = approximate_counter.create_exact_token(
+                final_sql, prepared["scoping_value"], role, relevant_tables
+            )
+        else:
+            approximate_counter.record(final_sql, execution_result)
+        
+        # Query token lets the full result be exported later without another LLM call
+        query_token = None
+        if result_exporter.can_export(role):
+            query_token = result_exporter.create_query_token(
+                final_sql, prepared["scoping_value"], role, relevant_tables
+            )
+        
+        # Per-row dicts are only built for the default format or the explanation prompt
+        result_dicts = None
+        if result_format == ROWS_FORMAT or request.include_explanation:
+            result_dicts = get_result_dicts(execution_result)
+        
         # Step 5: Generate explanation if requested
         explanation = None
         if request.include_explanation:
             explanation = await llm_handler.explain_results(
                 request.query,
-                execution_result["data"],
+                result_dicts,
                 execution_result["row_count"]
             )
         
-        execution_time = time.time() - start_time
+        return build_query_response(
+            result_format,
+            final_sql,
+            execution_result,
+            relevant_tables,
+            time.time() - start_time,
+            cache_headers,
+            explanation=explanation,
+            result_dicts=result_dicts,
+            continuation_token=continuation_token,
+            query_token=query_token,
+            exact_token=exact_token
+        )
+        
+    except Exception as e:
+        nl2sql_error = create_exception_error(e)
         
         return QueryResponse(
-            success=True,
-            sql=final_sql,
-            results=execution_result["data"],
-            row_count=execution_result["row_count"],
-            explanation=explanation,
-            error=None,
-            execution_time=execution_time,
-            tables_used=relevant_tables
+            success=False,
+            sql="",
+            results=[],
+            row_count=0,
+            error=nl2sql_error.error_code.message,
+            execution_time=time.time() - start_time,
+            tables_used=[]
+        )
+
+# Next page endpoint (v2)
+@api_v2.post("/query/next", response_model=QueryResponse)
+async def process_query_next_v2(
+    request: NextPageRequest,
+    http_request: Request,
+    response: Response,
+    rate_limit: None = Depends(check_rate_limit)
+):
+    """Fetch the next page of a list query from its continuation token, without an LLM call"""
+    start_time = time.time()
+    
+    try:
+        result_format = get_requested_result_format(request.result_format, http_request)
+        if result_format is None:
+            error = ErrorHandler.create_error(
+                ErrorCodes.REQ_UNSUPPORTED_RESULT_FORMAT,
+                {"result_format": request.result_format or http_request.headers.get("accept")}
+            )
+            return QueryResponse(
+                success=False,
+                sql="",
+                results=[],
+                row_count=0,
+                error=error.error_code.message,
+                execution_time=time.time() - start_time,
+                tables_used=[]
+            )
+        
+        # The token is bound to the scoping value and role it was issued for, and its SQL is validated again
+        try:
+            token = keyset_paginator.parse_token(request.continuation_token)
+            scoping_value = request.scoping_value or request.entity_id
+            if token["scope"] != scoping_value or token["role"] != request.user_role:
+                raise ContinuationTokenError("token was issued for a different scope or role")
+            user_context = None
+            if request.user_role:
+                user_context = permission_manager.create_user_context(
+                    role=request.user_role,
+                    scoping_value=scoping_value
+                )
+            validation = revalidate_token_sql(token["plan"].base_sql, scoping_value, user_context)
+        except (ContinuationTokenError, SignedTokenError) as e:
+            error = ErrorHandler.create_error(
+                ErrorCodes.REQ_INVALID_CONTINUATION_TOKEN,
+                {"error": str(e)}
+            )
+            return QueryResponse(
+                success=False,
+                sql="",
+                results=[],
+                row_count=0,
+                error=error.error_code.message,
+                execution_time=time.time() - start_time,
+                tables_used=[]
+            )
+        
+        page_plan = token["plan"]
+        relevant_tables = validation.get("tables", token["tables"])
+        page_sql, page_params = keyset_paginator.build_page_sql(page_plan, token["after"])
+        execution_result = await execute_cached(
+            page_sql, page_params, scoping_value, user_context, relevant_tables, http_request
+        )
+        
+        cache_headers = get_cache_headers(execution_result)
+        response.headers.update(cache_headers)
+        
+        if not execution_result["success"]:
+            return QueryResponse(
+                success=False,
+                sql=page_plan.base_sql,
+                results=[],
+                row_count=0,
+                error=get_execution_error_message(execution_result["error"], page_plan.base_sql),
+                execution_time=time.time() - start_time,
+                tables_used=relevant_tables
+            )
+        
+        continuation_token = keyset_paginator.finish_page(
+            page_plan, execution_result, scoping_value, request.user_role, relevant_tables
+        )
+        
+        return build_query_response(
+            result_format,
+            page_plan.base_sql,
+            execution_result,
+            relevant_tables,
+            time.time() - start_time,
+            cache_headers,
+            continuation_token=continuation_token
         )
         
     except Exception as e:
-        # Create appropriate error based on exception type
-        if "llm" in str(type(e)).lower() or "openai" in str(type(e)).lower() or "anthropic" in str(type(e)).lower():
-            nl2sql_error = create_llm_error(e, "query_generation")
-        elif "database" in str(type(e)).lower() or "sql" in str(type(e)).lower():
-            nl2sql_error = create_database_error(e, "query_execution")
-        elif "validation" in str(type(e)).lower():
-            nl2sql_error = create_validation_error(e, "query_processing")
-        else:
-            nl2sql_error = create_system_error(e, "query_processing")
+        nl2sql_error = create_exception_error(e)
+        
+        return QueryResponse(
+            success=False,
+            sql="",
+            results=[],
+            row_count=0,
+            error=nl2sql_error.error_code.message,
+            execution_time=time.time() - start_time,
+            tables_used=[]
+        )
+
+# Exact count endpoint (v2)
+@api_v2.post("/query/exact", response_model=QueryResponse)
+async def process_query_exact_v2(
+    request: ExactCountRequest,
+    http_request: Request,
+    response: Response,
+    rate_limit: None = Depends(check_rate_limit)
+):
+    """Run the exact COUNT of a query that was answered approximately, without an LLM call"""
+    start_time = time.time()
+    
+    try:
+        result_format = get_requested_result_format(request.result_format, http_request)
+        if result_format is None:
+            error = ErrorHandler.create_error(
+                ErrorCodes.REQ_UNSUPPORTED_RESULT_FORMAT,
+                {"result_format": request.result_format or http_request.headers.get("accept")}
+            )
+            return QueryResponse(
+                success=False,
+                sql="",
+                results=[],
+                row_count=0,
+                error=error.error_code.message,
+                execution_time=time.time() - start_time,
+                tables_used=[]
+            )
+        
+        # The token is bound to the scoping value and role the query was validated for
+        scoping_value = request.scoping_value or request.entity_id
+        try:
+            token = approximate_counter.parse_exact_token(request.exact_token)
+            if token["scope"] != scoping_value or token["role"] != request.user_role:
+                raise SignedTokenError("token was issued for a different scope or role")
+            user_context = None
+            if request.user_role:
+                user_context = permission_manager.create_user_context(
+                    role=request.user_role,
+                    scoping_value=scoping_value
+                )
+            validation = revalidate_token_sql(token["sql"], scoping_value, user_context)
+        except SignedTokenError as e:
+            error = ErrorHandler.create_error(ErrorCodes.REQ_INVALID_QUERY_TOKEN, {"error": str(e)})
+            return QueryResponse(
+                success=False,
+                sql="",
+                results=[],
+                row_count=0,
+                error=error.error_code.message,
+                execution_time=time.time() - start_time,
+                tables_used=[]
+            )
+        
+        sql = token["sql"]
+        relevant_tables = validation.get("tables", token["tables"])
+        execution_result = await execute_cached(
+            sql, None, scoping_value, user_context, relevant_tables, http_request
+        )
+        
+        cache_headers = get_cache_headers(execution_result)
+        response.headers.update(cache_headers)
+        
+        if not execution_result["success"]:
+            return QueryResponse(
+                success=False,
+                sql=sql,
+                results=[],
+                row_count=0,
+                error=get_execution_error_message(execution_result["error"], sql),
+                execution_time=time.time() - start_time,
+                tables_used=relevant_tables
+            )
+        
+        approximate_counter.record(sql, execution_result)
+        return build_query_response(
+            result_format,
+            sql,
+            execution_result,
+            relevant_tables,
+            time.time() - start_time,
+            cache_headers
+        )
+        
+    except Exception as e:
+        nl2sql_error = create_exception_error(e)
         
         return QueryResponse(
             success=False,
@@ -396,6 +985,147 @@ async def process_query_v2(
             tables_used=[]
         )
 
+# Export endpoint (v2)
+@api_v2.post("/query/export")
+async def export_query_v2(
+    request: ExportRequest,
+    http_request: Request,
+    rate_limit: None = Depends(check_rate_limit)
+):
+    """Stream the full result of a previously validated query as CSV or Parquet"""
+    export_format = request.format.lower()
+    if export_format not in result_exporter.get_supported_formats():
+        raise ErrorHandler.create_error(
+            ErrorCodes.REQ_UNSUPPORTED_RESULT_FORMAT,
+            {"format": request.format, "supported_formats": result_exporter.get_supported_formats()}
+        )
+    
+    # The token is bound to the scoping value and role the query was validated for
+    scoping_value = request.scoping_value or request.entity_id
+    try:
+        token = result_exporter.parse_query_token(request.query_token)
+        if token["scope"] != scoping_value or token["role"] != request.user_role:
+            raise SignedTokenError("token was issued for a different scope or role")
+        user_context = None
+        if request.user_role:
+            user_context = permission_manager.create_user_context(
+                role=request.user_role,
+                scoping_value=scoping_value
+            )
+        revalidate_token_sql(token["sql"], scoping_value, user_context)
+    except ValueError as e:  # SignedTokenError, or a role that no longer exists
+        raise ErrorHandler.create_error(ErrorCodes.REQ_INVALID_QUERY_TOKEN, {"error": str(e)})
+    
+    if not result_exporter.can_export(request.user_role):
+        raise ErrorHandler.create_error(
+            ErrorCodes.AUTH_INSUFFICIENT_PERMISSIONS,
+            {"role": request.user_role, "operation": "export"}
+        )
+    
+    # Same scheduler slot, watchdog and KILL QUERY on disconnect as interactive queries, with the role's export caps
+    limits = result_exporter.get_limits(request.user_role)
+    events = db_executor.stream_query_guarded(
+        token["sql"],
+        user_context=user_context,
+        scoping_value=scoping_value,
+        is_disconnected=http_request.is_disconnected,
+        max_execution_time_ms=limits["max_execution_time_ms"],
+        batch_size=settings.EXPORT_BATCH_SIZE,
+        max_bytes=limits["max_bytes"],
+        apply_limit_guardrail=False,
+        max_cell_bytes=0
+    )
+    # Fail with a proper error status, not a 200 with an empty file, when the query cannot start
+    first = await events.__anext__()
+    if first["type"] == "error":
+        await events.aclose()
+        result = first["result"]
+        error_code = ErrorHandler.get_error_by_code(result.get("error_code") or "") or ErrorCodes.DB_QUERY_EXECUTION_FAILED
+        raise ErrorHandler.create_error(error_code, {"error": result.get("error"), **(result.get("error_details") or {})})
+    events = prepend_event(first, events)
+    if export_format == "parquet":
+        body = result_exporter.stream_parquet(events, max_rows=limits["max_rows"])
+    else:
+        body = result_exporter.stream_csv(events, max_rows=limits["max_rows"])
+    
+    filename = f"nl2sql-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Streaming query endpoint (v2)
+@api_v2.post("/query/stream")
+async def process_query_stream_v2(
+    request: QueryRequest,
+    http_request: Request,
+    rate_limit: None = Depends(check_rate_limit)
+):
+    """Process natural language query and stream results as NDJSON row batches"""
+    start_time = time.time()
+    
+    def ndjson(payload: Dict[str, Any]) -> bytes:
+        return dumps_json(payload) + b"\n"
+    
+    try:
+        prepared = await prepare_query_sql(request)
+    except Exception as e:
+        prepared = {"success": False, "sql": "", "error": create_exception_error(e).error_code.message, "tables_used": []}
+    
+    if not prepared["success"]:
+        error_line = ndjson({
+            "type": "error",
+            "sql": prepared["sql"],
+            "error": prepared["error"],
+            "tables_used": prepared["tables_used"]
+        })
+        return StreamingResponse(iter([error_line]), media_type="application/x-ndjson")
+    
+    final_sql = prepared["sql"]
+    max_execution_time_ms = db_executor.get_max_execution_time_ms(prepared["user_context"])
+    max_bytes = db_executor.get_max_result_bytes(prepared["user_context"])
+    
+    async def generate():
+        # Holds the tenant's scheduler slot; the watchdog kills the query if the client goes away
+        events = db_executor.stream_query_guarded(
+            final_sql,
+            user_context=prepared["user_context"],
+            scoping_value=prepared["scoping_value"],
+            is_disconnected=http_request.is_disconnected,
+            max_execution_time_ms=max_execution_time_ms,
+            max_bytes=max_bytes
+        )
+        try:
+            async for event in events:
+                if event["type"] == "columns":
+                    yield ndjson({
+                        "type": "meta",
+                        "sql": final_sql,
+                        "columns": event["columns"],
+                        "tables_used": prepared["tables_used"]
+                    })
+                elif event["type"] == "rows":
+                    yield ndjson({"type": "rows", "rows": event["rows"]})
+                elif event["type"] == "error":
+                    yield ndjson({
+                        "type": "error",
+                        "sql": final_sql,
+                        "error": get_execution_error_message(event["result"]["error"], final_sql)
+                    })
+                elif event["type"] == "end":
+                    yield ndjson({
+                        "type": "end",
+                        "row_count": event["row_count"],
+                        "truncated": event["truncated"],
+                        "truncated_columns": event["truncated_columns"],
+                        "execution_time": time.time() - start_time
+                    })
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 # Schema information endpoint (v2)
 @api_v2.get("/schema")
 async def get_schema_info_v2():
@@ -419,9 +1149,13 @@ async def get_table_info_v2(table_name: str):
         )
         raise error.to_http_exception()
     
-    # Get additional info from database
-    db_schema = db_executor.get_table_schema(table_name)
-    row_count = db_executor.get_table_row_count(table_name)
+    # Get additional info from database (statistics catalog, else a query in the caller's scheduler slot)
+    try:
+        db_schema = await db_executor.run_in_slot(db_executor.get_table_schema, table_name)
+        row_count = await db_executor.run_in_slot(db_executor.get_table_row_count, table_name)
+    except AdmissionRejectedError as e:
+        error = ErrorHandler.create_error(ErrorCodes.DB_QUEUE_FULL, {"reason": e.reason})
+        raise error.to_http_exception()
     
     return {
         "table_name": table_name,
@@ -499,6 +1233,7 @@ async def get_llm_providers():
     
     return {
         "current_provider": current_provider,
+        "routing": llm_handler.get_routing_stats() if llm_handler else None,
         "available_providers": available_providers,
         "supported_providers": supported_providers,
         "provider_configs": {
@@ -523,6 +1258,10 @@ async def root():
         "endpoints": {
             "v2": {
                 "POST /api/v2/query": "Process natural language query",
+                "POST /api/v2/query/stream": "Process natural language query and stream NDJSON results",
+                "POST /api/v2/query/next": "Fetch the next page of a list query from a continuation token",
+                "POST /api/v2/query/export": "Stream a validated query as CSV or Parquet from a query token",
+                "POST /api/v2/query/exact": "Run the exact count of an approximately answered query from its exact token",
                 "GET /api/v2/schema": "Get schema information",
                 "GET /api/v2/schema/{table_name}": "Get table information",
                 "GET /api/v2/providers": "Get LLM provider information"
@@ -6,6 +6,7 @@ from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import Response as StarletteResponse
 import json
+from .llm_limiter import CallUsage, LLMQueueTimeoutError, llm_limiter
 
 class RequestResponseMiddleware(BaseHTTPMiddleware):
     """Middleware for logging and monitoring request/response cycles"""
@@ -26,6 +27,9 @@ class RequestResponseMiddleware(BaseHTTPMiddleware):
         # Generate request ID
         request_id = str(uuid.uuid4())
         request.state.request_id = request_id
+        # LLM calls made for this request stick to one provider
+        from .llm_router import bind_request_route
+        route = bind_request_route(request_id)
         
         # Start timing
         start_time = time.time()
@@ -62,6 +66,8 @@ class RequestResponseMiddleware(BaseHTTPMiddleware):
             # Add response headers
             response.headers["X-Request-ID"] = request_id
             response.headers["X-Response-Time"] = str(response_time)
+            if route["provider"]:
+                response.headers["X-LLM-Provider"] = route["provider"]
             
             # Log response (disabled)
             
@@ -151,6 +157,10 @@ class CircuitBreaker:
         
         return False
     
+    def is_open(self) -> bool:
+        """Check whether calls would be rejected right now (without moving to HALF_OPEN)"""
+        return self.state == CircuitBreakerState.OPEN and not self._should_attempt_reset()
+    
     def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to attempt reset"""
         if self.last_failure_time is None:
@@ -225,11 +235,21 @@ class CircuitBreakerMiddleware:
             # Circuit breaker is OPEN
             raise Exception(error_msg)
         
+        # Adaptive concurrency and tokens-per-minute limits; LLMQueueTimeoutError when the call cannot start in time
+        usage = CallUsage()
         try:
-            result = await operation(*args, **kwargs)
+            result = await llm_limiter.run(
+                provider_name,
+                getattr(operation, "__name__", "call"),
+                lambda: operation(*args, **kwargs),
+                usage
+            )
             circuit_breaker.record_success()
             return result
         except circuit_breaker.expected_exception as e:
+            # A 429 or a full queue is backpressure the limiter handles, not a provider failure
+            if usage.rate_limited or isinstance(e, LLMQueueTimeoutError):
+                raise
             circuit_breaker.record_failure()
             # Circuit breaker recorded failure
             raise
@@ -0,0 +1,247 @@
+"""
+Keyset pagination for list-style query results.
+Pages are fetched by wrapping the validated SQL as a derived table ordered by a key; continuation tokens are signed.
+"""
+import base64
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .config import settings
+from .sql_clauses import parse_clauses, strip_clauses
+from .signed_tokens import create_signed_token, is_signing_key_configured, parse_signed_token, SignedTokenError
+
+TOKEN_KIND = "page"
+PAGE_ALIAS = "_page"
+
+
+class ContinuationTokenError(ValueError):
+    """Raised when a continuation token is malformed, tampered with or expired"""
+
+
+@dataclass
+class PagePlan:
+    """How to page through a query: the unordered base SQL and its ordering key"""
+    base_sql: str
+    key: List[Tuple[str, bool]]  # (output column, descending)
+    page_size: int
+
+
+class KeysetPaginator:
+    """Builds keyset page queries and signs continuation tokens"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_PAGINATION
+        self.token_ttl = settings.PAGINATION_TOKEN_TTL_SECONDS
+
+    @property
+    def page_size(self) -> int:
+        return settings.security.DEFAULT_LIMIT
+
+    def plan(self, sql: str) -> Optional[PagePlan]:
+        """Plan keyset pagination for a list-style query, or return None if the query cannot be paged"""
+        if not self.enabled or not is_signing_key_configured():
+            return None
+        clauses = parse_clauses(sql)
+        if clauses is None or clauses.head or clauses.limit or clauses.offset or clauses.for_:
+            return None
+        if clauses.distinct or clauses.is_aggregate:
+            return None
+
+        items = clauses.select_items
+        has_star = any(item.is_star for item in items)
+        known_names = [item.output_name for item in items if item.output_name]
+        if has_star:
+            # SELECT * is only pageable over a single table whose columns the schema graph knows
+            star_columns = self._get_star_columns(clauses.from_)
+            if star_columns is None:
+                return None
+            known_names = star_columns + known_names
+        if len(set(name.lower() for name in known_names)) != len(known_names):
+            # A derived table rejects duplicate column names
+            return None
+
+        key: List[Tuple[str, bool]] = []
+        for order in clauses.order_items:
+            column = self._resolve_order_column(order.expression, items, has_star)
+            if column is None:
+                return None
+            if column.lower() not in (k[0].lower() for k in key):
+                key.append((column, order.descending))
+
+        # Make the key unique so page boundaries never split ties: id, the schema's primary_key, else every column
+        key_names = {k[0].lower() for k in key}
+        lowered_names = [name.lower() for name in known_names]
+        unique_key = ['id'] if 'id' in lowered_names else self._get_primary_key(clauses.from_)
+        if unique_key and all(column.lower() in lowered_names for column in unique_key):
+            key.extend((column, False) for column in unique_key if column.lower() not in key_names)
+        else:
+            key.extend((name, False) for name in known_names if name.lower() not in key_names)
+
+        if not key:
+            return None
+        return PagePlan(base_sql=strip_clauses(sql, ['order_by']), key=key, page_size=self.page_size)
+
+    def _get_single_table_info(self, from_clause: str) -> Optional[Dict[str, Any]]:
+        """Get schema graph info for a single-table FROM clause"""
+        match = re.fullmatch(r'`?(\w+)`?(?:\s+(?:AS\s+)?`?\w+`?)?', from_clause.strip(), flags=re.IGNORECASE)
+        if not match:
+            return None
+        from .graph_builder import schema_graph
+        return schema_graph.get_table_info(match.group(1))
+
+    def _get_star_columns(self, from_clause: str) -> Optional[List[str]]:
+        """Get the columns SELECT * produces for a single-table FROM"""
+        columns = (self._get_single_table_info(from_clause) or {}).get('columns')
+        return list(columns) if columns else None
+
+    def _get_primary_key(self, from_clause: str) -> Optional[List[str]]:
+        """Get the optional "primary_key" of a single-table FROM from the schema graph"""
+        primary_key = (self._get_single_table_info(from_clause) or {}).get('primary_key')
+        if isinstance(primary_key, str):
+            return [primary_key]
+        return list(primary_key) if primary_key else None
+
+    def _resolve_order_column(self, expression: str, items, has_star: bool) -> Optional[str]:
+        """Map an ORDER BY expression to an output column of the SELECT list"""
+        expression = expression.strip()
+        if expression.isdigit():
+            index = int(expression) - 1
+            return items[index].output_name if 0 <= index < len(items) else None
+        bare = re.fullmatch(r'(?:`?\w+`?\s*\.\s*)?`?(\w+)`?', expression)
+        for item in items:
+            if item.alias and (expression.strip('`') == item.alias or item.expression.strip() == expression):
+                return item.alias
+            if not item.alias and item.expression.strip() == expression:
+                return item.output_name
+        if bare:
+            matches = [item.output_name for item in items if item.output_name and item.output_name.lower() == bare.group(1).lower()]
+            if len(matches) == 1:
+                return matches[0]
+            if has_star and not matches:
+                return bare.group(1)
+        return None
+
+    def build_page_sql(self, plan: PagePlan, after: Optional[Sequence[Any]] = None) -> Tuple[str, Dict[str, Any]]:
+        """Build the SQL for one page (fetching page_size + 1 rows to detect more) and its bind parameters"""
+        params: Dict[str, Any] = {}
+        where = ""
+        if after is not None:
+            # (k1 > v1) OR (k1 = v1 AND k2 > v2) ... with '<' for descending keys
+            disjuncts = []
+            for i, (column, descending) in enumerate(plan.key):
+                terms = [f"{self._quote(plan.key[j][0])} = :_k{j}" for j in range(i)]
+                terms.append(f"{self._quote(column)} {'<' if descending else '>'} :_k{i}")
+                disjuncts.append("(" + " AND ".join(terms) + ")")
+            params = {f"_k{i}": value for i, value in enumerate(after)}
+            where = f" WHERE {' OR '.join(disjuncts)}"
+        order_by = ", ".join(f"{self._quote(column)} {'DESC' if descending else 'ASC'}" for column, descending in plan.key)
+        sql = f"SELECT * FROM ({plan.base_sql}) AS {PAGE_ALIAS}{where} ORDER BY {order_by} LIMIT {plan.page_size + 1}"
+        return sql, params
+
+    def _quote(self, column: str) -> str:
+        return f"{PAGE_ALIAS}.`{column}`"
+
+    def get_key_values(self, plan: PagePlan, columns: Sequence[str], row: Sequence[Any]) -> Optional[List[Any]]:
+        """Extract the key values of a row; None if any is NULL (NULLs cannot be compared by keyset)"""
+        positions = {name.lower(): i for i, name in enumerate(columns)}
+        values = []
+        for column, _ in plan.key:
+            index = positions.get(column.lower())
+            if index is None or row[index] is None:
+                return None
+            values.append(row[index])
+        return values
+
+    def finish_page(self, plan: PagePlan, execution_result: Dict[str, Any], scoping_value: Optional[str],
+                    role: Optional[str], tables: List[str]) -> Optional[str]:
+        """Trim the look-ahead row from a page result and return the token for the next page, if there is one"""
+        rows = execution_result.get("rows") or []
+        # A page cut short by the byte budget continues after its last row
+        if len(rows) <= plan.page_size and not (execution_result.get("truncated") and rows):
+            return None
+        rows = rows[:plan.page_size]
+        execution_result["rows"] = rows
+        execution_result["row_count"] = len(rows)
+        after = self.get_key_values(plan, execution_result.get("columns", []), rows[-1])
+        if after is None:
+            return None
+        return self.create_token(plan, after, scoping_value, role, tables)
+
+    def create_token(self, plan: PagePlan, after: Sequence[Any], scoping_value: Optional[str],
+                     role: Optional[str], tables: List[str]) -> str:
+        """Create a signed continuation token for the page after the given key values"""
+        payload = {
+            "sql": plan.base_sql,
+            "key": [[column, descending] for column, descending in plan.key],
+            "after": [_encode_value(value) for value in after],
+            "page_size": plan.page_size,
+            "scope": scoping_value,
+            "role": role,
+            "tables": tables
+        }
+        return create_signed_token(TOKEN_KIND, payload, self.token_ttl)
+
+    def parse_token(self, token: str) -> Dict[str, Any]:
+        """Verify and decode a continuation token"""
+        try:
+            payload = parse_signed_token(TOKEN_KIND, token)
+            payload["plan"] = PagePlan(
+                base_sql=payload["sql"],
+                key=[(column, bool(descending)) for column, descending in payload["key"]],
+                page_size=int(payload["page_size"])
+            )
+            payload["after"] = [_decode_value(value) for value in payload["after"]]
+            # Key columns are interpolated into the page SQL, so only plain identifiers are accepted
+            if not all(re.fullmatch(r'\w+', column) for column, _ in payload["plan"].key):
+                raise ContinuationTokenError("invalid key column")
+            if len(payload["after"]) != len(payload["plan"].key) or not 0 < payload["plan"].page_size <= self.page_size:
+                raise ContinuationTokenError("invalid page plan")
+        except (SignedTokenError, KeyError, TypeError, ValueError) as e:
+            raise ContinuationTokenError(str(e) or "malformed token")
+        return payload
+
+
+def _encode_value(value: Any) -> Any:
+    """Encode a key value for JSON, keeping its type"""
+    if isinstance(value, bool) or value is None or isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, datetime):
+        return {"t": "datetime", "v": value.isoformat()}
+    if isinstance(value, date):
+        return {"t": "date", "v": value.isoformat()}
+    if isinstance(value, dt_time):
+        return {"t": "time", "v": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"t": "timedelta", "v": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {"t": "decimal", "v": str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {"t": "bytes", "v": base64.b64encode(bytes(value)).decode('ascii')}
+    return str(value)
+
+
+def _decode_value(value: Any) -> Any:
+    """Decode a key value encoded by _encode_value"""
+    if not isinstance(value, dict):
+        return value
+    kind, raw = value.get("t"), value.get("v")
+    if kind == "datetime":
+        return datetime.fromisoformat(raw)
+    if kind == "date":
+        return date.fromisoformat(raw)
+    if kind == "time":
+        return dt_time.fromisoformat(raw)
+    if kind == "timedelta":
+        return timedelta(seconds=raw)
+    if kind == "decimal":
+        return Decimal(raw)
+    if kind == "bytes":
+        return base64.b64decode(raw)
+    raise ContinuationTokenError("malformed token")
+
+
+# Global instance
+keyset_paginator = KeysetPaginator()
@@ -0,0 +1,194 @@
+"""
+EXPLAIN-based query cost estimation and per-role cost budgets.
+Turns MySQL EXPLAIN output into a cost estimate and decides whether a query may run.
+"""
+import re
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .error_codes import ErrorCodes
+from .sql_clauses import get_table_aliases
+
+
+@dataclass
+class QueryCostEstimate:
+    """Cost summary derived from an EXPLAIN plan"""
+    rows_examined: int
+    cost: float
+    full_scan_tables: List[str] = field(default_factory=list)
+    uses_filesort: bool = False
+    uses_temporary: bool = False
+    access_types: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary for logging and responses"""
+        return asdict(self)
+
+
+class QueryCostEstimator:
+    """Estimates query cost from EXPLAIN rows and enforces per-role budgets"""
+
+    VALID_ACTIONS = ('regenerate', 'limit', 'refuse')
+
+    def parse_explain(self, explain_rows: List[Dict[str, Any]]) -> QueryCostEstimate:
+        """Parse MySQL tabular EXPLAIN output into a cost estimate"""
+        rows_by_select: Dict[Any, List[Dict[str, Any]]] = {}
+        for row in explain_rows or []:
+            normalized = {str(k).lower(): v for k, v in row.items()}
+            rows_by_select.setdefault(normalized.get('id'), []).append(normalized)
+
+        rows_examined = 0.0
+        full_scan_tables: List[str] = []
+        access_types: Dict[str, str] = {}
+        uses_filesort = False
+        uses_temporary = False
+
+        for select_rows in rows_by_select.values():
+            # Nested-loop join: each table is probed once per row produced by the tables before it
+            fanout = 1.0
+            for row in select_rows:
+                table = str(row.get('table') or '')
+                access_type = str(row.get('type') or '')
+                extra = str(row.get('extra') or '')
+                estimated_rows = self._to_float(row.get('rows'), 0.0)
+                filtered = self._to_float(row.get('filtered'), 100.0) / 100.0
+
+                rows_examined += fanout * estimated_rows
+                fanout *= max(estimated_rows * filtered, 1.0)
+
+                if table:
+                    access_types[table] = access_type
+                if access_type.upper() == 'ALL' and table:
+                    full_scan_tables.append(table)
+                if 'using filesort' in extra.lower():
+                    uses_filesort = True
+                if 'using temporary' in extra.lower():
+                    uses_temporary = True
+
+        cost = rows_examined
+        if full_scan_tables:
+            cost *= settings.COST_GATE_FULL_SCAN_FACTOR
+        if uses_filesort:
+            cost *= settings.COST_GATE_FILESORT_FACTOR
+        if uses_temporary:
+            cost *= settings.COST_GATE_TEMPORARY_FACTOR
+
+        return QueryCostEstimate(
+            rows_examined=int(rows_examined),
+            cost=round(cost, 2),
+            full_scan_tables=full_scan_tables,
+            uses_filesort=uses_filesort,
+            uses_temporary=uses_temporary,
+            access_types=access_types
+        )
+
+    def apply_tenant_rows(self, explain_rows: List[Dict[str, Any]], sql: str, scoping_value: Optional[str]) -> List[Dict[str, Any]]:
+        """Replace row estimates of scoping-index lookups with the tenant's row count from the statistics catalog
+        
+        Cached plans are shared across scoping values, but a tenant's row estimate is not.
+        """
+        if scoping_value is None:
+            return explain_rows
+        from .table_statistics import table_statistics
+        tables_by_alias = get_table_aliases(sql)
+        adjusted = []
+        for row in explain_rows or []:
+            normalized = {str(k).lower(): v for k, v in row.items()}
+            table = tables_by_alias.get(str(normalized.get('table') or ''))
+            key = normalized.get('key')
+            if table and key and str(normalized.get('type') or '').lower() == 'ref' and str(normalized.get('ref')) == 'const':
+                scoping_column = table_statistics.get_scoping_column(table)
+                index_columns = (table_statistics.get_indexes(table) or {}).get(key) or []
+                if scoping_column and index_columns and index_columns[0] == scoping_column.lower():
+                    tenant_rows = table_statistics.get_row_count(table, scoping_value)
+                    if tenant_rows is not None:
+                        normalized['rows'] = tenant_rows
+            adjusted.append(normalized)
+        return adjusted
+
+    def get_budget(self, user_context=None) -> float:
+        """Get the maximum query cost for the user's role (role config key: max_query_cost)"""
+        role = getattr(user_context, 'role', None) or settings.security.DEFAULT_USER_ROLE
+        role_config = settings.security.get_role_config(role) or {}
+        try:
+            return float(role_config.get('max_query_cost', settings.COST_GATE_DEFAULT_MAX_COST))
+        except (TypeError, ValueError):
+            return settings.COST_GATE_DEFAULT_MAX_COST
+
+    def evaluate(self, explain_rows: List[Dict[str, Any]], sql: str, user_context=None, scoping_value: Optional[str] = None) -> Dict[str, Any]:
+        """Check an EXPLAIN plan against the role budget and decide what to do with the query"""
+        estimate = self.parse_explain(self.apply_tenant_rows(explain_rows, sql, scoping_value))
+        budget = self.get_budget(user_context)
+
+        if estimate.cost <= budget:
+            return {"action": "allow", "sql": sql, "estimate": estimate, "budget": budget}
+
+        action = (settings.COST_GATE_ACTION or 'regenerate').lower()
+        if action not in self.VALID_ACTIONS:
+            action = 'regenerate'
+
+        if action == 'limit':
+            limited_sql = self._apply_tight_limit(sql, estimate)
+            if limited_sql:
+                return {"action": "limit", "sql": limited_sql, "estimate": estimate, "budget": budget}
+            # A LIMIT cannot stop aggregates or sorts early, so ask for a better query instead
+            action = 'regenerate'
+
+        error = self._build_error_message(estimate, budget)
+        return {
+            "action": action,
+            "sql": sql,
+            "estimate": estimate,
+            "budget": budget,
+            "error": error,
+            "error_code": ErrorCodes.DB_QUERY_TOO_EXPENSIVE.code
+        }
+
+    def _apply_tight_limit(self, sql: str, estimate: QueryCostEstimate) -> Optional[str]:
+        """Rewrite a plain row-listing query with a tighter LIMIT, or return None if a LIMIT would not help"""
+        if estimate.uses_filesort or estimate.uses_temporary:
+            return None
+        sql_upper = sql.upper()
+        if re.search(r'\b(COUNT|SUM|AVG|MIN|MAX|GROUP_CONCAT)\s*\(', sql_upper) or re.search(r'\bGROUP\s+BY\b', sql_upper):
+            return None
+
+        limit_rows = settings.COST_GATE_LIMIT_ROWS
+        stripped = sql.strip().rstrip(';')
+        # LIMIT count | LIMIT offset, count | LIMIT count OFFSET offset
+        match = re.search(r'\bLIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*$', stripped, flags=re.IGNORECASE)
+        if match:
+            prefix = stripped[:match.start()]
+            if match.group(2) is not None:
+                offset, count = match.group(1), int(match.group(2))
+                return f"{prefix}LIMIT {offset}, {min(count, limit_rows)}"
+            count = min(int(match.group(1)), limit_rows)
+            if match.group(3) is not None:
+                return f"{prefix}LIMIT {count} OFFSET {match.group(3)}"
+            return f"{prefix}LIMIT {count}"
+        return f"{stripped} LIMIT {limit_rows}"
+
+    def _build_error_message(self, estimate: QueryCostEstimate, budget: float) -> str:
+        """Build a refinement-friendly description of why the query is too expensive"""
+        reasons = [f"estimated cost {estimate.cost:,.0f} exceeds budget {budget:,.0f} (~{estimate.rows_examined:,} rows examined)"]
+        if estimate.full_scan_tables:
+            reasons.append(f"full table scan on {', '.join(sorted(set(estimate.full_scan_tables)))}")
+        if estimate.uses_filesort:
+            reasons.append("requires filesort")
+        if estimate.uses_temporary:
+            reasons.append("requires temporary table")
+        return (
+            "Query too expensive: " + "; ".join(reasons) +
+            ". Add selective filters on indexed or scoping columns, narrow the date range, or aggregate less data."
+        )
+
+    @staticmethod
+    def _to_float(value: Any, default: float) -> float:
+        try:
+            return float(value) if value is not None else default
+        except (TypeError, ValueError):
+            return default
+
+
+# Global instance
+cost_estimator = QueryCostEstimator()
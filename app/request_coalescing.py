@@ -0,0 +1,149 @@
+"""
+Singleflight coalescing of identical in-flight work.
+Concurrent requests for the same question (normalized text, scoping value and role) share one SQL generation, and
+concurrent cache misses for the same result-cache key share one execution. The shared work runs as its own task, so
+a caller that goes away does not cancel it for the others; a database watchdog only treats the work as abandoned
+once every waiting caller has disconnected.
+"""
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .config import settings
+
+DisconnectCheck = Callable[[], Awaitable[bool]]
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?.!;]+$')
+# Quoted literals ('DELHI' vs 'delhi' may be different values) are kept verbatim
+_QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"|\u2018[^\u2019]*\u2019|\u201c[^\u201d]*\u201d")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase and collapse whitespace outside quoted literals and drop trailing punctuation"""
+    parts, last = [], 0
+    for match in _QUOTED.finditer(question):
+        parts.append(_WHITESPACE.sub(' ', question[last:match.start()].lower()))
+        parts.append(match.group(0))
+        last = match.end()
+    parts.append(_WHITESPACE.sub(' ', question[last:].lower()))
+    return _TRAILING_PUNCTUATION.sub('', ''.join(parts).strip())
+
+
+def build_question_key(question: str, scoping_value: Optional[str], role: Optional[str], approximate: bool = False) -> str:
+    """Coalescing key of a natural language question (approximate requests skip execute-as-validation, so they differ)"""
+    return f"{role or ''}\x00{scoping_value or ''}\x00{int(approximate)}\x00{normalize_question(question)}"
+
+
+def copy_result(result: Any) -> Any:
+    """Per-caller copy of a shared result: callers reassign top-level keys (rows, row_count, cache) but never mutate in place"""
+    if not isinstance(result, dict):
+        return result
+    copied = dict(result)
+    if isinstance(copied.get("execution_result"), dict):
+        copied["execution_result"] = dict(copied["execution_result"])
+    return copied
+
+
+@dataclass
+class Flight:
+    """One in-flight unit of work and the callers waiting on it"""
+    task: Optional[asyncio.Task] = None
+    waiters: int = 0
+    disconnect_checks: List[DisconnectCheck] = field(default_factory=list)
+
+    async def all_disconnected(self) -> bool:
+        """True once every caller with a disconnect check has gone away"""
+        if not self.disconnect_checks or len(self.disconnect_checks) < self.waiters:
+            return False
+        for check in list(self.disconnect_checks):
+            if not await check():
+                return False
+        return True
+
+
+class FlightStats:
+    """Leader / follower counts of one kind of work"""
+
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self.errors = 0
+
+
+class RequestCoalescer:
+    """Runs at most one task per key; concurrent callers with the same key await the same result"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_QUERY_COALESCING
+        self._flights: Dict[str, Flight] = {}
+        self._stats: Dict[str, FlightStats] = {}
+
+    async def run(
+        self,
+        kind: str,
+        key: str,
+        factory: Callable[[DisconnectCheck], Awaitable[Any]],
+        is_disconnected: Optional[DisconnectCheck] = None
+    ) -> Any:
+        """Await the in-flight result of (kind, key), starting it with factory(all_disconnected) if none is running"""
+        if not self.enabled:
+            return await factory(is_disconnected or _never_disconnected)
+
+        stats = self._stats.setdefault(kind, FlightStats())
+        flight_key = f"{kind}\x00{key}"
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            flight = Flight()
+            flight.task = asyncio.ensure_future(factory(flight.all_disconnected))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(flight_key, flight))
+            stats.leaders += 1
+        else:
+            stats.followers += 1
+
+        flight.waiters += 1
+        if is_disconnected is not None:
+            flight.disconnect_checks.append(is_disconnected)
+        try:
+            # shield: a cancelled caller must not cancel the work the other callers are waiting on
+            result = await asyncio.shield(flight.task)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if is_disconnected is not None:
+                flight.disconnect_checks.remove(is_disconnected)
+        return copy_result(result)
+
+    def _finish(self, flight_key: str, flight: Flight):
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+        # Retrieve the exception so an abandoned failed task is not reported as never retrieved
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get leader / follower counts per kind of work"""
+        return {
+            'enabled': self.enabled,
+            'in_flight': len(self._flights),
+            'kinds': {
+                kind: {
+                    'leaders': stats.leaders,
+                    'followers': stats.followers,
+                    'errors': stats.errors
+                }
+                for kind, stats in self._stats.items()
+            }
+        }
+
+
+async def _never_disconnected() -> bool:
+    return False
+
+
+# Global instance
+request_coalescer = RequestCoalescer()
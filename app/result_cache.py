@@ -0,0 +1,200 @@
+"""
+Query result cache in front of DatabaseExecutor.
+Keys combine the normalized SQL, scoping value, role and a time bucket for CURDATE()/NOW() queries.
+"""
+import re
+import time
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .sql_fingerprint import fingerprint_sql
+from .table_watermarks import table_watermarks
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_NOW_FUNCTIONS = re.compile(
+    r'\b(NOW|SYSDATE|CURTIME|UNIX_TIMESTAMP|UTC_TIMESTAMP|UTC_TIME)\s*\(|\b(CURRENT_TIMESTAMP|CURRENT_TIME|LOCALTIME|LOCALTIMESTAMP)\b',
+    re.IGNORECASE
+)
+_DATE_FUNCTIONS = re.compile(r'\b(CURDATE|UTC_DATE)\s*\(|\bCURRENT_DATE\b', re.IGNORECASE)
+
+
+@dataclass
+class CacheEntry:
+    """A cached, serialized execution result"""
+    payload: bytes
+    compressed: bool
+    stored_at: float
+    expires_at: float
+    tables: List[str]
+    versions: Dict[str, int]
+
+    @property
+    def size(self) -> int:
+        return len(self.payload)
+
+
+class ResultCache:
+    """Size-bounded LRU cache of execution results with per-table TTLs and watermark invalidation"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_RESULT_CACHE
+        self.max_bytes = settings.RESULT_CACHE_MAX_BYTES
+        self.max_entry_bytes = settings.RESULT_CACHE_MAX_ENTRY_BYTES
+        self.default_ttl = settings.RESULT_CACHE_DEFAULT_TTL_SECONDS
+        self.table_ttls = settings.get_result_cache_table_ttls()
+        self.compress = settings.RESULT_CACHE_COMPRESSION.lower() == 'zstd' and zstandard is not None
+        self._compressor = zstandard.ZstdCompressor(level=3) if self.compress else None
+        self._decompressor = zstandard.ZstdDecompressor() if self.compress else None
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        table_watermarks.add_listener(self.invalidate_tables)
+
+    def get_time_bucket(self, sql: str) -> str:
+        """Derive the time bucket for SQL whose result depends on the current date or time"""
+        if _NOW_FUNCTIONS.search(sql):
+            bucket_seconds = max(settings.RESULT_CACHE_NOW_BUCKET_SECONDS, 1)
+            return f"now:{int(time.time() // bucket_seconds)}"
+        if _DATE_FUNCTIONS.search(sql):
+            db_today = datetime.utcnow() + timedelta(minutes=settings.DB_TIMEZONE_OFFSET_MINUTES)
+            return f"date:{db_today.date().isoformat()}"
+        return "static"
+
+    def build_key(self, sql: str, scoping_value: Optional[str] = None, role: Optional[str] = None,
+                  params: Optional[Dict[str, Any]] = None) -> str:
+        """Build cache key from SQL fingerprint (literals kept), bind parameters, scoping value, role and time bucket"""
+        fingerprint = fingerprint_sql(sql, strip_literals=False)
+        if params:
+            fingerprint += ":" + hashlib.sha1(repr(sorted(params.items())).encode('utf-8')).hexdigest()
+        return f"{fingerprint}|{scoping_value or ''}|{role or ''}|{self.get_time_bucket(sql)}"
+
+    def get_ttl(self, tables: List[str]) -> int:
+        """Get the TTL for a result: the shortest TTL among the tables it reads"""
+        ttls = []
+        for table in tables or []:
+            if table in self.table_ttls:
+                ttls.append(self.table_ttls[table])
+            elif table_watermarks.is_tracked(table):
+                # Watermark-tracked tables are invalidated on change, so they can be cached much longer
+                ttls.append(settings.RESULT_CACHE_WATERMARKED_TTL_SECONDS)
+            else:
+                ttls.append(self.default_ttl)
+        return min(ttls) if ttls else self.default_ttl
+
+    def snapshot_versions(self, tables: List[str]) -> Dict[str, int]:
+        """Snapshot table watermark versions; take this before executing the query being cached"""
+        return table_watermarks.get_versions(tables)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached execution result, annotated with cache status and age"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if now >= entry.expires_at or not table_watermarks.is_current(entry.versions):
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        payload = self._decompressor.decompress(entry.payload) if entry.compressed else entry.payload
+        result = pickle.loads(payload)
+        result["cache"] = {"status": "HIT", "age": int(now - entry.stored_at)}
+        return result
+
+    def put(self, key: str, result: Dict[str, Any], tables: List[str], versions: Optional[Dict[str, int]] = None):
+        """Cache a successful execution result (versions: watermark snapshot taken before execution)"""
+        if not self.enabled or not result.get("success", False):
+            return
+        ttl = self.get_ttl(tables)
+        if ttl <= 0:
+            return
+
+        cacheable = {k: v for k, v in result.items() if k != "cache"}
+        payload = pickle.dumps(cacheable, protocol=pickle.HIGHEST_PROTOCOL)
+        compressed = False
+        if self._compressor is not None:
+            payload = self._compressor.compress(payload)
+            compressed = True
+        if len(payload) > self.max_entry_bytes:
+            return
+
+        now = time.time()
+        entry = CacheEntry(
+            payload=payload,
+            compressed=compressed,
+            stored_at=now,
+            expires_at=now + ttl,
+            tables=list(tables or []),
+            versions=versions if versions is not None else self.snapshot_versions(tables)
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+            while self._total_bytes > self.max_bytes and self._entries:
+                # Remove least recently used entry
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key: str):
+        """Remove an entry (caller holds the lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def invalidate_tables(self, tables: List[str]):
+        """Drop every cached result that depends on one of the tables"""
+        changed = set(tables)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if changed.intersection(entry.tables)]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        total = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'compression': 'zstd' if self.compress else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / total if total > 0 else 0
+        }
+
+
+# Global instance
+result_cache = ResultCache()
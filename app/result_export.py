@@ -0,0 +1,268 @@
+"""
+Streaming CSV and Parquet export of validated queries.
+Rows come from DatabaseExecutor.stream_query_guarded batches, so memory stays bounded by one batch (CSV) or one row
+group (Parquet).
+An export that stops early says so in the file: CSV gets a final "#EXPORT_TRUNCATED" or "#EXPORT_ERROR" row with the
+reason, Parquet a "nl2sql.export.status" footer key (complete / truncated / error; needs pyarrow >= 17, older pyarrow
+leaves the footer off so a partial file cannot be read as a complete one).
+Parquet column types are fixed by the first row group, with DECIMAL precision and scale taken from the cursor;
+a later row group that still does not fit ends the export with the error status.
+"""
+import asyncio
+import csv
+import io
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .config import settings
+from .signed_tokens import create_signed_token, is_signing_key_configured, parse_signed_token
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KIND = "query"
+CSV_FORMAT = "csv"
+PARQUET_FORMAT = "parquet"
+
+EXPORT_COMPLETE = "complete"
+EXPORT_TRUNCATED = "truncated"
+EXPORT_ERROR = "error"
+CSV_STATUS_ROWS = {EXPORT_TRUNCATED: "#EXPORT_TRUNCATED", EXPORT_ERROR: "#EXPORT_ERROR"}
+PARQUET_STATUS_KEY = "nl2sql.export.status"
+PARQUET_DETAIL_KEY = "nl2sql.export.detail"
+MAX_DECIMAL_PRECISION = 38
+
+EXPORT_MEDIA_TYPES = {
+    CSV_FORMAT: "text/csv",
+    PARQUET_FORMAT: "application/vnd.apache.parquet",
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes out in chunks but reports the full stream position"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def prepend_event(first: Dict[str, Any], events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    """Put an already-read event back in front of a stream"""
+    try:
+        yield first
+        async for event in events:
+            yield event
+    finally:
+        await events.aclose()
+
+
+class ResultExporter:
+    """Issues query tokens and streams their results as CSV or Parquet"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_EXPORT
+        self.token_ttl = settings.EXPORT_TOKEN_TTL_SECONDS
+
+    def get_supported_formats(self) -> List[str]:
+        """Get export formats available with the installed dependencies"""
+        return [CSV_FORMAT, PARQUET_FORMAT] if pyarrow is not None else [CSV_FORMAT]
+
+    def can_export(self, role: Optional[str]) -> bool:
+        """Check the role's "can_export" flag (default: allowed); export tokens need a private SECRET_KEY"""
+        role_config = settings.security.get_role_config(role or settings.security.DEFAULT_USER_ROLE) or {}
+        return self.enabled and is_signing_key_configured() and bool(role_config.get('can_export', True))
+
+    def get_limits(self, role: Optional[str]) -> Dict[str, int]:
+        """Get the role's export caps (role config keys: export_max_rows, export_max_bytes, export_max_execution_time_ms)"""
+        role_config = settings.security.get_role_config(role or settings.security.DEFAULT_USER_ROLE) or {}
+        defaults = {
+            'max_rows': ('export_max_rows', settings.EXPORT_MAX_ROWS),
+            'max_bytes': ('export_max_bytes', settings.EXPORT_MAX_BYTES),
+            'max_execution_time_ms': ('export_max_execution_time_ms', settings.EXPORT_MAX_EXECUTION_TIME_MS)
+        }
+        limits = {}
+        for name, (key, default) in defaults.items():
+            try:
+                limits[name] = int(role_config.get(key, default))
+            except (TypeError, ValueError):
+                limits[name] = default
+        return limits
+
+    def create_query_token(self, sql: str, scoping_value: Optional[str], role: Optional[str], tables: List[str]) -> str:
+        """Create a signed token identifying a validated query and the scope it was validated for"""
+        return create_signed_token(TOKEN_KIND, {"sql": sql, "scope": scoping_value, "role": role, "tables": tables}, self.token_ttl)
+
+    def parse_query_token(self, token: str) -> Dict[str, Any]:
+        """Verify a query token and return its payload"""
+        return parse_signed_token(TOKEN_KIND, token)
+
+    async def _with_status(self, events: AsyncIterator[Dict[str, Any]], max_rows: int) -> AsyncIterator[Dict[str, Any]]:
+        """Pass through columns and rows, cut at max_rows, then one {"type": "status"} event saying how the export ended"""
+        emitted = 0
+        status, detail = EXPORT_ERROR, "result stream ended unexpectedly"
+        try:
+            async for event in events:
+                if event["type"] == "columns":
+                    yield event
+                elif event["type"] == "rows":
+                    if emitted >= max_rows:
+                        # More rows after the cap was reached exactly at a batch boundary
+                        status, detail = EXPORT_TRUNCATED, f"row limit of {max_rows} reached"
+                        break
+                    rows = event["rows"][:max_rows - emitted]
+                    emitted += len(rows)
+                    if rows:
+                        yield {"type": "rows", "rows": rows}
+                    if len(rows) < len(event["rows"]):
+                        status, detail = EXPORT_TRUNCATED, f"row limit of {max_rows} reached"
+                        break
+                elif event["type"] == "error":
+                    status, detail = EXPORT_ERROR, event["result"].get("error") or "query failed"
+                    break
+                elif event["type"] == "end":
+                    if event.get("truncated"):
+                        status, detail = EXPORT_TRUNCATED, "byte limit reached"
+                    else:
+                        status, detail = EXPORT_COMPLETE, ""
+                    break
+        finally:
+            # Releases the connection promptly when the export stops early or the client goes away
+            await events.aclose()
+        if status != EXPORT_COMPLETE:
+            logger.warning("Export %s after %s rows: %s", status, emitted, detail)
+        yield {"type": "status", "status": status, "detail": detail, "row_count": emitted}
+
+    async def stream_csv(self, events: AsyncIterator[Dict[str, Any]], max_rows: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Encode stream events as CSV, one chunk per batch, ending with a status row if the export stopped early"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        async for event in self._with_status(events, max_rows or settings.EXPORT_MAX_ROWS):
+            if event["type"] == "columns":
+                writer.writerow(event["columns"])
+            elif event["type"] == "rows":
+                await asyncio.to_thread(writer.writerows, event["rows"])
+            elif event["type"] == "status" and event["status"] != EXPORT_COMPLETE:
+                writer.writerow([CSV_STATUS_ROWS[event["status"]], event["detail"]])
+            if buffer.tell():
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+    async def stream_parquet(self, events: AsyncIterator[Dict[str, Any]], max_rows: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Encode stream events as Parquet, flushing one row group at a time, with the export status in the footer"""
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is not installed")
+        from .result_formats import to_column_arrays
+
+        sink = _ChunkSink()
+        writer = None
+        schema = None
+        columns: List[str] = []
+        column_types: List[Optional[tuple]] = []
+        pending: List[tuple] = []
+        row_group_rows = settings.EXPORT_PARQUET_ROW_GROUP_ROWS
+
+        def write_row_group():
+            nonlocal writer, schema
+            arrays = to_column_arrays(columns, pending)
+            if schema is None:
+                schema = self._infer_schema(columns, arrays, column_types)
+                writer = pyarrow.parquet.ParquetWriter(pyarrow.PythonFile(sink, mode='w'), schema)
+            table = pyarrow.Table.from_arrays(
+                [self._to_array(values, schema.field(i).type) for i, values in enumerate(arrays)],
+                schema=schema
+            )
+            writer.write_table(table, row_group_size=len(pending))
+            pending.clear()
+
+        status = {"status": EXPORT_ERROR, "detail": ""}
+        events = self._with_status(events, max_rows or settings.EXPORT_MAX_ROWS)
+        try:
+            async for event in events:
+                if event["type"] == "columns":
+                    columns = event["columns"]
+                    column_types = event.get("column_types") or []
+                elif event["type"] == "rows":
+                    pending.extend(event["rows"])
+                    if len(pending) >= row_group_rows:
+                        await asyncio.to_thread(write_row_group)
+                        yield sink.drain()
+                elif event["type"] == "status":
+                    status = event
+            if pending or writer is None:
+                await asyncio.to_thread(write_row_group)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as e:
+            # A later row group does not fit the column types of the first one
+            logger.warning("Export error: %s", e)
+            status = {"status": EXPORT_ERROR, "detail": f"value does not fit the column type: {e}"}
+            if writer is None:
+                return
+        finally:
+            await events.aclose()
+
+        if hasattr(writer, "add_key_value_metadata"):
+            writer.add_key_value_metadata({PARQUET_STATUS_KEY: status["status"], PARQUET_DETAIL_KEY: status["detail"]})
+        elif status["status"] != EXPORT_COMPLETE:
+            # No footer metadata before pyarrow 17: leave the footer off so the partial file is unreadable
+            yield sink.drain()
+            return
+        writer.close()
+        yield sink.drain()
+
+    def _infer_schema(self, columns: List[str], arrays: List[List[Any]], column_types: Optional[List[Optional[tuple]]] = None):
+        """Infer the Parquet schema from the first row group (all-NULL or mixed columns become strings)
+
+        DECIMAL columns take the precision and scale the cursor reports, or become strings when it reports none,
+        so later row groups with more digits still fit.
+        """
+        fields = []
+        for index, (name, values) in enumerate(zip(columns, arrays)):
+            try:
+                arrow_type = pyarrow.array(values).type
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+                arrow_type = pyarrow.string()
+            if pyarrow.types.is_null(arrow_type):
+                arrow_type = pyarrow.string()
+            elif pyarrow.types.is_decimal(arrow_type):
+                precision, scale = (column_types[index] if index < len(column_types or []) else None) or (None, None)
+                if scale is None:
+                    # Later rows may carry more digits than the first group shows
+                    arrow_type = pyarrow.string()
+                else:
+                    precision = max(precision or MAX_DECIMAL_PRECISION, scale + 1)
+                    arrow_type = pyarrow.decimal128(min(precision, MAX_DECIMAL_PRECISION), scale)
+            fields.append(pyarrow.field(name, arrow_type))
+        return pyarrow.schema(fields)
+
+    def _to_array(self, values: List[Any], arrow_type):
+        """Build an array of the schema type, stringifying values when the column is a string column"""
+        if pyarrow.types.is_string(arrow_type):
+            return pyarrow.array([value if value is None or isinstance(value, str) else str(value) for value in values], type=arrow_type)
+        # A safe cast raises on lost digits where pyarrow.array(values, type=...) would silently truncate 2.5 to 2
+        return pyarrow.array(values).cast(arrow_type)
+
+
+# Global instance
+result_exporter = ResultExporter()
@@ -0,0 +1,117 @@
+"""
+Query result formats: row dicts (default), columnar JSON and Arrow IPC, plus the fast JSON encoder used for them.
+Results arrive from the executor as a column header plus row tuples, so no per-row dicts are built unless needed.
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi.responses import Response
+from pydantic_core import PydanticSerializationError, to_jsonable_python
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+ROWS_FORMAT = "rows"
+COLUMNAR_FORMAT = "columnar"
+ARROW_FORMAT = "arrow"
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.nl2sql.columnar+json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+_MEDIA_TYPE_FORMATS = {
+    COLUMNAR_MEDIA_TYPE: COLUMNAR_FORMAT,
+    ARROW_MEDIA_TYPE: ARROW_FORMAT,
+}
+
+
+def negotiate_result_format(requested: Optional[str] = None, accept_header: Optional[str] = None) -> str:
+    """Pick the result format from the request field, falling back to the Accept header"""
+    if requested:
+        return requested.lower()
+    for media_range in (accept_header or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in _MEDIA_TYPE_FORMATS:
+            return _MEDIA_TYPE_FORMATS[media_type]
+    return ROWS_FORMAT
+
+
+def is_arrow_available() -> bool:
+    """Check whether the optional pyarrow dependency is installed"""
+    return pyarrow is not None
+
+
+def rows_to_dicts(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Convert row tuples to per-row dicts"""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def get_result_dicts(execution_result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Get per-row dicts from an execution result in either shape"""
+    if execution_result.get("data") is not None:
+        return execution_result["data"]
+    return rows_to_dicts(execution_result.get("columns", []), execution_result.get("rows", []))
+
+
+def to_column_arrays(columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> List[List[Any]]:
+    """Transpose row tuples into one array per column"""
+    if not rows:
+        return [[] for _ in columns]
+    return [list(values) for values in zip(*rows)]
+
+
+def _to_arrow_array(values: List[Any]):
+    """Build an Arrow array, falling back to strings for mixed-type columns"""
+    try:
+        return pyarrow.array(values)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        return pyarrow.array([None if value is None else str(value) for value in values], type=pyarrow.string())
+
+
+def to_arrow_ipc(columns: Sequence[str], rows: Sequence[Sequence[Any]], metadata: Optional[Dict[str, str]] = None) -> bytes:
+    """Serialize row tuples as an Arrow IPC stream"""
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is not installed")
+    arrays = [_to_arrow_array(values) for values in to_column_arrays(columns, rows)]
+    table = pyarrow.Table.from_arrays(arrays, names=list(columns))
+    if metadata:
+        table = table.replace_schema_metadata(metadata)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def json_default(value: Any) -> Any:
+    """JSON fallback for database values, encoded as the QueryResponse model path does (Decimal as a string)"""
+    try:
+        return to_jsonable_python(value)
+    except PydanticSerializationError:
+        return str(value)
+
+
+def dumps_json(payload: Any) -> bytes:
+    """Serialize to JSON with orjson when installed; Decimal, date/time, timedelta and bytes go through json_default"""
+    if orjson is not None:
+        # Date/time types are passed through too so tz-aware values keep pydantic's "Z" form
+        return orjson.dumps(
+            payload,
+            default=json_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        )
+    return json.dumps(payload, default=json_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips response-model validation and jsonable_encoder"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
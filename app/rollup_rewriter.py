@@ -0,0 +1,513 @@
+"""
+Rewrite of validated GROUP BY queries onto pre-aggregated rollup tables.
+Rollups are registered in the schema graph under "rollups" with their source table, dimensions (the grain),
+an optional date grain column, re-aggregatable measures and the filters they were built with.
+A query is rewritten only when every grouped, filtered and aggregated expression can be computed from the rollup,
+and only when its date range ends on or before the rollup's freshness watermark: the registry's "fresh_through" date,
+else MAX(day column) read from the rollup in the background (the ETL is assumed to load whole days). A range with no
+upper bound ends today, so until today is loaded only ranges ending earlier are answered from the rollup.
+"""
+import asyncio
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .config import settings
+from .db_scheduler import db_scheduler, MAINTENANCE_TENANT
+from .sql_clauses import iter_tokens, parse_clauses, split_conjuncts, split_top_level
+
+AGGREGATE_CALLS = ('count', 'sum', 'min', 'max', 'avg')
+# Functions whose value depends only on the date part of a DATETIME
+DATE_PART_FUNCTIONS = ('date', 'year', 'month', 'quarter', 'week', 'yearweek', 'day', 'dayofmonth',
+                       'dayofweek', 'dayofyear', 'weekday', 'last_day', 'to_days')
+DATE_FORMAT_SPECIFIERS = set('abcDdejMmUuVvWwXxYy%')
+_DATE_VALUE = r"(?:'\d{4}-\d{2}-\d{2}'|CURDATE\(\)|CURRENT_DATE(?:\(\))?)"
+# Midnight-valued right-hand sides: for these, col >= X and col < X give the same rows on the day column
+DATE_VALUED_EXPRESSION = re.compile(
+    rf"{_DATE_VALUE}|(?:DATE_SUB|DATE_ADD|SUBDATE|ADDDATE)\(\s*{_DATE_VALUE}\s*,\s*INTERVAL\s+\d+\s+(?:DAY|WEEK|MONTH|QUARTER|YEAR)\s*\)",
+    re.IGNORECASE
+)
+
+# Right-hand sides evaluated to a day when checking freshness
+_DATE_LITERAL = re.compile(r"'(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?)?'")
+_CURRENT_DATE = re.compile(
+    r"(?:CURDATE|CURRENT_DATE|UTC_DATE|NOW|CURRENT_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP|SYSDATE|UTC_TIMESTAMP)\s*(?:\(\s*\))?"
+    r"|DATE\(\s*(?:NOW|CURRENT_TIMESTAMP|SYSDATE)\s*\(\s*\)\s*\)",
+    re.IGNORECASE
+)
+_DATE_ARITHMETIC = re.compile(
+    r"(DATE_SUB|DATE_ADD|SUBDATE|ADDDATE)\(\s*(.+?)\s*,\s*INTERVAL\s+(\d+)\s+(DAY|WEEK|MONTH|QUARTER|YEAR)\s*\)",
+    re.IGNORECASE | re.DOTALL
+)
+
+TokenKey = Tuple[str, ...]
+
+
+def _token_value(kind: str, value: str) -> str:
+    if kind == 'word':
+        return value.lower()
+    if kind == 'quoted':
+        return value.strip('`').lower()
+    return value
+
+
+def token_key(text: str) -> TokenKey:
+    """Formatting-insensitive key of an expression (identifier case and backticks ignored)"""
+    return tuple(_token_value(kind, value) for kind, value, _, _ in iter_tokens(text or ""))
+
+
+def _matching_paren(tokens, open_index: int) -> Optional[int]:
+    depth = 0
+    for index in range(open_index, len(tokens)):
+        if tokens[index][0] == 'other' and tokens[index][1] == '(':
+            depth += 1
+        elif tokens[index][0] == 'other' and tokens[index][1] == ')':
+            depth -= 1
+            if depth == 0:
+                return index
+    return None
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return date(year, month, min(day.day, (next_month - timedelta(days=1)).day))
+
+
+def evaluate_date(expression: str, today: date) -> Optional[Tuple[date, bool]]:
+    """Evaluate a date literal, CURDATE()/NOW() or DATE_SUB/DATE_ADD of one to (day, has a time of day after midnight)"""
+    expression = expression.strip()
+    match = _DATE_LITERAL.fullmatch(expression)
+    if match:
+        try:
+            day = date.fromisoformat(match.group(1))
+        except ValueError:
+            return None
+        return day, any(part and int(part) for part in match.group(2, 3, 4))
+    if _CURRENT_DATE.fullmatch(expression):
+        # NOW() carries a time of day, so "day < NOW()" still includes today; CURDATE() is midnight
+        return today, expression.upper().startswith(('NOW', 'CURRENT_TIMESTAMP', 'LOCAL', 'SYSDATE', 'UTC_TIMESTAMP'))
+    match = _DATE_ARITHMETIC.fullmatch(expression)
+    if match:
+        base = evaluate_date(match.group(2), today)
+        if base is None:
+            return None
+        amount = int(match.group(3)) * (-1 if match.group(1).upper() in ('DATE_SUB', 'SUBDATE') else 1)
+        unit = match.group(4).upper()
+        if unit in ('DAY', 'WEEK'):
+            day = base[0] + timedelta(days=amount * (7 if unit == 'WEEK' else 1))
+        else:
+            day = _add_months(base[0], amount * {'MONTH': 1, 'QUARTER': 3, 'YEAR': 12}[unit])
+        return day, base[1]
+    return None
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def _strip_qualifiers(text: str, qualifiers: Set[str]) -> str:
+    """Drop "alias." / "table." prefixes of the rewritten table"""
+    tokens = list(iter_tokens(text or ""))
+    pieces, last = [], 0
+    for index, (kind, value, start, end) in enumerate(tokens):
+        if kind in ('word', 'quoted') and _token_value(kind, value) in qualifiers \
+                and index + 1 < len(tokens) and tokens[index + 1][1] == '.':
+            pieces.append(text[last:start])
+            last = tokens[index + 1][3]
+    pieces.append((text or "")[last:])
+    return ''.join(pieces)
+
+
+@dataclass
+class Rollup:
+    """A registered rollup table, with registry expressions pre-tokenized"""
+    name: str
+    source_table: str
+    dimensions: Dict[TokenKey, str]
+    grain: Dict[str, str]
+    measures: Dict[TokenKey, str]
+    filters: Set[TokenKey] = field(default_factory=set)
+    # Last day the rollup is complete for, when the registry pins it
+    fresh_through: Optional[date] = None
+
+    @classmethod
+    def from_registry(cls, name: str, info: Dict[str, Any]) -> Optional['Rollup']:
+        if not re.fullmatch(r'\w+', name) or not info.get('source_table'):
+            return None
+        return cls(
+            name=name,
+            source_table=info['source_table'],
+            dimensions={token_key(expression): column for expression, column in (info.get('dimensions') or {}).items()},
+            grain={source.lower(): column for source, column in (info.get('grain') or {}).items()},
+            measures={token_key(expression): column for expression, column in (info.get('measures') or {}).items()},
+            filters={token_key(condition) for condition in info.get('filters') or []},
+            fresh_through=_to_date(info.get('fresh_through'))
+        )
+
+
+@dataclass
+class RollupRewrite:
+    """A query rewritten onto a rollup table"""
+    sql: str
+    rollup_table: str
+    source_table: str
+
+
+class RollupRewriter:
+    """Rewrites GROUP BY queries on a source table onto a matching rollup table"""
+
+    def __init__(self, rollups: Optional[Dict[str, Dict[str, Any]]] = None, source_columns: Optional[Dict[str, List[str]]] = None):
+        self.enabled = settings.ENABLE_ROLLUP_REWRITE
+        # Explicit registries (tests, tools) bypass the schema graph
+        self._registry = rollups
+        self._source_columns = source_columns
+        self._parsed: Dict[str, Rollup] = {}
+        # Rollup name -> MAX(day column) read by the background refresh
+        self._fresh_through: Dict[str, date] = {}
+        self.refresh_seconds = max(settings.ROLLUP_FRESHNESS_REFRESH_SECONDS, 1)
+        self._task: Optional[asyncio.Task] = None
+        self.rewrites = 0
+        self.stale_skips = 0
+
+    def _get_registry(self, table: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        if self._registry is not None:
+            registry = self._registry
+        else:
+            from .graph_builder import schema_graph
+            registry = schema_graph.rollups
+        return {name: info for name, info in registry.items() if table is None or info.get('source_table') == table}
+
+    def _get_rollups(self, table: Optional[str] = None) -> List[Rollup]:
+        registry = self._get_registry(table)
+        rollups = []
+        for name, info in registry.items():
+            if name not in self._parsed:
+                rollup = Rollup.from_registry(name, info)
+                if rollup is None:
+                    continue
+                self._parsed[name] = rollup
+            rollups.append(self._parsed[name])
+        return rollups
+
+    def _get_source_columns(self, table: str, rollup: Rollup) -> Set[str]:
+        """Raw columns of the source table (any of them left after translation blocks the rewrite)"""
+        if self._source_columns is not None:
+            columns = self._source_columns.get(table, [])
+        else:
+            from .graph_builder import schema_graph
+            columns = (schema_graph.get_table_info(table) or {}).get('columns', [])
+        names = {column.lower() for column in columns} | set(rollup.grain)
+        names.update(key[0] for key in rollup.dimensions if len(key) == 1)
+        return names
+
+    def rewrite(self, sql: str) -> Optional[RollupRewrite]:
+        """Rewrite a validated query onto the first matching rollup, or return None"""
+        if not self.enabled:
+            return None
+        clauses = parse_clauses(sql)
+        if clauses is None or clauses.head or clauses.distinct or clauses.window or clauses.for_ or not clauses.is_aggregate:
+            return None
+        if clauses.group_by and re.search(r'\bWITH\s+ROLLUP\b', clauses.group_by, re.IGNORECASE):
+            return None
+        match = re.fullmatch(r'`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?', clauses.from_.strip(), flags=re.IGNORECASE)
+        if not match:
+            # Joins and derived tables are not rewritten
+            return None
+        table, alias = match.group(1), match.group(2)
+        qualifiers = {table.lower()} | ({alias.lower()} if alias else set())
+
+        for rollup in self._get_rollups(table):
+            rewritten = self._rewrite_with(clauses, rollup, qualifiers, self._get_source_columns(table, rollup))
+            if rewritten is not None:
+                self.rewrites += 1
+                return RollupRewrite(sql=rewritten, rollup_table=rollup.name, source_table=table)
+        return None
+
+    def _rewrite_with(self, clauses, rollup: Rollup, qualifiers: Set[str], source_columns: Set[str]) -> Optional[str]:
+        def translate(text: str) -> Optional[str]:
+            return self._translate(_strip_qualifiers(text, qualifiers), rollup, source_columns)
+
+        items = clauses.select_items
+        aliases = {item.alias.lower() for item in items if item.alias}
+        select_parts = []
+        for item in items:
+            if item.is_star:
+                return None
+            expression = translate(item.expression)
+            if expression is None:
+                return None
+            name = item.alias or item.output_name
+            if name is None:
+                # Keep the column name the raw query would have produced
+                name = item.expression.strip()
+                if '`' in name:
+                    return None
+                name = f"`{name}`"
+            select_parts.append(f"{expression} AS {name}")
+
+        predicates = []
+        grain_predicates = []
+        missing_filters = set(rollup.filters)
+        for conjunct in split_conjuncts(clauses.where or ""):
+            stripped = _strip_qualifiers(conjunct, qualifiers)
+            if token_key(stripped) in missing_filters:
+                # The rollup was built with this filter already applied
+                missing_filters.discard(token_key(stripped))
+                continue
+            predicate = self._translate_grain_comparison(stripped, rollup) or translate(conjunct)
+            if predicate is None:
+                return None
+            predicates.append(predicate)
+        if missing_filters:
+            return None
+        if not self._is_fresh_for(predicates, rollup):
+            self.stale_skips += 1
+            return None
+
+        group_parts = []
+        for key in split_top_level(clauses.group_by or ""):
+            if key.isdigit() or key.strip('`').lower() in aliases:
+                group_parts.append(key)
+                continue
+            translated = translate(key)
+            if translated is None:
+                return None
+            group_parts.append(translated)
+
+        having = None
+        if clauses.having:
+            having = translate(clauses.having)
+            if having is None:
+                return None
+
+        order_parts = []
+        for order in clauses.order_items:
+            expression = order.expression
+            if not (expression.isdigit() or expression.strip('`').lower() in aliases):
+                expression = translate(expression)
+                if expression is None:
+                    return None
+            order_parts.append(f"{expression} DESC" if order.descending else expression)
+
+        sql = f"SELECT {', '.join(select_parts)} FROM {rollup.name}"
+        if predicates:
+            sql += f" WHERE {' AND '.join(predicates)}"
+        if group_parts:
+            sql += f" GROUP BY {', '.join(group_parts)}"
+        if having:
+            sql += f" HAVING {having}"
+        if order_parts:
+            sql += f" ORDER BY {', '.join(order_parts)}"
+        if clauses.limit:
+            sql += f" LIMIT {clauses.limit}"
+        if clauses.offset:
+            sql += f" OFFSET {clauses.offset}"
+        return sql
+
+    def _translate(self, text: str, rollup: Rollup, source_columns: Set[str]) -> Optional[str]:
+        """Rewrite an expression over the source table into one over the rollup, or None if it needs raw rows"""
+        tokens = list(iter_tokens(text))
+        dimensions = sorted(rollup.dimensions.items(), key=lambda item: -len(item[0]))
+        pieces, last, index = [], 0, 0
+        while index < len(tokens):
+            kind, value, start, _ = tokens[index]
+            word = _token_value(kind, value)
+            is_call = kind == 'word' and index + 1 < len(tokens) and tokens[index + 1][1] == '('
+
+            if is_call and (word in AGGREGATE_CALLS or word in DATE_PART_FUNCTIONS or word == 'date_format'):
+                close = _matching_paren(tokens, index + 1)
+                if close is None:
+                    return None
+                inner = text[tokens[index + 1][3]:tokens[close][2]]
+                if word in AGGREGATE_CALLS:
+                    replacement = self._translate_aggregate(word, inner, rollup)
+                else:
+                    replacement = self._translate_date_part(word, inner, rollup, text[start:tokens[index + 1][3]])
+                if replacement is not None:
+                    pieces.append(text[last:start] + replacement)
+                    last = tokens[close][3]
+                    index = close + 1
+                    continue
+                if word in AGGREGATE_CALLS:
+                    return None
+
+            matched = False
+            for key, column in dimensions:
+                window = tuple(_token_value(k, v) for k, v, _, _ in tokens[index:index + len(key)])
+                if window == key:
+                    pieces.append(text[last:start] + column)
+                    last = tokens[index + len(key) - 1][3]
+                    index += len(key)
+                    matched = True
+                    break
+            if matched:
+                continue
+
+            if kind in ('word', 'quoted') and word in source_columns and not is_call:
+                # A raw column the rollup does not keep
+                return None
+            index += 1
+        pieces.append(text[last:])
+        return ''.join(pieces)
+
+    def _translate_aggregate(self, function: str, argument: str, rollup: Rollup) -> Optional[str]:
+        """Re-aggregate a measure: COUNT -> SUM of counts, SUM -> SUM, MIN/MAX -> MIN/MAX, AVG -> SUM / SUM of counts"""
+        argument_key = token_key(argument)
+        if argument_key[:1] == ('distinct',):
+            return None
+        if function == 'count' and argument_key in (('*',), ('1',)):
+            argument_key = ('*',)
+
+        def measure(name: str) -> Optional[str]:
+            return rollup.measures.get((name, '(') + argument_key + (')',))
+
+        if function == 'count':
+            column = measure('count')
+            # COUNT is never NULL and is an integer; SUM of counts would be a NULL decimal on no rows
+            return f"CAST(COALESCE(SUM({column}), 0) AS SIGNED)" if column else None
+        if function == 'avg':
+            total, count = measure('sum'), measure('count')
+            return f"(SUM({total}) / NULLIF(SUM({count}), 0))" if total and count else None
+        column = measure(function)
+        return f"{function.upper()}({column})" if column else None
+
+    def _translate_date_part(self, function: str, argument: str, rollup: Rollup, call_prefix: str) -> Optional[str]:
+        """Evaluate a date-part function of the raw grain column on the rollup's day column"""
+        parts = split_top_level(argument)
+        if not parts:
+            return None
+        column = rollup.grain.get(parts[0].strip('`').lower())
+        if column is None:
+            return None
+        if function == 'date' and len(parts) == 1:
+            return column
+        if function == 'date_format':
+            if len(parts) != 2 or not re.fullmatch(r"'[^']*'", parts[1]):
+                return None
+            specifiers = set(re.findall(r'%(.)', parts[1]))
+            if not specifiers <= DATE_FORMAT_SPECIFIERS:
+                # Hour/minute/second specifiers need the raw timestamp
+                return None
+        elif len(parts) > 2 or (len(parts) == 2 and not parts[1].isdigit()):
+            return None
+        return call_prefix + ', '.join([column] + parts[1:]) + ')'
+
+    def _translate_grain_comparison(self, condition: str, rollup: Rollup) -> Optional[str]:
+        """Rewrite "raw_date >= <date>" / "raw_date < <date>" onto the day column (exact at midnight boundaries)"""
+        match = re.fullmatch(r'\s*`?(\w+)`?\s*(>=|<)\s*(.+?)\s*', condition, flags=re.DOTALL)
+        if not match or match.group(1).lower() not in rollup.grain:
+            return None
+        if not DATE_VALUED_EXPRESSION.fullmatch(match.group(3)):
+            return None
+        return f"{rollup.grain[match.group(1).lower()]} {match.group(2)} {match.group(3)}"
+
+    def get_fresh_through(self, rollup: Rollup) -> Optional[date]:
+        """Last day the rollup is complete for: pinned in the registry, else the last background read"""
+        return rollup.fresh_through or self._fresh_through.get(rollup.name)
+
+    def get_upper_bound(self, predicates: List[str], rollup: Rollup, today: Optional[date] = None) -> date:
+        """Last day a query's (translated) WHERE conjuncts can match on the rollup's day column; today if unbounded"""
+        today = today or date.today()
+        day_columns = '|'.join(re.escape(column) for column in rollup.grain.values())
+        upper = today
+        for predicate in predicates:
+            match = re.fullmatch(rf'\s*`?(?:{day_columns})`?\s*(<=|<|=)\s*(.+?)\s*', predicate, flags=re.IGNORECASE | re.DOTALL)
+            if match:
+                operator, bound = match.group(1), evaluate_date(match.group(2), today)
+            else:
+                match = re.fullmatch(rf'\s*`?(?:{day_columns})`?\s+BETWEEN\s+.+?\s+AND\s+(.+?)\s*', predicate,
+                                     flags=re.IGNORECASE | re.DOTALL)
+                if not match:
+                    continue
+                operator, bound = '<=', evaluate_date(match.group(1), today)
+            if bound is None:
+                continue
+            day, has_time = bound
+            # day < 'D' stops before D; day < 'D 10:00' still includes D
+            upper = min(upper, day - timedelta(days=1) if operator == '<' and not has_time else day)
+        return upper
+
+    def _is_fresh_for(self, predicates: List[str], rollup: Rollup) -> bool:
+        """Check that every day the query can match is already loaded into the rollup"""
+        if not rollup.grain:
+            # No day column: nothing to bound, the rollup is trusted as registered
+            return True
+        fresh_through = self.get_fresh_through(rollup)
+        return fresh_through is not None and self.get_upper_bound(predicates, rollup) <= fresh_through
+
+    def refresh_freshness(self) -> Dict[str, Optional[date]]:
+        """Read MAX(day column) of every registered rollup whose freshness is not pinned in the registry"""
+        from .db_executor import db_executor
+        refreshed = {}
+        for rollup in self._get_rollups():
+            if rollup.fresh_through is not None or not rollup.grain:
+                continue
+            days = []
+            for column in rollup.grain.values():
+                if not re.fullmatch(r'\w+', column):
+                    days.append(None)
+                    continue
+                result = db_executor.execute_query(f"SELECT MAX({column}) AS fresh_through FROM {rollup.name}")
+                days.append(_to_date(result["data"][0]["fresh_through"]) if result["success"] and result["data"] else None)
+            fresh_through = None if None in days or not days else min(days)
+            if fresh_through is None:
+                self._fresh_through.pop(rollup.name, None)
+            else:
+                self._fresh_through[rollup.name] = fresh_through
+            refreshed[rollup.name] = fresh_through
+        return refreshed
+
+    async def _run(self):
+        """Freshness refresh loop"""
+        while True:
+            try:
+                async with db_scheduler.slot(MAINTENANCE_TENANT):
+                    await asyncio.to_thread(self.refresh_freshness)
+            except Exception:
+                pass
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        """Start the background freshness refresh"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background freshness refresh"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rewrite statistics"""
+        fresh_through = {}
+        if self.enabled:
+            for rollup in self._get_rollups():
+                day = self.get_fresh_through(rollup)
+                fresh_through[rollup.name] = day.isoformat() if day else None
+        return {
+            'enabled': self.enabled,
+            'rewrites': self.rewrites,
+            'stale_skips': self.stale_skips,
+            'fresh_through': fresh_through
+        }
+
+
+# Global instance
+rollup_rewriter = RollupRewriter()
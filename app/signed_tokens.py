@@ -0,0 +1,95 @@
+"""
+Opaque, HMAC-signed tokens that carry validated query state between requests.
+Payloads are JSON, zlib-compressed and base64url-encoded, signed with SECRET_KEY and tagged with a kind and expiry.
+Tokens carry SQL that is run again, so none are issued or accepted while SECRET_KEY is a shipped default:
+the features that issue them stay off and the server reports a warning instead.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 1
+
+
+class SignedTokenError(ValueError):
+    """Raised when a token is malformed, tampered with, of the wrong kind or expired"""
+
+
+# SECRET_KEY values shipped in config.py and env.example; anyone can forge tokens signed with them
+DEFAULT_SECRET_KEYS = ("your-secret-key-here", "your-secret-key-here-change-this-in-production")
+
+
+def is_signing_key_configured() -> bool:
+    """Check whether SECRET_KEY has been set to a non-default value"""
+    key = (settings.SECRET_KEY or "").strip()
+    return bool(key) and key not in DEFAULT_SECRET_KEYS
+
+
+def get_token_features() -> List[str]:
+    """Enabled features that issue signed tokens"""
+    features = {
+        "ENABLE_PAGINATION": settings.ENABLE_PAGINATION,
+        "ENABLE_EXPORT": settings.ENABLE_EXPORT,
+        "ENABLE_APPROXIMATE_COUNT": settings.ENABLE_APPROXIMATE_COUNT
+    }
+    return [name for name, enabled in features.items() if enabled]
+
+
+def get_signing_key_warning() -> Optional[str]:
+    """Describe the token features left off because SECRET_KEY is unset or a default"""
+    features = get_token_features()
+    if not features or is_signing_key_configured():
+        return None
+    return (
+        f"SECRET_KEY is not set to a private value, so {', '.join(features)} "
+        f"{'is' if len(features) == 1 else 'are'} disabled (their tokens carry SQL)."
+    )
+
+
+def check_signing_key():
+    """Log (at startup) the token features left off by an unset or default SECRET_KEY"""
+    warning = get_signing_key_warning()
+    if warning:
+        logger.warning(warning)
+
+
+def _sign(body: str) -> str:
+    if not is_signing_key_configured():
+        raise SignedTokenError("token signing is disabled: SECRET_KEY is not configured")
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), body.encode('ascii'), hashlib.sha256).hexdigest()
+
+
+def create_signed_token(kind: str, payload: Dict[str, Any], ttl_seconds: int) -> str:
+    """Sign a payload as a token of the given kind"""
+    envelope = dict(payload, v=TOKEN_VERSION, kind=kind, exp=int(time.time()) + ttl_seconds)
+    raw = json.dumps(envelope, separators=(",", ":")).encode('utf-8')
+    body = base64.urlsafe_b64encode(zlib.compress(raw)).decode('ascii').rstrip('=')
+    return f"{body}.{_sign(body)}"
+
+
+def parse_signed_token(kind: str, token: str) -> Dict[str, Any]:
+    """Verify a token of the given kind and return its payload"""
+    try:
+        body, signature = token.rsplit('.', 1)
+    except (AttributeError, ValueError):
+        raise SignedTokenError("malformed token")
+    if not hmac.compare_digest(signature, _sign(body)):
+        raise SignedTokenError("invalid signature")
+    try:
+        payload = json.loads(zlib.decompress(base64.urlsafe_b64decode(body + '=' * (-len(body) % 4))))
+    except (ValueError, zlib.error):
+        raise SignedTokenError("malformed token")
+    if payload.get("v") != TOKEN_VERSION or payload.get("kind") != kind:
+        raise SignedTokenError("unsupported token")
+    if payload.get("exp", 0) < time.time():
+        raise SignedTokenError("token expired")
+    return payload
@@ -0,0 +1,283 @@
+"""
+Lightweight top-level clause parser for generated SELECT statements.
+Splits a query into its SELECT/FROM/WHERE/GROUP BY/HAVING/ORDER BY/LIMIT clauses, ignoring subqueries, strings and comments.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .sql_fingerprint import SQL_TOKEN_PATTERN
+
+# Multi-word clause keywords are matched as (first, second) word pairs
+_CLAUSE_KEYWORDS = {
+    ('select',): 'select',
+    ('from',): 'from',
+    ('where',): 'where',
+    ('group', 'by'): 'group_by',
+    ('having',): 'having',
+    ('window',): 'window',
+    ('order', 'by'): 'order_by',
+    ('limit',): 'limit',
+    ('offset',): 'offset',
+    ('for',): 'for',
+    ('union',): 'union',
+    ('intersect',): 'union',
+    ('except',): 'union',
+}
+
+AGGREGATE_FUNCTIONS = ('count', 'sum', 'avg', 'min', 'max', 'group_concat', 'std', 'stddev', 'variance')
+
+# "FROM table [AS] alias" / "JOIN table [AS] alias"
+TABLE_REFERENCE = re.compile(r'\b(?:FROM|JOIN)\s+`?(\w+)`?(?:\s+(?:AS\s+)?`?(\w+)`?)?', re.IGNORECASE)
+_NOT_ALIASES = {'where', 'on', 'using', 'join', 'inner', 'left', 'right', 'cross', 'natural', 'straight_join', 'full', 'outer',
+                'group', 'order', 'having', 'limit', 'window', 'union', 'for', 'use', 'force', 'ignore', 'partition'}
+
+
+@dataclass
+class SelectItem:
+    """One item of the SELECT list"""
+    expression: str
+    alias: Optional[str] = None
+
+    @property
+    def output_name(self) -> Optional[str]:
+        """Column name the item produces in the result set, if it can be determined statically"""
+        if self.alias:
+            return self.alias
+        match = re.fullmatch(r'(?:`?\w+`?\s*\.\s*)?`?(\w+)`?', self.expression.strip())
+        return match.group(1) if match and match.group(1) != '*' else None
+
+    @property
+    def is_star(self) -> bool:
+        return self.expression.strip() == '*' or self.expression.strip().endswith('.*')
+
+
+@dataclass
+class OrderItem:
+    """One item of the ORDER BY list"""
+    expression: str
+    descending: bool = False
+
+
+@dataclass
+class SQLClauses:
+    """Top-level clauses of a SELECT statement (clause text excludes the keyword)"""
+    head: str = ""
+    select: str = ""
+    from_: str = ""
+    where: Optional[str] = None
+    group_by: Optional[str] = None
+    having: Optional[str] = None
+    window: Optional[str] = None
+    order_by: Optional[str] = None
+    limit: Optional[str] = None
+    offset: Optional[str] = None
+    for_: Optional[str] = None
+    distinct: bool = False
+    spans: dict = field(default_factory=dict)
+
+    @property
+    def select_items(self) -> List[SelectItem]:
+        return [_parse_select_item(item) for item in split_top_level(self.select)]
+
+    @property
+    def order_items(self) -> List[OrderItem]:
+        if not self.order_by:
+            return []
+        items = []
+        for item in split_top_level(self.order_by):
+            match = re.match(r'(.*?)\s+(ASC|DESC)\s*$', item, flags=re.IGNORECASE | re.DOTALL)
+            if match:
+                items.append(OrderItem(match.group(1).strip(), match.group(2).upper() == 'DESC'))
+            else:
+                items.append(OrderItem(item.strip()))
+        return items
+
+    @property
+    def is_aggregate(self) -> bool:
+        """True when the query groups or aggregates rows"""
+        if self.group_by or self.having:
+            return True
+        return any(has_aggregate_call(item.expression) for item in self.select_items)
+
+
+def iter_tokens(sql: str):
+    """Yield (kind, value, start, end) for significant tokens"""
+    for match in SQL_TOKEN_PATTERN.finditer(sql):
+        if match.lastgroup in ('comment', 'space'):
+            continue
+        yield match.lastgroup, match.group(), match.start(), match.end()
+
+
+def split_conjuncts(text: str) -> List[str]:
+    """Split a condition on top-level AND (the AND of BETWEEN ... AND ... is kept)"""
+    parts, depth, last, in_between = [], 0, 0, False
+    for kind, value, start, end in iter_tokens(text or ""):
+        if kind == 'other' and value == '(':
+            depth += 1
+        elif kind == 'other' and value == ')':
+            depth -= 1
+        elif kind == 'word' and depth == 0:
+            word = value.lower()
+            if word == 'between':
+                in_between = True
+            elif word == 'and' and in_between:
+                in_between = False
+            elif word == 'and':
+                parts.append(text[last:start].strip())
+                last = end
+            elif word == 'or':
+                # A top-level OR makes the whole condition one term
+                return [(text or "").strip()] if (text or "").strip() else []
+    tail = (text or "")[last:].strip()
+    if tail:
+        parts.append(tail)
+    return parts
+
+
+def parse_function_call(expression: str) -> Optional[Tuple[str, str]]:
+    """Split "FUNC(args)" into (lowercase func, args) when the whole expression is a single call"""
+    tokens = list(iter_tokens(expression or ""))
+    if len(tokens) < 3 or tokens[0][0] != 'word' or tokens[1][1] != '(' or tokens[-1][1] != ')':
+        return None
+    depth = 0
+    for index, (kind, value, _, _) in enumerate(tokens[1:], start=1):
+        if kind != 'other':
+            continue
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            depth -= 1
+            if depth == 0 and index != len(tokens) - 1:
+                # e.g. "SUM(a) + MAX(b)": the call closes before the end
+                return None
+    return tokens[0][1].lower(), expression[tokens[1][3]:tokens[-1][2]].strip()
+
+
+def split_top_level(text: str, separator: str = ',') -> List[str]:
+    """Split text on a separator that is not inside parentheses, strings or comments"""
+    parts, depth, last = [], 0, 0
+    for kind, value, start, end in iter_tokens(text or ""):
+        if kind != 'other':
+            continue
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            depth -= 1
+        elif value == separator and depth == 0:
+            parts.append(text[last:start].strip())
+            last = end
+    tail = (text or "")[last:].strip()
+    if tail:
+        parts.append(tail)
+    return parts
+
+
+def has_aggregate_call(expression: str) -> bool:
+    """Check whether an expression calls an aggregate function outside a subquery"""
+    tokens = [(kind, value) for kind, value, _, _ in iter_tokens(expression)]
+    depth = 0
+    for i, (kind, value) in enumerate(tokens):
+        if kind == 'other' and value == '(':
+            depth += 1
+        elif kind == 'other' and value == ')':
+            depth -= 1
+        elif kind == 'word' and value.lower() == 'select':
+            return False
+        elif kind == 'word' and value.lower() in AGGREGATE_FUNCTIONS and i + 1 < len(tokens) and tokens[i + 1][1] == '(':
+            # A following OVER makes it a window function, which does not collapse rows
+            return not _is_window_call(tokens, i + 1)
+    return False
+
+
+def _is_window_call(tokens: List[Tuple[str, str]], open_index: int) -> bool:
+    depth = 0
+    for j in range(open_index, len(tokens)):
+        if tokens[j][1] == '(':
+            depth += 1
+        elif tokens[j][1] == ')':
+            depth -= 1
+            if depth == 0:
+                return j + 1 < len(tokens) and tokens[j + 1][1].lower() == 'over'
+    return False
+
+
+def _parse_select_item(item: str) -> SelectItem:
+    match = re.match(r'(.*?)\s+AS\s+`?(\w+)`?\s*$', item, flags=re.IGNORECASE | re.DOTALL)
+    if match:
+        return SelectItem(match.group(1).strip(), match.group(2))
+    # Implicit alias: "expr alias" where expr ends with ')' or an identifier
+    match = re.match(r'(.*[\w`)\]])\s+`?(\w+)`?\s*$', item, flags=re.DOTALL)
+    if match and match.group(2).upper() not in ('END', 'DESC', 'ASC'):
+        return SelectItem(match.group(1).strip(), match.group(2))
+    return SelectItem(item.strip())
+
+
+def parse_clauses(sql: str) -> Optional[SQLClauses]:
+    """Parse the top-level clauses of a single SELECT; returns None for set operations or non-SELECT SQL"""
+    sql = (sql or "").strip().rstrip(';').strip()
+    tokens = list(iter_tokens(sql))
+    depth = 0
+    boundaries: List[Tuple[str, int, int]] = []  # (clause, keyword_start, body_start)
+    i = 0
+    while i < len(tokens):
+        kind, value, start, end = tokens[i]
+        if kind == 'other' and value == '(':
+            depth += 1
+        elif kind == 'other' and value == ')':
+            depth -= 1
+        elif kind == 'word' and depth == 0:
+            word = value.lower()
+            next_word = tokens[i + 1][1].lower() if i + 1 < len(tokens) and tokens[i + 1][0] == 'word' else None
+            if (word, next_word) in _CLAUSE_KEYWORDS:
+                boundaries.append((_CLAUSE_KEYWORDS[(word, next_word)], start, tokens[i + 1][3]))
+                i += 2
+                continue
+            if (word,) in _CLAUSE_KEYWORDS:
+                clause = _CLAUSE_KEYWORDS[(word,)]
+                # Only the first top-level SELECT/FROM count; later ones belong to e.g. INSERT ... SELECT
+                if not any(b[0] == clause for b in boundaries) or clause == 'union':
+                    boundaries.append((clause, start, end))
+        i += 1
+
+    if not boundaries or boundaries[0][0] != 'select' or any(b[0] == 'union' for b in boundaries):
+        return None
+
+    clauses = SQLClauses(head=sql[:boundaries[0][1]].strip())
+    for index, (clause, keyword_start, body_start) in enumerate(boundaries):
+        body_end = boundaries[index + 1][1] if index + 1 < len(boundaries) else len(sql)
+        body = sql[body_start:body_end].strip()
+        clauses.spans[clause] = (keyword_start, body_end)
+        if clause == 'select':
+            match = re.match(r'(DISTINCT|DISTINCTROW|ALL)\b\s*', body, flags=re.IGNORECASE)
+            if match:
+                clauses.distinct = match.group(1).upper() != 'ALL'
+                body = body[match.end():]
+            clauses.select = body
+        elif clause == 'from':
+            clauses.from_ = body
+        elif clause == 'for':
+            clauses.for_ = body
+        else:
+            setattr(clauses, clause, body)
+    return clauses
+
+
+def get_table_aliases(sql: str) -> Dict[str, str]:
+    """Map each FROM/JOIN alias (or the table name itself when unaliased) to its table"""
+    tables_by_alias = {}
+    for table, alias in TABLE_REFERENCE.findall(sql or ""):
+        tables_by_alias[alias if alias and alias.lower() not in _NOT_ALIASES else table] = table
+    return tables_by_alias
+
+
+def strip_clauses(sql: str, clause_names: List[str]) -> str:
+    """Remove the given top-level clauses (e.g. ['order_by', 'limit']) from a SELECT"""
+    stripped = (sql or "").strip().rstrip(';').strip()
+    clauses = parse_clauses(stripped)
+    if clauses is None:
+        return stripped
+    spans = sorted((clauses.spans[name] for name in clause_names if name in clauses.spans), reverse=True)
+    for start, end in spans:
+        stripped = stripped[:start].rstrip() + ' ' + stripped[end:].lstrip()
+    return stripped.strip()
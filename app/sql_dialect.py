@@ -0,0 +1,280 @@
+"""
+Database dialect backends.
+SQL is generated, validated and rewritten in MySQL syntax; a dialect runs it on the configured database:
+it translates MySQL date functions, applies limits and time hints, quotes identifiers, cancels statements
+and turns the database's EXPLAIN output into MySQL-style plan rows for the cost gate.
+MySQL is the production backend; SQLite is a local stand-in loaded from tools/generate_fixture.py.
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from .sql_clauses import get_table_aliases, iter_tokens, split_top_level
+
+INTERVAL_PATTERN = re.compile(r'\s*INTERVAL\s+(-?\d+)\s+(\w+)\s*', re.IGNORECASE)
+DATE_LITERAL_PATTERN = re.compile(r"'\d{4}-\d{2}-\d{2}'")
+# MySQL interval unit -> (SQLite modifier unit, multiplier)
+SQLITE_INTERVAL_UNITS = {
+    'second': ('seconds', 1), 'minute': ('minutes', 1), 'hour': ('hours', 1), 'day': ('days', 1),
+    'week': ('days', 7), 'month': ('months', 1), 'quarter': ('months', 3), 'year': ('years', 1)
+}
+# MySQL DATE_FORMAT specifier -> strftime specifier (unlisted specifiers have no SQLite equivalent)
+SQLITE_DATE_FORMATS = {'Y': '%Y', 'y': '%y', 'm': '%m', 'd': '%d', 'H': '%H',
+                       'i': '%M', 's': '%S', 'S': '%S', 'j': '%j', 'T': '%H:%M:%S', '%': '%%'}
+# MySQL specifiers without a leading zero -> zero-padded strftime specifier, cast through an integer to drop the zero
+SQLITE_UNPADDED_DATE_FORMATS = {'c': '%m', 'e': '%d', 'k': '%H'}
+SQLITE_PLAN_PATTERN = re.compile(
+    r'^(SCAN|SEARCH)\s+(\w+)(?:\s+AS\s+(\w+))?'
+    r'(?:\s+USING\s+(COVERING\s+)?INDEX\s+(\w+)|\s+USING\s+(?:INTEGER\s+)?PRIMARY\s+KEY)?'
+    r'(?:\s+\((.*)\))?',
+    re.IGNORECASE
+)
+
+
+class SQLDialect:
+    """MySQL behaviour, which the rest of the pipeline assumes"""
+
+    name = "mysql"
+    # EXPLAIN row counts come from the optimizer (approximate counts may use them)
+    has_row_estimates = True
+
+    def quote_identifier(self, name: str) -> str:
+        """Quote a table or column name"""
+        return f"`{name.replace('`', '``')}`"
+
+    def translate(self, sql: str) -> str:
+        """Translate MySQL-syntax SQL into this dialect"""
+        return sql
+
+    def apply_limit(self, sql: str, limit: int) -> str:
+        """Append a LIMIT to a statement without one"""
+        return f"{sql.strip().rstrip(';')} LIMIT {int(limit)}"
+
+    def apply_execution_time_hint(self, sql: str, max_execution_time_ms: int) -> str:
+        """Bound a SELECT's run time with a MAX_EXECUTION_TIME optimizer hint"""
+        if re.search(r'MAX_EXECUTION_TIME\s*\(', sql, flags=re.IGNORECASE):
+            return sql
+        # The hint is only honoured directly after the leading SELECT keyword
+        match = re.match(r'\s*SELECT\b', sql, flags=re.IGNORECASE)
+        if not match:
+            return sql
+        return f"{sql[:match.end()]} /*+ MAX_EXECUTION_TIME({int(max_execution_time_ms)}) */{sql[match.end():]}"
+
+    def get_kill_sql(self, connection_id: int) -> Optional[str]:
+        """Statement that stops the query running on another connection, if the database has one"""
+        return f"KILL QUERY {int(connection_id)}"
+
+    def explain_sql(self, sql: str) -> str:
+        """Statement that returns the query's plan"""
+        return f"EXPLAIN {sql.strip().rstrip(';')}"
+
+    def normalize_explain(self, explain_rows: List[Dict[str, Any]], sql: str) -> List[Dict[str, Any]]:
+        """Convert plan rows into MySQL tabular EXPLAIN rows (id, table, type, key, ref, rows, filtered, Extra)"""
+        return explain_rows
+
+
+class SQLiteDialect(SQLDialect):
+    """SQLite stand-in: translates MySQL date functions and reads EXPLAIN QUERY PLAN"""
+
+    name = "sqlite"
+    has_row_estimates = False
+
+    def quote_identifier(self, name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
+
+    def apply_execution_time_hint(self, sql: str, max_execution_time_ms: int) -> str:
+        return sql
+
+    def get_kill_sql(self, connection_id: int) -> Optional[str]:
+        return None
+
+    def explain_sql(self, sql: str) -> str:
+        return f"EXPLAIN QUERY PLAN {sql.strip().rstrip(';')}"
+
+    def translate(self, sql: str) -> str:
+        """Rewrite MySQL-only function calls, innermost first; calls that cannot be translated are kept"""
+        tokens = list(iter_tokens(sql or ""))
+        pieces, last, index = [], 0, 0
+        while index < len(tokens):
+            kind, value, start, _ = tokens[index]
+            handler = _SQLITE_FUNCTIONS.get(value.lower()) if kind == 'word' else None
+            if handler is None or index + 1 >= len(tokens) or tokens[index + 1][1] != '(':
+                index += 1
+                continue
+            close = self._find_close(tokens, index + 1)
+            if close is None:
+                break
+            inner = sql[tokens[index + 1][3]:tokens[close][2]]
+            replacement = handler(self, [self.translate(arg) for arg in split_top_level(inner)])
+            if replacement is not None:
+                pieces.append(sql[last:start])
+                pieces.append(replacement)
+                last = tokens[close][3]
+            else:
+                # Keep the call but translate its arguments
+                pieces.append(sql[last:tokens[index + 1][3]])
+                pieces.append(self.translate(inner))
+                last = tokens[close][2]
+            index = close + 1
+        pieces.append(sql[last:])
+        return "".join(pieces)
+
+    @staticmethod
+    def _find_close(tokens, open_index: int) -> Optional[int]:
+        depth = 0
+        for index in range(open_index, len(tokens)):
+            if tokens[index][0] == 'other' and tokens[index][1] == '(':
+                depth += 1
+            elif tokens[index][0] == 'other' and tokens[index][1] == ')':
+                depth -= 1
+                if depth == 0:
+                    return index
+        return None
+
+    def _date_arithmetic(self, args: List[str], sign: int) -> Optional[str]:
+        if len(args) != 2:
+            return None
+        match = INTERVAL_PATTERN.fullmatch(args[1])
+        if match is None:
+            # DATE_ADD(x, n) adds days
+            if re.fullmatch(r'\s*-?\d+\s*', args[1]):
+                count, unit = int(args[1]), 'day'
+            else:
+                return None
+        else:
+            count, unit = int(match.group(1)), match.group(2).lower()
+        if unit not in SQLITE_INTERVAL_UNITS:
+            return None
+        modifier_unit, multiplier = SQLITE_INTERVAL_UNITS[unit]
+        amount = sign * count * multiplier
+        base = args[0].strip()
+        # Date in, date out (as in MySQL); anything else keeps its time part
+        function = 'date' if (base == "date('now')" or DATE_LITERAL_PATTERN.fullmatch(base) or base.lower().startswith('date(')) \
+            and modifier_unit not in ('seconds', 'minutes', 'hours') else 'datetime'
+        return f"{function}({base}, '{amount:+d} {modifier_unit}')"
+
+    def _date_format(self, args: List[str]) -> Optional[str]:
+        if len(args) != 2 or not re.fullmatch(r"\s*'[^']*'\s*", args[1]):
+            return None
+        mysql_format = args[1].strip()[1:-1]
+        # strftime() runs of the format, joined with || to the unpadded parts
+        parts: List[str] = []
+        pieces, index = [], 0
+        while index < len(mysql_format):
+            char = mysql_format[index]
+            if char == '%' and index + 1 < len(mysql_format):
+                code = mysql_format[index + 1]
+                if code in SQLITE_UNPADDED_DATE_FORMATS:
+                    if pieces:
+                        parts.append(f"strftime('{''.join(pieces)}', {args[0]})")
+                        pieces = []
+                    parts.append(f"CAST(CAST(strftime('{SQLITE_UNPADDED_DATE_FORMATS[code]}', {args[0]}) AS INTEGER) AS TEXT)")
+                    index += 2
+                    continue
+                specifier = SQLITE_DATE_FORMATS.get(code)
+                if specifier is None:
+                    return None
+                pieces.append(specifier)
+                index += 2
+            else:
+                pieces.append(char)
+                index += 1
+        if pieces or not parts:
+            parts.append(f"strftime('{''.join(pieces)}', {args[0]})")
+        return parts[0] if len(parts) == 1 else f"({' || '.join(parts)})"
+
+    def normalize_explain(self, explain_rows: List[Dict[str, Any]], sql: str) -> List[Dict[str, Any]]:
+        """Map EXPLAIN QUERY PLAN steps to MySQL-style rows; row estimates come from the statistics catalog"""
+        from .table_statistics import table_statistics
+        tables_by_alias = get_table_aliases(sql)
+        plan: List[Dict[str, Any]] = []
+        for row in explain_rows or []:
+            detail = str(row.get('detail') or '')
+            upper = detail.upper()
+            if upper.startswith('USE TEMP B-TREE'):
+                if plan:
+                    extra = 'Using filesort' if 'ORDER BY' in upper else 'Using temporary'
+                    plan[-1]['Extra'] = '; '.join(filter(None, [plan[-1]['Extra'], extra]))
+                continue
+            match = SQLITE_PLAN_PATTERN.match(detail)
+            if match is None:
+                continue
+            operation, alias, covering, index_name, condition = (
+                match.group(1).upper(), match.group(3) or match.group(2), match.group(4), match.group(5), match.group(6) or ''
+            )
+            table = tables_by_alias.get(alias, alias)
+            if operation == 'SCAN':
+                access_type = 'index' if index_name else 'ALL'
+            elif 'rowid=' in condition.lower():
+                # Probed once per outer row when it is not the first table
+                access_type = 'const' if not plan else 'eq_ref'
+            elif re.search(r'[<>]', condition):
+                access_type = 'range'
+            else:
+                access_type = 'ref'
+
+            rows = table_statistics.get_row_count(table)
+            if rows is not None and access_type in ('const', 'eq_ref'):
+                rows = 1
+            elif rows is not None and access_type in ('ref', 'range'):
+                column = re.match(r'\s*(\w+)', condition)
+                ndv = table_statistics.get_column_ndv(table, column.group(1)) if column else None
+                # Equality: an average key's share of rows; range: a third of the table, as MySQL assumes
+                rows = max(rows // ndv, 1) if access_type == 'ref' and ndv else max(rows // 3, 1)
+            plan.append({
+                'id': 1,
+                'select_type': 'SIMPLE',
+                'table': alias,
+                'type': access_type,
+                'key': index_name or ('PRIMARY' if access_type in ('const', 'eq_ref') else None),
+                # Lookups of a literal can only be told apart from join probes on the first table
+                'ref': 'const' if not plan and access_type in ('ref', 'const') and condition.count('=') == 1 else None,
+                'rows': rows,
+                'filtered': 100.0,
+                'Extra': 'Using index' if covering else None
+            })
+        return plan
+
+
+def _sqlite_date_part(specifier: str) -> Callable[[SQLiteDialect, List[str]], Optional[str]]:
+    def translate(dialect, args):
+        return f"CAST(strftime('{specifier}', {args[0]}) AS INTEGER)" if len(args) == 1 else None
+    return translate
+
+
+# MySQL function -> SQLite translation of its (already translated) arguments, or None to keep the call
+_SQLITE_FUNCTIONS: Dict[str, Callable[[SQLiteDialect, List[str]], Optional[str]]] = {
+    'curdate': lambda dialect, args: "date('now')" if not args else None,
+    'current_date': lambda dialect, args: "date('now')" if not args else None,
+    'now': lambda dialect, args: "datetime('now')" if not args else None,
+    'current_timestamp': lambda dialect, args: "datetime('now')" if not args else None,
+    'sysdate': lambda dialect, args: "datetime('now')" if not args else None,
+    'date_sub': lambda dialect, args: dialect._date_arithmetic(args, -1),
+    'subdate': lambda dialect, args: dialect._date_arithmetic(args, -1),
+    'date_add': lambda dialect, args: dialect._date_arithmetic(args, 1),
+    'adddate': lambda dialect, args: dialect._date_arithmetic(args, 1),
+    'year': _sqlite_date_part('%Y'),
+    'month': _sqlite_date_part('%m'),
+    'day': _sqlite_date_part('%d'),
+    'dayofmonth': _sqlite_date_part('%d'),
+    'hour': _sqlite_date_part('%H'),
+    'dayofweek': lambda dialect, args: f"(CAST(strftime('%w', {args[0]}) AS INTEGER) + 1)" if len(args) == 1 else None,
+    'quarter': lambda dialect, args: f"((CAST(strftime('%m', {args[0]}) AS INTEGER) + 2) / 3)" if len(args) == 1 else None,
+    'last_day': lambda dialect, args: f"date({args[0]}, 'start of month', '+1 month', '-1 day')" if len(args) == 1 else None,
+    'datediff': lambda dialect, args: (
+        f"CAST(julianday(date({args[0]})) - julianday(date({args[1]})) AS INTEGER)" if len(args) == 2 else None
+    ),
+    'date_format': lambda dialect, args: dialect._date_format(args),
+    'if': lambda dialect, args: f"IIF({', '.join(args)})" if len(args) == 3 else None,
+    'concat': lambda dialect, args: "(" + " || ".join(args) + ")" if args else None,
+}
+
+_DIALECTS = {
+    'mysql': SQLDialect,
+    'mariadb': SQLDialect,
+    'sqlite': SQLiteDialect,
+}
+
+
+def get_dialect(name: str) -> SQLDialect:
+    """Get the dialect backend for a SQLAlchemy dialect name (unknown databases are treated as MySQL)"""
+    return _DIALECTS.get((name or '').lower(), SQLDialect)()
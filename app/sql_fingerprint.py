@@ -0,0 +1,50 @@
+"""
+SQL normalization and fingerprinting utilities.
+Produces stable keys for caching plans and results of equivalent SQL statements.
+"""
+import re
+import hashlib
+from typing import List
+
+# Order matters: comments and quoted tokens must be matched before bare words/numbers
+SQL_TOKEN_PATTERN = re.compile(
+    r"(?P<comment>--[^\n]*|#[^\n]*|/\*(?!\+).*?\*/)"
+    r"|(?P<hint>/\*\+.*?\*/)"
+    r"|(?P<string>'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\")"
+    r"|(?P<quoted>`[^`]*`)"
+    r"|(?P<number>\b\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b)"
+    r"|(?P<word>[A-Za-z_][\w$]*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>.)",
+    re.DOTALL
+)
+
+
+def normalize_sql(sql: str, strip_literals: bool = False) -> str:
+    """Normalize whitespace, comments and keyword case; optionally replace literals with '?'"""
+    tokens: List[str] = []
+    for match in SQL_TOKEN_PATTERN.finditer(sql or ""):
+        kind = match.lastgroup
+        value = match.group()
+        if kind in ('comment', 'space'):
+            continue
+        if kind == 'word':
+            value = value.lower()
+        elif strip_literals and kind in ('string', 'number'):
+            value = '?'
+        tokens.append(value)
+
+    normalized = ' '.join(tokens)
+    # Tighten punctuation so formatting differences do not change the fingerprint
+    normalized = re.sub(r'\s*([(),;.])\s*', r'\1', normalized)
+    normalized = normalized.rstrip(';')
+    if strip_literals:
+        # IN-lists of different lengths share one plan shape
+        normalized = re.sub(r'\(\?(?:,\?)+\)', '(?+)', normalized)
+    return normalized
+
+
+def fingerprint_sql(sql: str, strip_literals: bool = True) -> str:
+    """Get a short, stable hash of the normalized SQL"""
+    normalized = normalize_sql(sql, strip_literals=strip_literals)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
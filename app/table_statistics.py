@@ -0,0 +1,256 @@
+"""
+Background collector for per-table statistics.
+Row counts, per-tenant row counts of scoped tables, column NDV estimates, columns and index lists are gathered
+periodically into an in-memory catalog, so request paths (schema endpoint, planner prompt, cost gate,
+approximate counts) read statistics instead of querying the database.
+"""
+import asyncio
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import inspect
+
+from .config import settings
+from .db_scheduler import db_scheduler, MAINTENANCE_TENANT
+
+
+@dataclass
+class TableStatistics:
+    """Statistics of one table as of collected_at"""
+    table: str
+    collected_at: float
+    row_count: Optional[int] = None
+    row_count_exact: bool = False
+    # Scoping value (as a string) -> rows; complete unless tenants_truncated
+    tenant_rows: Dict[str, int] = field(default_factory=dict)
+    tenants_truncated: bool = False
+    column_ndv: Dict[str, int] = field(default_factory=dict)
+    indexes: Dict[str, List[str]] = field(default_factory=dict)
+    columns: List[Dict[str, Any]] = field(default_factory=list)
+    # Table watermark versions at collection time
+    versions: Dict[str, int] = field(default_factory=dict)
+
+
+def format_row_count(rows: int) -> str:
+    """Compact row count for prompts, e.g. "~1.2M" """
+    for threshold, suffix in ((1_000_000_000, 'B'), (1_000_000, 'M'), (1_000, 'K')):
+        if rows >= threshold:
+            return f"~{rows / threshold:.1f}{suffix}"
+    return str(rows)
+
+
+class TableStatisticsCatalog:
+    """In-memory statistics catalog refreshed by a background task"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_TABLE_STATISTICS
+        self.refresh_seconds = max(settings.TABLE_STATISTICS_REFRESH_SECONDS, 1)
+        self.collect_tenant_rows = settings.TABLE_STATISTICS_TENANT_ROWS
+        self.max_tenants = settings.TABLE_STATISTICS_MAX_TENANTS
+        self.max_execution_time_ms = settings.TABLE_STATISTICS_MAX_EXECUTION_TIME_MS
+        self._tables: Dict[str, TableStatistics] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.collections = 0
+        self.collection_errors = 0
+
+    def get(self, table: str) -> Optional[TableStatistics]:
+        """Get the latest statistics of a table"""
+        with self._lock:
+            return self._tables.get(table)
+
+    def get_row_count(self, table: str, scoping_value: Optional[str] = None) -> Optional[int]:
+        """Get the table's row count, or the tenant's row count for a scoping value"""
+        stats = self.get(table)
+        if stats is None:
+            return None
+        if scoping_value is None:
+            return stats.row_count
+        if str(scoping_value) in stats.tenant_rows:
+            return stats.tenant_rows[str(scoping_value)]
+        # A tenant missing from a complete GROUP BY has no rows
+        return 0 if stats.tenant_rows and not stats.tenants_truncated else None
+
+    def get_indexes(self, table: str) -> Optional[Dict[str, List[str]]]:
+        """Get the table's indexes and their columns in key order"""
+        stats = self.get(table)
+        return stats.indexes if stats is not None else None
+
+    def get_column_ndv(self, table: str, column: str) -> Optional[int]:
+        """Get the estimated number of distinct values of a column (leading index columns only)"""
+        stats = self.get(table)
+        return stats.column_ndv.get(column.lower()) if stats is not None else None
+
+    def get_column_type(self, table: str, column: str) -> Optional[str]:
+        """Get a column's data type as reflected by SQLAlchemy (e.g. "VARCHAR(255)"), if collected"""
+        stats = self.get(table)
+        if stats is None:
+            return None
+        for info in stats.columns:
+            if info["column_name"].lower() == column.lower():
+                return info["data_type"]
+        return None
+
+    def is_unchanged(self, stats: TableStatistics) -> bool:
+        """Check that the table's watermark has not moved since the statistics were collected"""
+        from .table_watermarks import table_watermarks
+        return bool(stats.versions) and table_watermarks.is_current(stats.versions)
+
+    def _get_tables(self) -> List[str]:
+        from .graph_builder import schema_graph
+        return [table for table in schema_graph.tables.keys() if re.match(r'^\w+$', table)]
+
+    def get_scoping_column(self, table: str) -> Optional[str]:
+        """Get the scoping column of a scoped table"""
+        from .graph_builder import schema_graph
+        info = schema_graph.get_table_info(table) or {}
+        if not info.get('scoped', False):
+            return None
+        column = info.get('scoping_column', settings.security.SCOPING_COLUMN)
+        return column if re.match(r'^\w+$', column) else None
+
+    def collect_table(self, table: str) -> TableStatistics:
+        """Collect the statistics of one table"""
+        from .db_executor import db_executor
+        from .table_watermarks import table_watermarks
+
+        stats = TableStatistics(table=table, collected_at=time.time(), versions=table_watermarks.get_versions([table]))
+        inspector = inspect(db_executor.engine)
+        stats.columns = [
+            {
+                "column_name": column["name"],
+                "data_type": str(column["type"]),
+                "is_nullable": "YES" if column.get("nullable", True) else "NO",
+                "column_default": column.get("default")
+            }
+            for column in inspector.get_columns(table)
+        ]
+
+        if db_executor.dialect.name == 'mysql':
+            # One information_schema read gives the index list and the optimizer's NDV estimates
+            result = db_executor.execute_query(
+                "SELECT INDEX_NAME AS index_name, SEQ_IN_INDEX AS seq, COLUMN_NAME AS column_name, CARDINALITY AS ndv "
+                "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name",
+                {"table_name": table},
+                use_primary=True
+            )
+            if result["success"]:
+                for row in sorted(result["data"], key=lambda r: (r["index_name"], int(r["seq"]))):
+                    if row["column_name"] is None:
+                        continue
+                    column = row["column_name"].lower()
+                    stats.indexes.setdefault(row["index_name"], []).append(column)
+                    if int(row["seq"]) == 1 and row["ndv"] is not None:
+                        stats.column_ndv[column] = max(stats.column_ndv.get(column, 0), int(row["ndv"]))
+        else:
+            primary = inspector.get_pk_constraint(table).get("constrained_columns") or []
+            if primary:
+                stats.indexes["PRIMARY"] = [column.lower() for column in primary]
+            for index in inspector.get_indexes(table):
+                columns = [column.lower() for column in index.get("column_names") or [] if column]
+                if columns:
+                    stats.indexes[index["name"]] = columns
+            for column in {columns[0] for columns in stats.indexes.values()}:
+                result = db_executor.execute_query(
+                    f"SELECT COUNT(DISTINCT {column}) AS ndv FROM {table}",
+                    max_execution_time_ms=self.max_execution_time_ms,
+                    use_primary=True
+                )
+                if result["success"] and result["data"]:
+                    stats.column_ndv[column] = int(result["data"][0]["ndv"])
+
+        scoping_column = self.get_scoping_column(table)
+        if scoping_column and self.collect_tenant_rows:
+            result = db_executor.execute_query(
+                f"SELECT {scoping_column} AS tenant, COUNT(*) AS row_count FROM {table} GROUP BY {scoping_column}",
+                max_execution_time_ms=self.max_execution_time_ms,
+                as_dicts=False,
+                use_primary=True
+            )
+            if result["success"]:
+                rows = result["rows"]
+                stats.row_count = sum(int(count) for _, count in rows)
+                stats.row_count_exact = True
+                rows = sorted(rows, key=lambda row: row[1], reverse=True)
+                stats.tenants_truncated = len(rows) > self.max_tenants
+                stats.tenant_rows = {str(tenant): int(count) for tenant, count in rows[:self.max_tenants] if tenant is not None}
+                stats.column_ndv[scoping_column.lower()] = len(rows)
+
+        if stats.row_count is None:
+            if db_executor.dialect.name == 'mysql':
+                # InnoDB's estimate: free to read, unlike COUNT(*)
+                result = db_executor.execute_query(
+                    "SELECT TABLE_ROWS AS row_count FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name",
+                    {"table_name": table},
+                    use_primary=True
+                )
+            else:
+                result = db_executor.execute_query(
+                    f"SELECT COUNT(*) AS row_count FROM {table}",
+                    max_execution_time_ms=self.max_execution_time_ms,
+                    use_primary=True
+                )
+                stats.row_count_exact = result["success"]
+            if result["success"] and result["data"] and result["data"][0]["row_count"] is not None:
+                stats.row_count = int(result["data"][0]["row_count"])
+        return stats
+
+    def collect_once(self, tables: Optional[List[str]] = None) -> List[str]:
+        """Refresh the statistics of the given (default: all schema) tables and return the tables collected"""
+        collected = []
+        for table in tables if tables is not None else self._get_tables():
+            try:
+                stats = self.collect_table(table)
+            except Exception:
+                self.collection_errors += 1
+                continue
+            with self._lock:
+                self._tables[table] = stats
+            collected.append(table)
+        self.collections += 1
+        return collected
+
+    async def _run(self):
+        """Collection loop"""
+        while True:
+            try:
+                async with db_scheduler.slot(MAINTENANCE_TENANT):
+                    await asyncio.to_thread(self.collect_once)
+            except Exception:
+                self.collection_errors += 1
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self):
+        """Start the background collector"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background collector"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get collector statistics"""
+        with self._lock:
+            oldest = min((stats.collected_at for stats in self._tables.values()), default=None)
+            return {
+                'enabled': self.enabled,
+                'tables': len(self._tables),
+                'oldest_age_seconds': round(time.time() - oldest, 1) if oldest is not None else None,
+                'collections': self.collections,
+                'collection_errors': self.collection_errors
+            }
+
+
+# Global instance
+table_statistics = TableStatisticsCatalog()
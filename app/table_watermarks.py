@@ -0,0 +1,203 @@
+"""
+Background poller for per-table change watermarks.
+Each table gets a version counter that is bumped whenever its watermark moves, so cached results can be invalidated.
+Watermarks are read from the primary: replicas at different lag would make them move back and forth.
+A table whose watermark reads as NULL (an empty MAX(column), or UPDATE_TIME that InnoDB has not recorded) is untracked.
+"""
+import re
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import exc, text
+
+from .config import settings
+from .db_scheduler import db_scheduler, MAINTENANCE_TENANT
+
+INFORMATION_SCHEMA_SOURCE = "information_schema"
+
+
+class TableWatermarkTracker:
+    """Tracks cheap change watermarks (MAX(column) or information_schema UPDATE_TIME) per table"""
+
+    def __init__(self):
+        self.enabled = settings.ENABLE_TABLE_WATERMARKS
+        self.poll_interval = max(settings.TABLE_WATERMARK_POLL_SECONDS, 1)
+        self.sources = settings.get_table_watermark_sources()
+        self.table_intervals = settings.get_table_watermark_intervals()
+        self._watermarks: Dict[str, Any] = {}
+        self._versions: Dict[str, int] = {}
+        self._last_polled: Dict[str, float] = {}
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.poll_errors = 0
+
+    def add_listener(self, callback: Callable[[List[str]], None]):
+        """Register a callback invoked with the tables whose watermark moved"""
+        self._listeners.append(callback)
+
+    def is_tracked(self, table: str) -> bool:
+        """Check whether a table's watermark is being tracked"""
+        return self.enabled and self._watermarks.get(table) is not None
+
+    def get_versions(self, tables: List[str]) -> Dict[str, int]:
+        """Snapshot the current version of each tracked table"""
+        with self._lock:
+            return {table: self._versions[table] for table in tables or [] if table in self._watermarks}
+
+    def is_current(self, versions: Dict[str, int]) -> bool:
+        """Check that a version snapshot still matches the tracked tables"""
+        with self._lock:
+            return all(self._versions.get(table) == version for table, version in versions.items())
+
+    def _get_tables(self) -> List[str]:
+        """Get the tables to track: every table with a configured source, else every schema table"""
+        if self.sources:
+            return list(self.sources.keys())
+        from .graph_builder import schema_graph
+        return list(schema_graph.tables.keys())
+
+    def _get_due_tables(self, now: float) -> List[str]:
+        """Get tables whose poll interval has elapsed"""
+        due = []
+        for table in self._get_tables():
+            interval = self.table_intervals.get(table, self.poll_interval)
+            if now - self._last_polled.get(table, 0) >= interval:
+                due.append(table)
+        return due
+
+    def _fetch_watermarks(self, tables: List[str]) -> Dict[str, Any]:
+        """Read the current watermark of each table"""
+        from .db_executor import db_executor
+
+        watermarks: Dict[str, Any] = {}
+        info_schema_tables = []
+        for table in tables:
+            source = self.sources.get(table, INFORMATION_SCHEMA_SOURCE)
+            if source == INFORMATION_SCHEMA_SOURCE:
+                info_schema_tables.append(table)
+                continue
+            if not re.match(r'^\w+$', table) or not re.match(r'^\w+$', source):
+                continue
+            result = db_executor.execute_query(f"SELECT MAX({source}) AS watermark FROM {table}", use_primary=True)
+            if result["success"] and result["data"]:
+                watermarks[table] = result["data"][0]["watermark"]
+            else:
+                self.poll_errors += 1
+
+        if info_schema_tables:
+            try:
+                watermarks.update(self._fetch_update_times(info_schema_tables))
+            except Exception:
+                self.poll_errors += 1
+        return watermarks
+
+    def _fetch_update_times(self, tables: List[str]) -> Dict[str, Any]:
+        """Read UPDATE_TIME for tables whose source is information_schema"""
+        from .db_executor import db_executor
+
+        params = {f"t{i}": table for i, table in enumerate(tables)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        with db_executor._connect(use_primary=True) as conn:
+            # MySQL 8 serves UPDATE_TIME from a cache kept for information_schema_stats_expiry (a day by default)
+            expiry_set = False
+            try:
+                conn.execute(text("SET SESSION information_schema_stats_expiry = 0"))
+                expiry_set = True
+            except exc.DBAPIError:
+                pass  # MySQL 5.7 has no cache to bypass
+            try:
+                rows = conn.execute(
+                    text(
+                        "SELECT TABLE_NAME AS table_name, UPDATE_TIME AS watermark FROM information_schema.TABLES "
+                        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})"
+                    ),
+                    params
+                ).mappings().all()
+            finally:
+                if expiry_set:
+                    conn.execute(text("SET SESSION information_schema_stats_expiry = DEFAULT"))
+        return {row["table_name"]: row["watermark"] for row in rows}
+
+    def poll_once(self, tables: Optional[List[str]] = None) -> List[str]:
+        """Poll watermarks for the given (or due) tables and return the tables that changed"""
+        now = time.time()
+        tables = tables if tables is not None else self._get_due_tables(now)
+        if not tables:
+            return []
+
+        watermarks = self._fetch_watermarks(tables)
+        self.polls += 1
+        changed = []
+        with self._lock:
+            for table in tables:
+                self._last_polled[table] = now
+                if table not in watermarks:
+                    continue
+                watermark = watermarks[table]
+                if watermark is None:
+                    # Nothing to compare against: stop tracking, and drop results cached while it was tracked
+                    if table in self._watermarks:
+                        del self._watermarks[table]
+                        self._versions[table] += 1
+                        changed.append(table)
+                    continue
+                if table not in self._watermarks:
+                    # Versions only move forward, also for a table tracked again after a NULL watermark
+                    self._versions[table] = self._versions.get(table, -1) + 1
+                elif self._watermarks[table] != watermark:
+                    self._versions[table] += 1
+                    changed.append(table)
+                self._watermarks[table] = watermark
+
+        if changed:
+            for callback in self._listeners:
+                try:
+                    callback(changed)
+                except Exception:
+                    pass
+        return changed
+
+    async def _run(self):
+        """Poll loop"""
+        tick = min([self.poll_interval] + list(self.table_intervals.values()))
+        while True:
+            try:
+                async with db_scheduler.slot(MAINTENANCE_TENANT):
+                    await asyncio.to_thread(self.poll_once)
+            except Exception:
+                self.poll_errors += 1
+            await asyncio.sleep(max(tick, 1))
+
+    def start(self):
+        """Start the background poller"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background poller"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracker statistics"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'tracked_tables': len(self._watermarks),
+                'versions': dict(self._versions),
+                'polls': self.polls,
+                'poll_errors': self.poll_errors
+            }
+
+
+# Global instance
+table_watermarks = TableWatermarkTracker()
@@ -0,0 +1,90 @@
+"""
+Test cases for cross-tenant aggregate fan-out planning
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.aggregate_fanout import AggregateFanout
+from app.table_statistics import TableStatistics, table_statistics
+
+ADMIN = SimpleNamespace(role="admin", scoping_value=None)
+COLUMNS = {
+    "channel_name": "VARCHAR(255)",
+    "payment_type": "VARCHAR(20)",
+    "channel_id": "INTEGER",
+    "order_date": "DATETIME",
+    "cod_value": "DECIMAL(10, 2)",
+}
+
+
+@pytest.fixture
+def fanout(monkeypatch):
+    stats = TableStatistics(table="orders", collected_at=time.time(), columns=[
+        {"column_name": name, "data_type": data_type, "is_nullable": "YES", "column_default": None}
+        for name, data_type in COLUMNS.items()
+    ])
+    monkeypatch.setitem(table_statistics._tables, "orders", stats)
+    planner = AggregateFanout()
+    planner.enabled = True
+    planner.partition_count = 4
+    planner.configured_boundaries = {"orders": [100, 200, 300]}
+    return planner
+
+
+def plan(fanout, sql):
+    return asyncio.run(fanout.plan(sql, ADMIN))
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT channel_id, SUM(cod_value) FROM orders GROUP BY channel_id",
+    "SELECT DATE(o.order_date) AS day, COUNT(*) FROM orders o GROUP BY day",
+    "SELECT accounts_entity_id, MAX(order_date) FROM orders GROUP BY accounts_entity_id",
+    "SELECT COUNT(*) FROM orders",
+])
+def test_fans_out_on_exact_keys(fanout, sql):
+    assert plan(fanout, sql) is not None
+
+
+@pytest.mark.parametrize("sql", [
+    # A case-insensitive collation puts 'Delhi' and 'DELHI' in one group; a Python merge would not
+    "SELECT channel_name, COUNT(*) FROM orders GROUP BY channel_name",
+    "SELECT o.payment_type, SUM(cod_value) FROM orders o GROUP BY o.payment_type",
+    "SELECT MIN(channel_name) FROM orders",
+    # Unknown column type
+    "SELECT missing_column, COUNT(*) FROM orders GROUP BY missing_column",
+])
+def test_does_not_fan_out_on_text_keys(fanout, sql):
+    assert plan(fanout, sql) is None
+
+
+def test_partitions_are_bounded_and_fall_back(fanout, monkeypatch):
+    """Test that partitions never outnumber the tenant cap and a turned-away partition reruns the original query"""
+    from app.db_executor import db_executor
+    from app.db_scheduler import db_scheduler
+
+    monkeypatch.setattr(db_scheduler, "enabled", True)
+    monkeypatch.setattr(db_scheduler, "tenant_max_concurrency", 2)
+    sql = "SELECT channel_id, SUM(cod_value) FROM orders GROUP BY channel_id"
+    running, peak, calls = [0], [0], []
+
+    async def execute_query_guarded(query, params=None, **kwargs):
+        calls.append(query)
+        if query == sql:
+            return {"success": True, "rows": [(1, 10)]}
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        if params.get("_fan_lo") == 200:
+            return {"success": False, "error_code": "DB_QUEUE_FULL"}
+        return {"success": True, "rows": []}
+
+    monkeypatch.setattr(db_executor, "execute_query_guarded", execute_query_guarded)
+    result = asyncio.run(fanout.execute(plan(fanout, sql), ADMIN))
+    assert peak[0] == 2
+    assert calls[-1] == sql
+    assert result["rows"] == [(1, 10)]
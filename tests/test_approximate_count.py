@@ -0,0 +1,68 @@
+"""
+Test cases for reusing recorded exact counts as approximate answers
+"""
+
+import pytest
+
+from app.approximate_count import ApproximateCounter, CountEstimate, EXPLAIN_METHOD
+from app.result_cache import result_cache
+from app.table_watermarks import table_watermarks
+
+SQL = "SELECT COUNT(*) FROM orders WHERE accounts_entity_id = 7 AND cod_value > 0"
+TODAY_SQL = "SELECT COUNT(*) FROM orders WHERE accounts_entity_id = 7 AND DATE(order_date) = CURDATE()"
+
+
+@pytest.fixture
+def counter():
+    counter = ApproximateCounter()
+    counter.enabled = True
+    return counter
+
+
+@pytest.fixture
+def tracked(monkeypatch):
+    """Watermarks tracking the orders table at version 0"""
+    monkeypatch.setattr(table_watermarks, "enabled", True)
+    monkeypatch.setattr(table_watermarks, "_watermarks", {"orders": "2024-01-01 00:00:00"})
+    monkeypatch.setattr(table_watermarks, "_versions", {"orders": 0})
+    return table_watermarks
+
+
+def record(counter, sql, count):
+    counter.record(sql, {"success": True, "rows": [(count,)]})
+
+
+def test_recorded_count_needs_watermarks(counter):
+    """Test that without watermarks a recorded count is not reused with a made-up bound"""
+    record(counter, SQL, 42)
+    assert counter._estimate_from_statistics(counter.get_target(SQL)) is None
+
+
+def test_recorded_count_is_reused_until_the_table_changes(counter, tracked):
+    """Test that a recorded count is reused only while the watermark has not moved"""
+    record(counter, SQL, 42)
+    estimate = counter._estimate_from_statistics(counter.get_target(SQL))
+    assert (estimate.value, estimate.error_bound) == (42, 0.0)
+
+    tracked._versions["orders"] = 1
+    assert counter._estimate_from_statistics(counter.get_target(SQL)) is None
+
+    tracked._watermarks.clear()
+    assert counter._estimate_from_statistics(counter.get_target(SQL)) is None
+
+
+def test_time_relative_count_expires_with_its_bucket(counter, tracked, monkeypatch):
+    """Test that a CURDATE() count recorded yesterday is not reused today"""
+    monkeypatch.setattr(result_cache, "get_time_bucket", lambda sql: "date:2024-01-01" if "CURDATE" in sql else "static")
+    record(counter, TODAY_SQL, 42)
+    assert counter._estimate_from_statistics(counter.get_target(TODAY_SQL)).value == 42
+
+    monkeypatch.setattr(result_cache, "get_time_bucket", lambda sql: "date:2024-01-02" if "CURDATE" in sql else "static")
+    assert counter._estimate_from_statistics(counter.get_target(TODAY_SQL)) is None
+
+
+def test_optimizer_estimate_reports_no_bounds():
+    """Test that an EXPLAIN or TABLE_ROWS estimate does not claim a lower or upper bound"""
+    answer = CountEstimate(1000, None, EXPLAIN_METHOD, 0).to_dict()
+    assert answer["estimate"] == 1000 and not answer["bounded"]
+    assert "lower_bound" not in answer and "upper_bound" not in answer
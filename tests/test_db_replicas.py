@@ -0,0 +1,213 @@
+"""
+Test cases for read-replica routing, using SQLite files as replica stand-ins
+"""
+
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import NullPool
+
+from app import db_executor as db_executor_module
+from app.db_executor import DatabaseExecutor
+from app.db_pool import PoolMonitor
+from app.db_replicas import ReplicaRouter, NoReplicaAvailableError, is_replica_fault
+
+
+def _make_db(path, name):
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE source (name TEXT)")
+    conn.execute("INSERT INTO source VALUES (?)", (name,))
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+@pytest.fixture
+def replica_urls(tmp_path):
+    return [_make_db(tmp_path / "replica_a.db", "a"), _make_db(tmp_path / "replica_b.db", "b")]
+
+
+@pytest.fixture
+def broken_url(tmp_path):
+    # The parent directory does not exist, so every connect fails
+    return f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"
+
+
+def _read_source(router, primary=None):
+    with router.connect(primary) as conn:
+        return conn.execute(text("SELECT name FROM source")).scalar()
+
+
+class TestReplicaRouting:
+    """Test replica selection and ejection"""
+
+    def test_spreads_concurrent_load(self, replica_urls):
+        """Test that the least loaded replica is chosen"""
+        router = ReplicaRouter(urls=replica_urls)
+        first = router.choose()
+        second = router.choose()
+        assert first is not second
+        router.release(first, True)
+        router.release(second, True)
+        assert all(replica.in_flight == 0 for replica in router.replicas)
+
+    def test_routes_queries_to_replicas(self, replica_urls):
+        """Test that queries alternate between idle replicas"""
+        router = ReplicaRouter(urls=replica_urls)
+        names = {_read_source(router) for _ in range(4)}
+        assert names == {"a", "b"}
+        assert [replica.requests for replica in router.replicas] == [2, 2]
+
+    def test_error_rate_ejects_replica(self, replica_urls, broken_url):
+        """Test that a replica failing to connect is ejected and traffic moves to the healthy one"""
+        router = ReplicaRouter(urls=[broken_url, replica_urls[0]], eject_error_rate=0.5, eject_seconds=60)
+        broken, healthy = router.replicas
+        # Keep the healthy replica busy so the broken one keeps being picked until it is ejected
+        healthy.in_flight = 100
+        for _ in range(10):
+            try:
+                _read_source(router)
+            except Exception:
+                pass
+        healthy.in_flight = 0
+        assert broken.failures == 5
+        assert broken.ejections == 1
+        assert broken.eject_reason == "error_rate"
+        assert _read_source(router) == "a"
+        stats = router.get_stats()
+        assert stats["replicas"][0]["available"] is False
+        assert stats["replicas"][1]["available"] is True
+
+    def test_query_errors_do_not_eject(self, replica_urls):
+        """Test that errors caused by the SQL itself are not held against the replica"""
+        router = ReplicaRouter(urls=replica_urls[:1], eject_error_rate=0.1)
+        for _ in range(10):
+            with pytest.raises(Exception):
+                with router.connect() as conn:
+                    conn.execute(text("SELECT missing_column FROM source"))
+        replica = router.replicas[0]
+        assert replica.failures == 0
+        assert replica.ejections == 0
+
+    def test_pool_timeout_does_not_eject(self, replica_urls):
+        """Test that local pool saturation (QueuePool checkout timeout) is not held against the replica"""
+        router = ReplicaRouter(urls=replica_urls[:1], eject_error_rate=0.1)
+        replica = router.replicas[0]
+        assert is_replica_fault(exc.TimeoutError("QueuePool limit reached")) is False
+
+        def saturated():
+            raise exc.TimeoutError("QueuePool limit of size 5 overflow 10 reached")
+        replica.pool_monitor.connect = saturated
+        for _ in range(10):
+            with pytest.raises(exc.TimeoutError):
+                _read_source(router)
+        assert replica.failures == 0
+        assert replica.ejections == 0
+        assert replica.in_flight == 0
+
+    def test_health_check_ejects_and_probation(self, replica_urls, broken_url):
+        """Test that a failed health check ejects a replica and a failure after the cool-down re-ejects it"""
+        router = ReplicaRouter(urls=[broken_url, replica_urls[0]], eject_seconds=0)
+        assert router.check_all() == {router.replicas[0].name: False, router.replicas[1].name: True}
+        broken = router.replicas[0]
+        assert broken.eject_reason == "health_check"
+        assert broken.probation is True
+
+        # Cool-down of zero: the replica is eligible again but one failure puts it back out
+        router.eject_seconds = 60
+        router.replicas[1].in_flight = 10
+        with pytest.raises(Exception):
+            _read_source(router)
+        router.replicas[1].in_flight = 0
+        assert broken.ejections == 2
+        assert broken.eject_reason == "probation_failure"
+
+    def test_lag_ejects_replica(self, replica_urls):
+        """Test that a replica over the lag limit is ejected and re-admitted once it catches up"""
+        router = ReplicaRouter(urls=replica_urls[:1], max_lag_seconds=5, eject_seconds=60)
+        replica = router.replicas[0]
+        router._get_lag_seconds = lambda conn: 30.0
+        assert router.check_replica(replica) is False
+        assert router.choose() is None
+        router._get_lag_seconds = lambda conn: 1.0
+        assert router.check_replica(replica) is True
+        assert router.choose() is replica
+
+    def test_lag_weights_routing(self, replica_urls):
+        """Test that a lagging replica is preferred less"""
+        router = ReplicaRouter(urls=replica_urls, max_lag_seconds=10)
+        router.replicas[0].lag_seconds = 8
+        router.replicas[1].lag_seconds = 0
+        assert router.choose() is router.replicas[1]
+
+    def test_fallback_to_primary(self, replica_urls, tmp_path):
+        """Test the primary fallback when every replica is ejected"""
+        primary = PoolMonitor(create_engine(_make_db(tmp_path / "primary.db", "primary")))
+        router = ReplicaRouter(urls=replica_urls[:1], eject_seconds=60)
+        router.eject(router.replicas[0], "manual")
+        assert _read_source(router, primary) == "primary"
+        assert router.get_stats()["primary_fallbacks"] == 1
+        # The fallback checkout is recorded in the primary's pool metrics
+        assert len(primary._wait_times) == 1
+
+        router.fallback_to_primary = False
+        with pytest.raises(NoReplicaAvailableError):
+            _read_source(router, primary)
+
+    def test_pool_metrics(self, replica_urls):
+        """Test that per-replica pool metrics are exposed"""
+        router = ReplicaRouter(urls=replica_urls[:1])
+        with router.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            pool = router.get_stats()["replicas"][0]["pool"]
+            assert pool["checked_out"] == 1
+        stats = router.get_stats()["replicas"][0]
+        assert stats["pool"]["checked_out"] == 0
+        assert stats["in_flight"] == 0
+        assert stats["requests"] == 1
+
+
+class TestExecutorReplicaRouting:
+    """Test that the executor runs queries on replicas"""
+
+    def test_execute_query_uses_replica(self, replica_urls, tmp_path, monkeypatch):
+        """Test execute_query and an abandoned stream against a replica"""
+        router = ReplicaRouter(urls=replica_urls[:1])
+        monkeypatch.setattr(db_executor_module, "replica_router", router)
+        executor = DatabaseExecutor()
+        executor.engine = create_engine(_make_db(tmp_path / "primary.db", "primary"))
+
+        result = executor.execute_query("SELECT name FROM source")
+        assert result["success"] is True
+        assert result["data"] == [{"name": "a"}]
+
+        events = executor.stream_query("SELECT name FROM source")
+        next(events)
+        events.close()
+        replica = router.replicas[0]
+        assert replica.in_flight == 0
+        assert replica.failures == 0
+        assert replica.requests == 2
+
+    def test_use_primary_skips_replicas(self, replica_urls, tmp_path, monkeypatch):
+        """Test that maintenance reads (watermarks, statistics) stay on the primary"""
+        router = ReplicaRouter(urls=replica_urls[:1])
+        monkeypatch.setattr(db_executor_module, "replica_router", router)
+        executor = DatabaseExecutor()
+        executor.engine = create_engine(_make_db(tmp_path / "primary.db", "primary"))
+        executor.pool_monitor = PoolMonitor(executor.engine)
+
+        result = executor.execute_query("SELECT name FROM source", use_primary=True)
+        assert result["data"] == [{"name": "primary"}]
+        assert router.replicas[0].requests == 0
+
+    def test_kill_engine_per_server(self, replica_urls):
+        """Test that KILL QUERY goes through an unpooled engine of the server that runs the query"""
+        router = ReplicaRouter(urls=replica_urls)
+        executor = DatabaseExecutor()
+        kill_engine = executor._get_kill_engine(router.replicas[0].engine)
+        assert isinstance(kill_engine.pool, NullPool)
+        assert kill_engine.url == router.replicas[0].engine.url
+        assert executor._get_kill_engine(router.replicas[0].engine) is kill_engine
+        assert executor._get_kill_engine(router.replicas[1].engine) is not kill_engine
@@ -0,0 +1,46 @@
+"""
+Test cases for fair-share admission of database work
+"""
+
+import asyncio
+
+import pytest
+
+from app.db_executor import DatabaseExecutor
+from app import db_executor as db_executor_module
+from app.db_scheduler import AdmissionRejectedError, FairShareScheduler, UNSCOPED_TENANT
+
+
+def test_unscoped_callers_are_capped_per_role():
+    """Test that unscoped callers of one role do not use up the slots of another role"""
+    async def run():
+        scheduler = FairShareScheduler(max_concurrency=10, tenant_max_concurrency=2, tenant_max_queue=0)
+        await scheduler.acquire(None, "admin")
+        await scheduler.acquire(None, "admin")
+        with pytest.raises(AdmissionRejectedError):
+            await scheduler.acquire(None, "admin")
+        await scheduler.acquire(None, "analyst")
+        assert scheduler.get_stats()["tenants"][f"{UNSCOPED_TENANT}:admin"]["running"] == 2
+
+        scheduler.release(None, "admin")
+        await scheduler.acquire(None, "admin")
+        assert scheduler.running == 3
+    asyncio.run(run())
+
+
+def test_run_in_slot_holds_a_slot(monkeypatch):
+    """Test that blocking calls run through run_in_slot are admitted by the scheduler"""
+    scheduler = FairShareScheduler(max_concurrency=1, tenant_max_concurrency=1, tenant_max_queue=0)
+    scheduler.enabled = True
+    monkeypatch.setattr(db_executor_module, "db_scheduler", scheduler)
+    executor = DatabaseExecutor()
+    seen = []
+
+    async def run():
+        result = await executor.run_in_slot(lambda value: seen.append(scheduler.running) or value, 42, scoping_value="7")
+        assert result == 42
+        await scheduler.acquire("7")
+        with pytest.raises(AdmissionRejectedError):
+            await executor.run_in_slot(lambda: None, scoping_value="8")
+    asyncio.run(run())
+    assert seen == [1]
@@ -0,0 +1,56 @@
+"""
+Execute-as-validation must not run a query the endpoint would answer differently
+"""
+
+import asyncio
+
+import pytest
+
+from app.approximate_count import approximate_counter
+from app.config import settings
+from app.db_executor import db_executor
+from app.intelligent_sql_generator import IntelligentSQLGenerator
+from app.pagination import keyset_paginator
+from app.result_cache import result_cache
+
+LIST_SQL = "SELECT id, shipment_no FROM shipments WHERE accounts_entity_id = '42'"
+COUNT_SQL = "SELECT COUNT(*) FROM shipments WHERE accounts_entity_id = '42'"
+
+
+@pytest.fixture
+def executed(monkeypatch):
+    """Queries run by execute-as-validation"""
+    calls = []
+
+    async def execute_query_guarded(sql, params=None, **kwargs):
+        calls.append((sql, params))
+        return {"success": True, "rows": [], "row_count": 0}
+
+    monkeypatch.setattr(settings, "ENABLE_EXECUTE_AS_VALIDATION", True)
+    monkeypatch.setattr(settings, "SECRET_KEY", "3f1c0b9e-test-only-key")
+    monkeypatch.setattr(db_executor, "execute_query_guarded", execute_query_guarded)
+    monkeypatch.setattr(result_cache, "enabled", False)
+    return calls
+
+
+def validate(sql, approximate=False):
+    generator = IntelligentSQLGenerator.__new__(IntelligentSQLGenerator)
+    return asyncio.run(generator._execute_as_validation(sql, "42", None, ["shipments"], approximate))
+
+
+def test_approximate_count_is_not_executed(executed, monkeypatch):
+    monkeypatch.setattr(approximate_counter, "enabled", True)
+    assert validate(COUNT_SQL, approximate=True) is None
+    assert executed == []
+
+    # Without "approximate" the count is validated by running it
+    assert validate(COUNT_SQL) is not None
+    assert executed == [(COUNT_SQL, None)]
+
+
+def test_list_query_runs_as_first_page(executed, monkeypatch):
+    monkeypatch.setattr(keyset_paginator, "enabled", True)
+    page_plan = keyset_paginator.plan(LIST_SQL)
+    assert page_plan is not None
+    assert validate(LIST_SQL) is not None
+    assert executed == [keyset_paginator.build_page_sql(page_plan)]
@@ -0,0 +1,39 @@
+"""
+Tests for the cost gate's LIMIT rewrite
+"""
+
+import pytest
+
+from app.config import settings
+from app.query_cost import QueryCostEstimate, QueryCostEstimator
+
+
+@pytest.fixture
+def estimator(monkeypatch):
+    monkeypatch.setattr(settings, "COST_GATE_LIMIT_ROWS", 10)
+    return QueryCostEstimator()
+
+
+def tighten(estimator, sql):
+    return estimator._apply_tight_limit(sql, QueryCostEstimate(rows_examined=1_000_000, cost=1_000_000.0))
+
+
+@pytest.mark.parametrize("sql,expected", [
+    ("SELECT id FROM shipments", "SELECT id FROM shipments LIMIT 10"),
+    ("SELECT id FROM shipments LIMIT 500;", "SELECT id FROM shipments LIMIT 10"),
+    ("SELECT id FROM shipments LIMIT 5", "SELECT id FROM shipments LIMIT 5"),
+    ("SELECT id FROM shipments LIMIT 20, 500", "SELECT id FROM shipments LIMIT 20, 10"),
+    ("SELECT id FROM shipments LIMIT 500 OFFSET 20", "SELECT id FROM shipments LIMIT 10 OFFSET 20"),
+    ("SELECT id FROM shipments limit 3 offset 40", "SELECT id FROM shipments LIMIT 3 OFFSET 40"),
+])
+def test_tight_limit(estimator, sql, expected):
+    assert tighten(estimator, sql) == expected
+
+
+def test_tight_limit_keeps_a_single_limit_clause(estimator):
+    limited = tighten(estimator, "SELECT id FROM shipments ORDER BY id LIMIT 10 OFFSET 20")
+    assert limited.upper().count("LIMIT") == 1
+
+
+def test_tight_limit_skips_aggregates(estimator):
+    assert tighten(estimator, "SELECT COUNT(*) FROM shipments") is None
@@ -0,0 +1,31 @@
+"""
+Test cases for the coalescing key of natural language questions
+"""
+
+import pytest
+
+from app.request_coalescing import build_question_key, normalize_question
+
+
+@pytest.mark.parametrize("first,second", [
+    ("How many orders today?", "how  many ORDERS today"),
+    ("Orders for 'Delhi' this week.", "orders FOR 'Delhi'   this week"),
+    ("Shipments with status \"RTO\"?", "SHIPMENTS with status \"RTO\""),
+])
+def test_trivially_different_phrasings_share_a_key(first, second):
+    assert normalize_question(first) == normalize_question(second)
+
+
+@pytest.mark.parametrize("first,second", [
+    ("Orders for 'DELHI'", "Orders for 'delhi'"),
+    ("Customers named \"Ab  Cd\"", "Customers named \"Ab Cd\""),
+    ("Orders with channel ‘Amazon’", "Orders with channel ‘AMAZON’"),
+])
+def test_quoted_literals_keep_case_and_spacing(first, second):
+    assert normalize_question(first) != normalize_question(second)
+
+
+def test_key_includes_scope_and_role():
+    question = "How many orders today?"
+    assert build_question_key(question, "1", "customer") != build_question_key(question, "2", "customer")
+    assert build_question_key(question, "1", "customer") != build_question_key(question, "1", "admin")
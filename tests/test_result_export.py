@@ -0,0 +1,137 @@
+"""
+An export cut short by a cap or a query error must say so in the file
+"""
+
+import asyncio
+import csv
+import io
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.result_export import (
+    CSV_STATUS_ROWS, EXPORT_ERROR, EXPORT_TRUNCATED, PARQUET_STATUS_KEY, ResultExporter, pyarrow
+)
+
+COLUMNS = ["id", "city"]
+
+
+async def fake_events(batches, end=None):
+    yield {"type": "columns", "columns": COLUMNS}
+    for rows in batches:
+        yield {"type": "rows", "rows": rows}
+    yield end or {"type": "end", "row_count": sum(len(rows) for rows in batches), "truncated": False}
+
+
+def collect(body) -> bytes:
+    async def run():
+        return b"".join([chunk async for chunk in body])
+    return asyncio.run(run())
+
+
+def read_csv(body):
+    return list(csv.reader(io.StringIO(collect(body).decode("utf-8"))))
+
+
+BATCHES = [[(1, "Delhi"), (2, "Pune")], [(3, "Agra"), (4, "Goa")]]
+
+
+def test_csv_complete_has_no_status_row():
+    rows = read_csv(ResultExporter().stream_csv(fake_events(BATCHES), max_rows=10))
+    assert rows == [COLUMNS, ["1", "Delhi"], ["2", "Pune"], ["3", "Agra"], ["4", "Goa"]]
+
+
+@pytest.mark.parametrize("max_rows", [2, 3])
+def test_csv_row_cap_adds_truncated_row(max_rows):
+    rows = read_csv(ResultExporter().stream_csv(fake_events(BATCHES), max_rows=max_rows))
+    assert len(rows) == max_rows + 2
+    assert rows[-1][0] == CSV_STATUS_ROWS[EXPORT_TRUNCATED]
+
+
+def test_csv_exact_row_cap_is_complete():
+    rows = read_csv(ResultExporter().stream_csv(fake_events(BATCHES), max_rows=4))
+    assert rows[-1] == ["4", "Goa"]
+
+
+def test_csv_byte_cap_adds_truncated_row():
+    end = {"type": "end", "row_count": 2, "truncated": True}
+    rows = read_csv(ResultExporter().stream_csv(fake_events(BATCHES[:1], end), max_rows=10))
+    assert rows[-1][0] == CSV_STATUS_ROWS[EXPORT_TRUNCATED]
+
+
+def test_csv_mid_stream_error_adds_error_row():
+    end = {"type": "error", "result": {"success": False, "error": "Lost connection to server"}}
+    rows = read_csv(ResultExporter().stream_csv(fake_events(BATCHES[:1], end), max_rows=10))
+    assert rows[-1] == [CSV_STATUS_ROWS[EXPORT_ERROR], "Lost connection to server"]
+
+
+def test_stream_is_closed_when_export_stops_early():
+    closed = []
+
+    async def events():
+        try:
+            async for event in fake_events(BATCHES):
+                yield event
+        finally:
+            closed.append(True)
+
+    collect(ResultExporter().stream_csv(events(), max_rows=1))
+    assert closed == [True]
+
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+def test_parquet_truncated_export_is_not_read_as_complete():
+    import pyarrow.parquet
+
+    data = collect(ResultExporter().stream_parquet(fake_events(BATCHES), max_rows=3))
+    try:
+        metadata = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(data)).metadata.metadata
+    except pyarrow.ArrowInvalid:
+        return  # pyarrow < 17: no footer metadata, so the partial file has no footer
+    assert metadata[PARQUET_STATUS_KEY.encode()] == EXPORT_TRUNCATED.encode()
+
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+def test_parquet_complete_export_reads_back():
+    import pyarrow.parquet
+
+    data = collect(ResultExporter().stream_parquet(fake_events(BATCHES), max_rows=10))
+    table = pyarrow.parquet.read_table(pyarrow.BufferReader(data))
+    assert table.column("city").to_pylist() == ["Delhi", "Pune", "Agra", "Goa"]
+
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+@pytest.mark.parametrize("column_types, expected", [
+    ([None, (10, 3)], [Decimal("1.500"), Decimal("12345.678")]),
+    # No scale from the cursor: kept exactly as text
+    ([], ["1.50", "12345.678"]),
+])
+def test_parquet_decimal_scale_varies_across_row_groups(monkeypatch, column_types, expected):
+    import pyarrow.parquet
+
+    monkeypatch.setattr(settings, "EXPORT_PARQUET_ROW_GROUP_ROWS", 1)
+
+    async def events():
+        yield {"type": "columns", "columns": ["id", "amount"], "column_types": column_types}
+        yield {"type": "rows", "rows": [(1, Decimal("1.50"))]}
+        yield {"type": "rows", "rows": [(2, Decimal("12345.678"))]}
+        yield {"type": "end", "row_count": 2, "truncated": False}
+
+    data = collect(ResultExporter().stream_parquet(events(), max_rows=10))
+    parquet_file = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(data))
+    assert parquet_file.metadata.num_row_groups == 2
+    assert parquet_file.read().column("amount").to_pylist() == expected
+
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+def test_parquet_type_change_ends_with_error_status(monkeypatch):
+    import pyarrow.parquet
+
+    monkeypatch.setattr(settings, "EXPORT_PARQUET_ROW_GROUP_ROWS", 1)
+    data = collect(ResultExporter().stream_parquet(fake_events([[(1, "Delhi")], [(2.5, "Pune")]]), max_rows=10))
+    try:
+        metadata = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(data)).metadata.metadata
+    except pyarrow.ArrowInvalid:
+        return  # pyarrow < 17: the footer is left off
+    assert metadata[PARQUET_STATUS_KEY.encode()] == EXPORT_ERROR.encode()
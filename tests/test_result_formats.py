@@ -0,0 +1,50 @@
+"""
+The fast JSON response must put the same JSON on the wire as the QueryResponse + jsonable_encoder path
+"""
+
+import datetime as dt
+import json
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.main import QueryResponse
+from app.result_formats import FastJSONResponse
+
+ROWS = [
+    {
+        "total_price": Decimal("173.80"),
+        "cod_value": Decimal("0.00"),
+        "weight_in_kgs": Decimal("12.345"),
+        "supplier_id": 7,
+        "shipment_date": dt.date(2024, 1, 2),
+        "created_at": dt.datetime(2024, 1, 1, 8, 30, 5, 123),
+        "updated_at": dt.datetime(2024, 1, 1, 8, 30, tzinfo=dt.timezone.utc),
+        "pickup_window": dt.timedelta(hours=1, seconds=3),
+        "is_offline": b"\x00",
+        "awb": b"AWB123",
+        "remarks": None,
+    }
+]
+
+
+def _model_path(payload):
+    return json.loads(JSONResponse(content=jsonable_encoder(QueryResponse(**payload))).body)
+
+
+def _fast_path(payload):
+    return json.loads(FastJSONResponse(content=payload).body)
+
+
+def test_fast_json_matches_model_path():
+    payload = QueryResponse(
+        success=True, sql="SELECT 1", results=ROWS, row_count=len(ROWS), execution_time=0.1, tables_used=["shipments"]
+    ).model_dump()
+    assert _fast_path(payload) == _model_path(payload)
+
+
+def test_decimal_keeps_its_digits():
+    body = _fast_path({"results": ROWS})
+    assert body["results"][0]["total_price"] == "173.80"
+    assert body["results"][0]["cod_value"] == "0.00"
@@ -0,0 +1,192 @@
+"""
+Correctness harness for the rollup rewrite: every rewritten query must return the same answer
+from the rollup table as the original query does from the raw rows (local SQLite database)
+"""
+
+import json
+import math
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.config import SCHEMA_GRAPH_PATH
+from app.rollup_rewriter import RollupRewriter
+
+ROLLUP = "shipments_daily_rollup"
+
+REWRITABLE_QUERIES = [
+    # revenue by day
+    "SELECT DATE(shipment_date) AS day, SUM(total_price) AS revenue FROM shipments "
+    "WHERE accounts_entity_id = 3 AND shipment_date >= '2024-01-10' GROUP BY DATE(shipment_date) ORDER BY day DESC",
+    # shipments per carrier
+    "SELECT supplier_id, COUNT(*) AS shipment_count FROM shipments GROUP BY supplier_id ORDER BY shipment_count DESC, supplier_id",
+    "SELECT s.tracking_status, COUNT(*), AVG(s.total_price) AS avg_price, MIN(s.total_price) AS lo, MAX(s.total_price) AS hi "
+    "FROM shipments s WHERE s.accounts_entity_id IN (1, 2) AND s.shipment_date < '2024-01-20' "
+    "GROUP BY s.tracking_status ORDER BY 1",
+    "SELECT COUNT(*) AS n, SUM(cod_value) AS cod FROM shipments WHERE accounts_entity_id = 999",
+    "SELECT COUNT(*) AS n, SUM(cod_value) AS cod, COUNT(cod_value) AS with_cod FROM shipments WHERE accounts_entity_id = 4",
+    "SELECT booking_status, COUNT(cod_value) AS with_cod FROM shipments GROUP BY booking_status "
+    "HAVING COUNT(*) > 10 ORDER BY with_cod DESC, booking_status LIMIT 2",
+    "SELECT accounts_entity_id, DATE(shipment_date), ROUND(SUM(total_price) / COUNT(*), 2) AS avg_ticket FROM shipments "
+    "WHERE (tracking_status = '1900' OR tracking_status = '2000') GROUP BY accounts_entity_id, DATE(shipment_date) ORDER BY 1, 2",
+]
+
+NON_REWRITABLE_QUERIES = [
+    # '>' on the raw timestamp is not exact on a day grain
+    "SELECT supplier_id, COUNT(*) FROM shipments WHERE shipment_date > '2024-01-10' GROUP BY supplier_id",
+    # Not a rollup dimension
+    "SELECT from_pincode, COUNT(*) FROM shipments GROUP BY from_pincode",
+    "SELECT COUNT(DISTINCT supplier_id) FROM shipments",
+    # No measure for supplier_cost
+    "SELECT SUM(supplier_cost) FROM shipments",
+    "SELECT s.supplier_id, COUNT(*) FROM shipments s JOIN suppliers p ON p.id = s.supplier_id GROUP BY s.supplier_id",
+    "SELECT id, total_price FROM shipments WHERE accounts_entity_id = 1",
+]
+
+
+def _load_registry():
+    with open(SCHEMA_GRAPH_PATH) as f:
+        graph = json.load(f)
+    # The test rollup is built from every raw row, so it is complete through today
+    rollups = {name: dict(info, fresh_through=date.today().isoformat()) for name, info in graph["rollups"].items()}
+    return rollups, {"shipments": graph["tables"]["shipments"]["columns"]}
+
+
+@pytest.fixture(scope="module")
+def db():
+    rng = random.Random(7)
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE shipments (id INTEGER PRIMARY KEY, accounts_entity_id INTEGER, supplier_id INTEGER, "
+        "tracking_status TEXT, booking_status TEXT, shipment_date TEXT, total_price REAL, cod_value REAL, "
+        "from_pincode TEXT, supplier_cost REAL)"
+    )
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(3000):
+        shipment_date = start + timedelta(minutes=rng.randint(0, 30 * 24 * 60))
+        rows.append((
+            i, rng.randint(1, 6), rng.randint(1, 8), rng.choice(['1000', '1500', '1900', '2000']),
+            rng.choice(['1', '2', '3']), shipment_date.strftime('%Y-%m-%d %H:%M:%S'),
+            round(rng.uniform(50, 5000), 2), rng.choice([None, round(rng.uniform(0, 2000), 2)]),
+            str(rng.randint(100000, 999999)), round(rng.uniform(10, 100), 2)
+        ))
+    conn.executemany("INSERT INTO shipments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.execute(
+        f"CREATE TABLE {ROLLUP} AS SELECT accounts_entity_id, DATE(shipment_date) AS shipment_day, supplier_id, "
+        "tracking_status, booking_status, COUNT(*) AS shipment_count, SUM(total_price) AS total_price_sum, "
+        "COUNT(total_price) AS total_price_count, MIN(total_price) AS total_price_min, MAX(total_price) AS total_price_max, "
+        "SUM(cod_value) AS cod_value_sum, COUNT(cod_value) AS cod_value_count "
+        "FROM shipments GROUP BY accounts_entity_id, DATE(shipment_date), supplier_id, tracking_status, booking_status"
+    )
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def rewriter():
+    rollups, source_columns = _load_registry()
+    rewriter = RollupRewriter(rollups=rollups, source_columns=source_columns)
+    rewriter.enabled = True
+    return rewriter
+
+
+def _same_value(raw, rolled):
+    if isinstance(raw, float) or isinstance(rolled, float):
+        return raw is not None and rolled is not None and math.isclose(raw, rolled, rel_tol=1e-9, abs_tol=1e-6)
+    return raw == rolled
+
+
+def _query(db, sql):
+    cursor = db.execute(sql)
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+class TestRollupRewriteCorrectness:
+    """Rollup answers must match raw answers"""
+
+    @pytest.mark.parametrize("sql", REWRITABLE_QUERIES)
+    def test_rollup_matches_raw(self, db, rewriter, sql):
+        """Test that the rewritten query returns the raw query's columns and rows"""
+        rewrite = rewriter.rewrite(sql)
+        assert rewrite is not None, sql
+        assert rewrite.rollup_table == ROLLUP
+        assert f"FROM {ROLLUP}" in rewrite.sql
+
+        raw_columns, raw_rows = _query(db, sql)
+        rolled_columns, rolled_rows = _query(db, rewrite.sql)
+        assert rolled_columns == raw_columns
+        assert len(rolled_rows) == len(raw_rows)
+        if "ORDER BY" not in sql:
+            raw_rows, rolled_rows = sorted(raw_rows, key=repr), sorted(rolled_rows, key=repr)
+        for raw_row, rolled_row in zip(raw_rows, rolled_rows):
+            assert all(_same_value(a, b) for a, b in zip(raw_row, rolled_row)), (raw_row, rolled_row, rewrite.sql)
+
+    @pytest.mark.parametrize("sql", NON_REWRITABLE_QUERIES)
+    def test_ineligible_queries_are_not_rewritten(self, rewriter, sql):
+        """Test that queries needing raw rows are left alone"""
+        assert rewriter.rewrite(sql) is None
+
+    def test_registry_filters_must_match(self, rewriter):
+        """Test that a rollup built with a filter only answers queries with the same filter"""
+        rewriter._registry[ROLLUP] = dict(rewriter._registry[ROLLUP], filters=["booking_status <> '3'"])
+        rewriter._parsed.clear()
+        assert rewriter.rewrite("SELECT supplier_id, COUNT(*) FROM shipments GROUP BY supplier_id") is None
+        rewrite = rewriter.rewrite("SELECT supplier_id, COUNT(*) FROM shipments WHERE booking_status <> '3' GROUP BY supplier_id")
+        assert rewrite is not None
+        assert "booking_status" not in rewrite.sql
+
+    def test_disabled(self, rewriter):
+        """Test that nothing is rewritten when the feature is off"""
+        rewriter.enabled = False
+        assert rewriter.rewrite(REWRITABLE_QUERIES[1]) is None
+
+
+class TestRollupFreshness:
+    """Rollups only answer date ranges they are fully loaded for"""
+
+    @pytest.fixture
+    def stale_rewriter(self, rewriter):
+        # Nightly ETL: loaded through yesterday, today's rows are only in the raw table
+        rewriter._registry[ROLLUP] = dict(rewriter._registry[ROLLUP], fresh_through=(date.today() - timedelta(days=1)).isoformat())
+        rewriter._parsed.clear()
+        return rewriter
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT supplier_id, COUNT(*) FROM shipments WHERE shipment_date >= CURDATE() GROUP BY supplier_id",
+        "SELECT COUNT(*) FROM shipments WHERE DATE(shipment_date) BETWEEN '2024-01-01' AND NOW()",
+        "SELECT COUNT(*) FROM shipments WHERE DATE(shipment_date) = CURDATE()",
+        "SELECT COUNT(*) FROM shipments WHERE shipment_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)",
+        # No upper bound: runs through today
+        "SELECT supplier_id, COUNT(*) FROM shipments GROUP BY supplier_id",
+    ])
+    def test_today_inclusive_ranges_are_not_rewritten(self, stale_rewriter, sql):
+        """Test that a range reaching past the freshness watermark reads the raw table"""
+        assert stale_rewriter.rewrite(sql) is None
+
+    @pytest.mark.parametrize("sql", [
+        "SELECT COUNT(*) FROM shipments WHERE shipment_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY) AND shipment_date < CURDATE()",
+        "SELECT COUNT(*) FROM shipments WHERE DATE(shipment_date) <= DATE_SUB(CURDATE(), INTERVAL 1 DAY)",
+        "SELECT supplier_id, COUNT(*) FROM shipments WHERE shipment_date < '2024-01-20' GROUP BY supplier_id",
+        "SELECT COUNT(*) FROM shipments WHERE DATE(shipment_date) BETWEEN '2024-01-01' AND '2024-01-31'",
+    ])
+    def test_ranges_ending_before_the_watermark_are_rewritten(self, stale_rewriter, sql):
+        """Test that ranges ending on or before the last loaded day still use the rollup"""
+        assert stale_rewriter.rewrite(sql) is not None
+
+    def test_watermark_inside_the_range(self, rewriter):
+        """Test that a range ending after the watermark is not rewritten, even in the past"""
+        rewriter._registry[ROLLUP] = dict(rewriter._registry[ROLLUP], fresh_through="2024-01-15")
+        rewriter._parsed.clear()
+        assert rewriter.rewrite("SELECT COUNT(*) FROM shipments WHERE shipment_date < '2024-01-16'") is not None
+        assert rewriter.rewrite("SELECT COUNT(*) FROM shipments WHERE shipment_date < '2024-01-20'") is None
+
+    def test_unknown_freshness_is_not_rewritten(self, rewriter):
+        """Test that a rollup whose watermark has not been read yet is not used"""
+        rewriter._registry[ROLLUP] = {key: value for key, value in rewriter._registry[ROLLUP].items() if key != "fresh_through"}
+        rewriter._parsed.clear()
+        assert rewriter.rewrite(REWRITABLE_QUERIES[0]) is None
+        rewriter._fresh_through[ROLLUP] = date.today()
+        assert rewriter.rewrite(REWRITABLE_QUERIES[0]) is not None
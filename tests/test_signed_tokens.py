@@ -0,0 +1,65 @@
+"""
+Signed tokens carry SQL that is replayed: they need a private key, and their SQL is validated again on use
+"""
+
+import pytest
+
+from app.config import settings
+from app.main import revalidate_token_sql
+from app.pagination import keyset_paginator
+from app.result_export import result_exporter
+from app.signed_tokens import (
+    SignedTokenError, check_signing_key, create_signed_token, get_signing_key_warning, parse_signed_token
+)
+from app.user_context import permission_manager
+
+
+@pytest.fixture
+def private_key(monkeypatch):
+    monkeypatch.setattr(settings, "SECRET_KEY", "3f1c0b9e-test-only-key")
+
+
+@pytest.mark.parametrize("key", ["", "your-secret-key-here", "your-secret-key-here-change-this-in-production"])
+def test_default_key_refuses_tokens(monkeypatch, key):
+    monkeypatch.setattr(settings, "SECRET_KEY", key)
+    with pytest.raises(SignedTokenError):
+        create_signed_token("query", {"sql": "SELECT 1"}, 60)
+    # A token forged with the public default is not accepted either
+    with pytest.raises(SignedTokenError):
+        parse_signed_token("query", "eJyrVkrOz0nVS04sKcrPSVGyUlAqzsgvSk0pzSvOBAA.00")
+
+
+def test_default_key_disables_token_features(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SECRET_KEY", "your-secret-key-here")
+    monkeypatch.setattr(settings, "ENABLE_PAGINATION", True)
+    check_signing_key()
+    assert "ENABLE_PAGINATION" in caplog.text
+    assert keyset_paginator.plan("SELECT id, city FROM orders") is None
+    assert not result_exporter.can_export("admin")
+    for feature in ("ENABLE_PAGINATION", "ENABLE_EXPORT", "ENABLE_APPROXIMATE_COUNT"):
+        monkeypatch.setattr(settings, feature, False)
+    assert get_signing_key_warning() is None
+
+
+def test_round_trip_and_tampering(private_key, monkeypatch):
+    token = create_signed_token("query", {"sql": "SELECT 1"}, 60)
+    assert parse_signed_token("query", token)["sql"] == "SELECT 1"
+    with pytest.raises(SignedTokenError):
+        parse_signed_token("export", token)
+    monkeypatch.setattr(settings, "SECRET_KEY", "another-private-key")
+    with pytest.raises(SignedTokenError):
+        parse_signed_token("query", token)
+
+
+def test_token_sql_is_revalidated_for_the_request_scope():
+    customer = permission_manager.create_user_context(role="customer", scoping_value="42")
+    scoped = "SELECT shipment_no FROM shipments WHERE accounts_entity_id = '42'"
+    assert revalidate_token_sql(scoped, "42", customer)["valid"]
+
+    # Another tenant's query, or one without the scoping filter, is refused
+    with pytest.raises(SignedTokenError):
+        revalidate_token_sql("SELECT shipment_no FROM shipments WHERE accounts_entity_id = '7'", "42", customer)
+    with pytest.raises(SignedTokenError):
+        revalidate_token_sql("SELECT shipment_no FROM shipments", "42", customer)
+    with pytest.raises(SignedTokenError):
+        revalidate_token_sql("DELETE FROM shipments WHERE accounts_entity_id = '42'", "42", customer)
@@ -0,0 +1,118 @@
+"""
+Tests for the SQLite dialect backend (MySQL function translation, EXPLAIN QUERY PLAN normalization)
+and the schema-graph fixture generator
+"""
+
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+from app.config import SCHEMA_GRAPH_PATH
+from app.sql_dialect import SQLiteDialect, get_dialect
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tools"))
+from generate_fixture import build_fixture  # noqa: E402
+
+# MySQL expression -> value MySQL returns
+TRANSLATIONS = [
+    ("DATE_SUB('2024-03-01', INTERVAL 1 DAY)", "2024-02-29"),
+    ("DATE_ADD('2024-01-31', INTERVAL 2 WEEK)", "2024-02-14"),
+    ("DATE_SUB('2024-05-10', INTERVAL 1 QUARTER)", "2024-02-10"),
+    ("DATE_ADD('2024-01-01 10:00:00', INTERVAL 90 MINUTE)", "2024-01-01 11:30:00"),
+    ("DATE_ADD('2024-01-01', 3)", "2024-01-04"),
+    ("YEAR('2024-07-15 08:00:00')", 2024),
+    ("MONTH('2024-07-15')", 7),
+    ("QUARTER('2024-07-15')", 3),
+    ("DAYOFWEEK('2024-07-14')", 1),
+    ("LAST_DAY('2024-02-10')", "2024-02-29"),
+    ("DATEDIFF('2024-03-01', '2024-02-01 23:59:59')", 29),
+    ("DATE_FORMAT('2024-07-05 09:08:07', '%Y-%m-%d %H:%i:%s')", "2024-07-05 09:08:07"),
+    ("DATE_FORMAT('2024-07-05 09:08:07', '%c/%e/%Y %k:%i')", "7/5/2024 9:08"),
+    ("DATE_FORMAT('2024-12-25 00:30:00', '%e.%c')", "25.12"),
+    ("DATE_FORMAT('2024-01-02 00:30:00', '%k')", "0"),
+    ("IF(1 > 2, 'a', 'b')", "b"),
+    ("CONCAT('a', 1, 'b')", "a1b"),
+    ("YEAR(DATE_SUB('2024-01-01', INTERVAL 1 DAY))", 2023),
+]
+
+
+@pytest.fixture
+def dialect():
+    return SQLiteDialect()
+
+
+class TestSQLiteTranslation:
+    """Translated MySQL functions must give MySQL's values on SQLite"""
+
+    @pytest.mark.parametrize("expression,expected", TRANSLATIONS)
+    def test_translated_value(self, dialect, expression, expected):
+        """Test that a translated MySQL expression evaluates to MySQL's result"""
+        conn = sqlite3.connect(":memory:")
+        sql = dialect.translate(f"SELECT {expression}")
+        assert conn.execute(sql).fetchone()[0] == expected, sql
+
+    def test_untranslatable_calls_are_kept(self, dialect):
+        """Test that calls without a translation are left for the database to reject"""
+        sql = "SELECT DATE_FORMAT(created_at, '%W'), COUNT(*) FROM shipments WHERE created_at > DATE_SUB(NOW(), INTERVAL :n DAY)"
+        assert dialect.translate(sql) == sql.replace("NOW()", "datetime('now')")
+
+    def test_strings_and_identifiers_are_untouched(self, dialect):
+        """Test that function names inside strings or used as columns are not rewritten"""
+        sql = "SELECT `year`, 'CURDATE()' FROM t WHERE month = 3"
+        assert dialect.translate(sql) == sql
+
+    def test_mysql_dialect_is_identity(self):
+        """Test that MySQL SQL runs as generated"""
+        sql = "SELECT DATE_SUB(CURDATE(), INTERVAL 7 DAY)"
+        assert get_dialect("mysql").translate(sql) == sql
+        assert get_dialect("sqlite").name == "sqlite"
+
+
+class TestSQLiteExplain:
+    """EXPLAIN QUERY PLAN steps become MySQL-style rows for the cost gate"""
+
+    def _plan(self, dialect, conn, sql):
+        cursor = conn.execute(dialect.explain_sql(sql))
+        rows = [dict(zip([c[0] for c in cursor.description], row)) for row in cursor.fetchall()]
+        return dialect.normalize_explain(rows, sql)
+
+    def test_access_types(self, dialect):
+        """Test that scans, index lookups, ranges and sorts are mapped"""
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, a INTEGER, b TEXT)")
+        conn.execute("CREATE INDEX idx_a ON t (a)")
+
+        full_scan = self._plan(dialect, conn, "SELECT * FROM t WHERE b = 'x'")
+        assert [(row["table"], row["type"]) for row in full_scan] == [("t", "ALL")]
+
+        lookup = self._plan(dialect, conn, "SELECT * FROM t s WHERE s.a = 3 ORDER BY b")
+        assert lookup[0]["table"] == "s" and lookup[0]["type"] == "ref"
+        assert lookup[0]["key"] == "idx_a" and lookup[0]["ref"] == "const"
+        assert "Using filesort" in lookup[0]["Extra"]
+
+        assert self._plan(dialect, conn, "SELECT * FROM t WHERE a > 3")[0]["type"] == "range"
+        assert self._plan(dialect, conn, "SELECT * FROM t WHERE id = 3")[0]["type"] == "const"
+
+
+class TestFixtureGenerator:
+    """The generated fixture must match schema_graph.json"""
+
+    def test_fixture_matches_schema_graph(self, tmp_path):
+        """Test that every table, column and rollup exists and scoped tables spread over the tenants"""
+        with open(SCHEMA_GRAPH_PATH) as f:
+            graph = json.load(f)
+        output = str(tmp_path / "fixture.db")
+        sizes = build_fixture(graph, output, rows=50, table_rows={}, tenants=5, days=30, seed=1)
+
+        conn = sqlite3.connect(output)
+        for table, info in graph["tables"].items():
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+            assert columns == info["columns"], table
+            assert sizes[table] == 50
+        for name in graph.get("rollups", {}):
+            assert conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0] > 0
+        tenants = conn.execute("SELECT COUNT(DISTINCT accounts_entity_id) FROM shipments").fetchone()[0]
+        assert 1 < tenants <= 5
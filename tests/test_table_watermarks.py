@@ -0,0 +1,31 @@
+"""
+Test cases for table change watermarks
+"""
+
+from app.table_watermarks import TableWatermarkTracker
+
+
+def poll(tracker, monkeypatch, watermarks):
+    monkeypatch.setattr(tracker, "_fetch_watermarks", lambda tables: dict(watermarks))
+    return tracker.poll_once(["orders"])
+
+
+def test_null_watermark_is_untracked(monkeypatch):
+    """Test that a NULL UPDATE_TIME does not count as a tracked, unchanged table"""
+    tracker = TableWatermarkTracker()
+    tracker.enabled = True
+    poll(tracker, monkeypatch, {"orders": None})
+    assert not tracker.is_tracked("orders")
+    assert tracker.get_versions(["orders"]) == {}
+
+    poll(tracker, monkeypatch, {"orders": "2024-01-01 00:00:00"})
+    assert tracker.is_tracked("orders")
+    versions = tracker.get_versions(["orders"])
+
+    # Losing the watermark (e.g. after a restart) invalidates what was cached against it
+    assert poll(tracker, monkeypatch, {"orders": None}) == ["orders"]
+    assert not tracker.is_tracked("orders")
+    assert not tracker.is_current(versions)
+
+    poll(tracker, monkeypatch, {"orders": "2024-01-01 00:00:00"})
+    assert not tracker.is_current(versions)
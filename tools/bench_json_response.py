@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.main import QueryResponse  # noqa: E402
+from app.result_formats import FastJSONResponse, orjson  # noqa: E402
+
+
+def _make_rows(count: int) -> List[Dict[str, Any]]:
+    """Synthetic shipment rows with the value types PyMySQL returns"""
+    rng = random.Random(42)
+    base = dt.datetime(2024, 1, 1, 8, 30)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "shipment_no": f"SHP{i:010d}",
+            "accounts_entity_id": rng.randint(1, 500),
+            "supplier_id": rng.randint(1, 40),
+            "shipment_date": (base + dt.timedelta(minutes=i)).date(),
+            "created_at": base + dt.timedelta(seconds=i * 37),
+            "total_price": Decimal(f"{rng.uniform(50, 5000):.2f}"),
+            "cod_value": Decimal(f"{rng.uniform(0, 2000):.2f}"),
+            "weight_in_kgs": Decimal(f"{rng.uniform(0.1, 30):.3f}"),
+            "tracking_status": str(rng.choice([1000, 1500, 1900, 2000])),
+            "from_pincode": str(rng.randint(100000, 999999)),
+            "to_pincode": str(rng.randint(100000, 999999)),
+            "is_offline": b"\x00",
+        })
+    return rows
+
+
+def _payload(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "sql": "SELECT * FROM shipments WHERE accounts_entity_id = '42'",
+        "results": rows,
+        "row_count": len(rows),
+        "explanation": None,
+        "error": None,
+        "execution_time": 0.1,
+        "tables_used": ["shipments"],
+    }
+
+
+def _before(payload: Dict[str, Any]) -> bytes:
+    # What FastAPI does for response_model=QueryResponse: validate, jsonable_encoder, json.dumps
+    model = QueryResponse(**payload)
+    return JSONResponse(content=jsonable_encoder(model)).body
+
+
+def _after(payload: Dict[str, Any]) -> bytes:
+    return FastJSONResponse(content=payload).body
+
+
+def _measure(fn: Callable[[Dict[str, Any]], bytes], payload: Dict[str, Any], repeat: int) -> Dict[str, float]:
+    fn(payload)  # warm up
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    size = 0
+    for _ in range(repeat):
+        size = len(fn(payload))
+    wall = (time.perf_counter() - wall_start) / repeat
+    cpu = (time.process_time() - cpu_start) / repeat
+    rows = len(payload["results"])
+    return {
+        "wall_ms": wall * 1000,
+        "cpu_ms": cpu * 1000,
+        "bytes": size,
+        "responses_per_s": 1 / wall if wall else 0,
+        "rows_per_s": rows / wall if wall else 0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark /api/v2/query response serialization")
+    parser.add_argument("--rows", type=int, default=10000, help="Rows per response")
+    parser.add_argument("--repeat", type=int, default=10, help="Serializations per path")
+    args = parser.parse_args()
+
+    payload = _payload(_make_rows(args.rows))
+    results = {
+        "before (QueryResponse + jsonable_encoder + json)": _measure(_before, payload, args.repeat),
+        f"after (FastJSONResponse, {'orjson' if orjson else 'json fallback'})": _measure(_after, payload, args.repeat),
+    }
+
+    same = json.loads(_before(payload))["results"] == json.loads(_after(payload))["results"]
+    print(f"rows={args.rows} repeat={args.repeat} results_identical={same}")
+    for name, r in results.items():
+        print(
+            f"{name}: {r['wall_ms']:.1f} ms wall, {r['cpu_ms']:.1f} ms CPU, "
+            f"{r['responses_per_s']:.1f} responses/s, {r['rows_per_s']:.0f} rows/s, {r['bytes']} bytes"
+        )
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
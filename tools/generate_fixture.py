@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import argparse
+import datetime as dt
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+NUMERIC_COLUMN = re.compile(r'(price|cost|value|amount|balance|weight|charge|total|fee|rate|length|width|height|breadth|kgs)')
+FLAG_COLUMN = re.compile(r'^(is_|has_)|_(activated|enabled|active|flag)$')
+DATETIME_COLUMN = re.compile(r'(_at|_date|_time|^date)$')
+
+
+def _load_graph(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _sqlite_type(kind: str) -> str:
+    return {"int": "INTEGER", "real": "REAL", "datetime": "TEXT", "text": "TEXT"}[kind]
+
+
+def _plan_columns(graph: Dict[str, Any], table: str, table_rows: Dict[str, int], tenants: int, days: int,
+                  rng: random.Random) -> List[Tuple[str, str, Callable[[int], Any]]]:
+    """(column, kind, value(row_id)) for every column of a table"""
+    info = graph["tables"][table]
+    scoping_column = info.get("scoping_column", graph.get("security_model", {}).get("scoping_column"))
+    # Join columns: targets hold unique values, sources sample from the target's range
+    targets = {rel.get("to_column") for rel in graph["relationships"] if rel["to"] == table and rel.get("to_column")}
+    sources = {rel["on"]: rel["to"] for rel in graph["relationships"] if rel["from"] == table}
+    codes = {key.split(".", 1)[1]: list(mapping.get("values", {}).keys())
+             for key, mapping in graph.get("code_mappings", {}).items() if key.split(".", 1)[0] == table}
+    now = dt.datetime.now().replace(microsecond=0)
+
+    columns = []
+    for column in info["columns"]:
+        name = column.lower()
+        if name == "id":
+            columns.append((column, "int", lambda i: i))
+        elif name == (scoping_column or "").lower():
+            columns.append((column, "int", lambda i: rng.randint(1, tenants)))
+        elif column in targets:
+            columns.append((column, "int", lambda i: i))
+        elif column in sources:
+            upper = max(table_rows.get(sources[column], tenants), 1)
+            columns.append((column, "int", lambda i, upper=upper: rng.randint(1, upper)))
+        elif column in codes and codes[column]:
+            columns.append((column, "text", lambda i, values=codes[column]: rng.choice(values)))
+        elif name == "deleted_at":
+            columns.append((column, "datetime", lambda i: None if rng.random() < 0.95 else
+                            (now - dt.timedelta(minutes=rng.randint(0, days * 1440))).strftime("%Y-%m-%d %H:%M:%S")))
+        elif DATETIME_COLUMN.search(name):
+            columns.append((column, "datetime", lambda i: (now - dt.timedelta(minutes=rng.randint(0, days * 1440))).strftime("%Y-%m-%d %H:%M:%S")))
+        elif FLAG_COLUMN.search(name):
+            columns.append((column, "int", lambda i: int(rng.random() < 0.7)))
+        elif name.endswith("_id") or name.endswith("_by"):
+            columns.append((column, "int", lambda i: rng.randint(1, 50)))
+        elif NUMERIC_COLUMN.search(name):
+            columns.append((column, "real", lambda i: None if rng.random() < 0.1 else round(rng.uniform(1, 5000), 2)))
+        elif "pincode" in name or "mobile" in name or "phone" in name:
+            columns.append((column, "text", lambda i: str(rng.randint(100000, 999999))))
+        elif "email" in name:
+            columns.append((column, "text", lambda i: f"user{i}@example.com"))
+        elif "status" in name or "type" in name:
+            columns.append((column, "text", lambda i: str(rng.randint(0, 5))))
+        else:
+            columns.append((column, "text", lambda i, column=column: f"{column}_{i % 97}"))
+    return columns
+
+
+def _index_columns(graph: Dict[str, Any], table: str) -> List[str]:
+    info = graph["tables"][table]
+    indexed = []
+    if info.get("scoped", False):
+        indexed.append(info.get("scoping_column", graph.get("security_model", {}).get("scoping_column")))
+    for rel in graph["relationships"]:
+        if rel["from"] == table:
+            indexed.append(rel["on"])
+        if rel["to"] == table and rel.get("to_column") and rel["to_column"] != "id":
+            indexed.append(rel["to_column"])
+    indexed += [column for column in info["columns"] if column.endswith("_date")]
+    return [column for column in dict.fromkeys(indexed) if column in info["columns"]]
+
+
+def build_fixture(graph: Dict[str, Any], output: str, rows: int, table_rows: Dict[str, int], tenants: int,
+                  days: int, seed: int, batch_size: int = 5000) -> Dict[str, int]:
+    """Create a SQLite database with every schema-graph table, indexes and registered rollups"""
+    rng = random.Random(seed)
+    sizes = {table: table_rows.get(table, rows) for table in graph["tables"]}
+    if os.path.exists(output):
+        os.remove(output)
+    conn = sqlite3.connect(output)
+    try:
+        for table in graph["tables"]:
+            columns = _plan_columns(graph, table, sizes, tenants, days, rng)
+            definitions = ", ".join(
+                f'"{column}" INTEGER PRIMARY KEY' if column.lower() == "id" else f'"{column}" {_sqlite_type(kind)}'
+                for column, kind, _ in columns
+            )
+            conn.execute(f'CREATE TABLE "{table}" ({definitions})')
+            placeholders = ", ".join("?" for _ in columns)
+            batch = []
+            for row_id in range(1, sizes[table] + 1):
+                batch.append(tuple(value(row_id) for _, _, value in columns))
+                if len(batch) >= batch_size:
+                    conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', batch)
+                    batch = []
+            if batch:
+                conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', batch)
+            for column in _index_columns(graph, table):
+                conn.execute(f'CREATE INDEX "idx_{table}_{column}" ON "{table}" ("{column}")')
+
+        for name, rollup in graph.get("rollups", {}).items():
+            source = rollup["source_table"]
+            if source not in graph["tables"]:
+                continue
+            select = [f'"{column}" AS "{alias}"' for column, alias in rollup.get("dimensions", {}).items()]
+            group = [f'"{column}"' for column in rollup.get("dimensions", {})]
+            for column, alias in rollup.get("grain", {}).items():
+                select.append(f'DATE("{column}") AS "{alias}"')
+                group.append(f'DATE("{column}")')
+            select += [f'{expression} AS "{alias}"' for expression, alias in rollup.get("measures", {}).items()]
+            where = " AND ".join(f"({condition})" for condition in rollup.get("filters", []))
+            conn.execute(
+                f'CREATE TABLE "{name}" AS SELECT {", ".join(select)} FROM "{source}"'
+                + (f" WHERE {where}" if where else "") + f' GROUP BY {", ".join(group)}'
+            )
+            sizes[name] = conn.execute(f'SELECT COUNT(*) FROM "{name}"').fetchone()[0]
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return sizes
+
+
+def _parse_table_rows(values: Optional[List[str]]) -> Dict[str, int]:
+    table_rows = {}
+    for value in values or []:
+        table, _, count = value.partition("=")
+        table_rows[table] = int(count)
+    return table_rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Generate a SQLite fixture matching schema_graph.json (run the app with DB_URL=sqlite:///<output>)"
+    )
+    parser.add_argument("--schema", default=os.path.join(ROOT, "graph", "schema_graph.json"), help="Schema graph JSON")
+    parser.add_argument("--output", default="fixture.db", help="SQLite database file (replaced if it exists)")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per table")
+    parser.add_argument("--table-rows", action="append", metavar="TABLE=ROWS", help="Row count for one table (repeatable)")
+    parser.add_argument("--tenants", type=int, default=20, help="Distinct scoping values")
+    parser.add_argument("--days", type=int, default=365, help="Timestamps fall within this many days before now")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table_rows = {"entities": args.tenants}
+    table_rows.update(_parse_table_rows(args.table_rows))
+    sizes = build_fixture(
+        _load_graph(args.schema), args.output, args.rows, table_rows, args.tenants, args.days, args.seed
+    )
+    print(f"{args.output}: {len(sizes)} tables, {sum(sizes.values())} rows in {time.perf_counter() - start:.1f}s")
+    print(f"DB_URL=sqlite:///{os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -46,6 +46,8 @@ export function QueryInterface() {
   const { theme } = useTheme()
   const [isLoading, setIsLoading] = useState(false)
   const [lastResponse, setLastResponse] = useState<QueryResponse | null>(null)
+  const [lastRequest, setLastRequest] = useState<any>(null)
+  const [isLoadingMore, setIsLoadingMore] = useState(false)
   const [queryHistory, setQueryHistory] = useState<any[]>([])
   const [showAdvanced, setShowAdvanced] = useState(false)
   const [showResults, setShowResults] = useState(true)
@@ -138,6 +140,7 @@ export function QueryInterface() {
       console.log('Received response:', result)
 
       setLastResponse(result)
+      setLastRequest(requestData)
       setQueryHistory(prev => [data, ...prev.slice(0, 9)]) // Keep last 10 queries
 
       if (result.success) {
@@ -153,6 +156,36 @@ export function QueryInterface() {
     }
   }
 
+  const loadMore = async () => {
+    if (!lastResponse?.continuation_token) return
+    setIsLoadingMore(true)
+
+    try {
+      // Next page comes from the continuation token, no new LLM call
+      const result = await ApiClient.postQueryNext({
+        continuation_token: lastResponse.continuation_token,
+        user_role: lastRequest?.user_role,
+        scoping_value: lastRequest?.scoping_value,
+      })
+
+      if (result.success) {
+        setLastResponse(prev => prev && {
+          ...prev,
+          results: [...prev.results, ...result.results],
+          row_count: prev.row_count + result.row_count,
+          continuation_token: result.continuation_token,
+        })
+      } else {
+        toast.error(result.message || result.error || 'Failed to load more rows')
+      }
+    } catch (error) {
+      console.error('Load more error:', error)
+      toast.error('Failed to load more rows')
+    } finally {
+      setIsLoadingMore(false)
+    }
+  }
+
   const copyToClipboard = (text: string) => {
     navigator.clipboard.writeText(text)
     toast.success('Copied to clipboard')
@@ -811,6 +844,18 @@ export function QueryInterface() {
                       </div>
                     </div>
                   )}
+                  {lastResponse.continuation_token && (
+                    <div className="px-6 py-4 border-t border-gray-200 dark:border-gray-700 flex justify-center">
+                      <button
+                        type="button"
+                        onClick={loadMore}
+                        disabled={isLoadingMore}
+                        className="px-6 py-2 text-sm font-semibold text-blue-700 dark:text-blue-300 bg-blue-50 dark:bg-blue-900/30 rounded-lg hover:bg-blue-100 dark:hover:bg-blue-900/50 disabled:opacity-50 transition-colors"
+                      >
+                        {isLoadingMore ? 'Loading...' : 'Load more rows'}
+                      </button>
+                    </div>
+                  )}
                 </div>
               </div>
             )}
@@ -6,6 +6,7 @@ export const API_ENDPOINTS = {
   // Clean v2 endpoints
   v2: {
     query: `${API_BASE_URL}/${API_VERSION}/query`,
+    queryNext: `${API_BASE_URL}/${API_VERSION}/query/next`,
     schema: `${API_BASE_URL}/${API_VERSION}/schema`,
     tableInfo: (tableName: string) => `${API_BASE_URL}/${API_VERSION}/schema/${tableName}`,
     providers: `${API_BASE_URL}/${API_VERSION}/providers`,
@@ -47,6 +48,17 @@ export class ApiClient {
     })
   }
 
+  static async postQueryNext(data: {
+    continuation_token: string
+    user_role?: string
+    scoping_value?: string
+  }): Promise<QueryResponse> {
+    return this.request<QueryResponse>(API_ENDPOINTS.v2.queryNext, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    })
+  }
+
   static async getSchema(): Promise<SchemaInfo> {
     return this.request<SchemaInfo>(API_ENDPOINTS.v2.schema)
   }
@@ -80,6 +92,7 @@ export interface QueryResponse {
   request_id?: string
   execution_time: number
   tables_used: string[]
+  continuation_token?: string | null
 }
 
 export interface HealthStatus {